@@ -1,32 +1,25 @@
 # starter code 
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
+from agent_factory import create_agent, repl
+from tracing import trace_agent
 
 load_dotenv()
 
-def main():
-    # Initialize the LLM model
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-
-    # Create agent
-    agent = CodeAgent(
-        tools=[],
+def build_agent(model=None):
+    # Create agent on the shared model (AGENT_RESPONSE_CACHE=1 answers repeated requests from the response cache)
+    agent = create_agent(
         model=model,
         #add_base_tools=True,
         #additional_authorized_imports=["time", "pandas", "json"],
     )
+    return agent
 
-    # Agent conversation
-    while True:
-        task = input("\nEnter task (or 'exit' to quit): ")
-        if task.lower() in ['exit', 'quit']:
-            break
-        try:
-            result = agent.run(task)
-            print("Agent response:\n", result)
-        except Exception as e:
-            print(f"Error: {e}")
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
+
+    # Agent conversation, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, session="0_agent")
 
 if __name__ == '__main__':
     main()
-
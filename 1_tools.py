@@ -1,7 +1,9 @@
 # add custom tools
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel, tool
-import os
+from smolagents import tool
+from agent_factory import create_agent, repl
+from tracing import trace_agent
+from file_tools import FILE_TOOLS, atomic_write
 
 load_dotenv()
 
@@ -19,38 +21,28 @@ def create_file(path: str, content: str) -> str:
         The location and name of the file was created, or an error.
     """
     try:
-        # Ensure directory exists
-        dir_name = os.path.dirname(path)
-        if dir_name:
-            os.makedirs(dir_name, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write to a temp file renamed into place, so a failed write never leaves half a file
+        atomic_write(path, [content])
         return f"File created at {path}"
     except Exception as e:
         return f"Error creating file: {e}"
 
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-
-    # Create agent
-    agent = CodeAgent(
-        tools=[create_file],
+def build_agent(model=None):
+    # Create agent on the shared model (AGENT_RESPONSE_CACHE=1 answers repeated requests from the response cache)
+    agent = create_agent(
         model=model,
+        tools=[create_file, *FILE_TOOLS],
         add_base_tools=True,
         additional_authorized_imports=["os", "shutil"],
     )
+    return agent
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
 
-    # Agent conversation
-    while True:
-        task = input("\nEnter task (or 'exit' to quit): ")
-        if task.lower() in ['exit', 'quit']:
-            break
-        try:
-            result = agent.run(task)
-            print("\nAgent response:\n", result)
-        except Exception as e:
-            print(f"Error: {e}")
+    # Agent conversation, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, session="1_tools")
 
 if __name__ == '__main__':
     main()
@@ -1,52 +1,57 @@
 # multiagent
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-import re
-import pandas as pd
-import time
-import os
+from agent_factory import create_agent, get_model, repl
+from tracing import trace_agent
+from fanout import DispatchTool
+from prompt_cache import report_prompts, use_prompt_cache
+from model_router import get_small_model, route_model
 
 load_dotenv()
 
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
+def build_agent(model=None, small_model=None):
+    # All three agents share one model client (and its connections); AGENT_RESPONSE_CACHE=1 answers repeated requests from the response cache
+    # A stand-in model given for offline runs also stands in for the small one
+    small_model = small_model or (get_small_model() if model is None else model)
+    model = model or get_model()
 
-    research_agent=CodeAgent(
-        tools=[],
+    research_agent=create_agent(
         model=model,
         add_base_tools=True,
         name="research_agent",
         description="research and gather information from the internet and other sources",
     )
 
-    persona_agent=CodeAgent(
-        tools=[],
+    persona_agent=create_agent(
         model=model,
         add_base_tools=True,
         name="persona_agent",
         description="act as a persona and provide responses based on the given context",
     )
 
-    # Manager agent orchestrates the workflow
-    manager_agent = CodeAgent(
-        tools=[],
+    # Manager agent orchestrates the workflow, and can run independent subtasks in parallel
+    manager_agent = create_agent(
         model=model,
+        tools=[DispatchTool([research_agent, persona_agent], max_concurrency=2, timeout=300)],
         add_base_tools=False,
         managed_agents=[research_agent, persona_agent],
         additional_authorized_imports=[],
     )
 
-    # Interactive REPL via manager
-    while True:
-        task = input("\nEnter task (or 'exit' to quit): ")
-        if task.lower() in ['exit', 'quit']:
-            break
-        try:
-            result = manager_agent.run(task)
-            print("\nManager response:\n", result)
-        except Exception as e:
-            print(f"Error: {e}")
+    # The sub-agents' steps go to the small model, falling back to the large one after a failed step
+    route_model(research_agent, small=small_model, large=model)
+    route_model(persona_agent, small=small_model, large=model)
+
+    # System prompts render identically at every step and run, so the server can reuse its prefix cache
+    return use_prompt_cache(manager_agent)
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    manager_agent = trace_agent(build_agent())
+    # Prompt tokens of each step, and how many repeat an earlier prompt, print after each task
+    report_prompts(manager_agent)
+
+    # Interactive REPL via manager, remembered across tasks and restarts (type 'new' to start over)
+    repl(manager_agent, response_label="Manager response", session="2_multiagent")
 
 if __name__ == '__main__':
     main()
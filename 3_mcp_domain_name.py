@@ -1,30 +1,16 @@
 # adding mcp from https://github.com/bingal/FastDomainCheck-MCP-Server/
 
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import create_agent, mcp_tools, repl
+from domain_batch import BulkDomainCheckTool, DomainChecker
+from tracing import trace_agent
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
 import os
-import json
 
 # Load environment variables
 load_dotenv()
 
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-
+def build_agent(model=None):
     # Path to the compiled binary (not the folder)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     mcp_binary_path = os.path.join(
@@ -38,33 +24,30 @@ def main():
         env=os.environ.copy(),
     )
 
-    # Retrieve tools from the MCP server
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as domain_tool_list:
-        domain_tools = [*domain_tool_list]
+    # Checks whole candidate lists in chunks of 50, 4 chunks at a time
+    checker = DomainChecker(server="domain", max_concurrency=4)
 
-        print(f"Loaded {len(domain_tools)} domain tools from MCP server")
+    # Retrieve tools from the MCP server (kept warm in the shared pool, one process per concurrent chunk),
+    # reusing availability checks for 10 minutes
+    domain_tools = mcp_tools("domain", server_parameters, cache_ttl=600, size=checker.max_concurrency)
 
-        # Set up the agent
-        agent = CodeAgent(
-            tools=domain_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time", "pandas", "json"],
-        )
+    print(f"Loaded {len(domain_tools)} domain tools from MCP server")
 
-        # REPL loop
-        while True:
-            task = input("\nEnter news query (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
+    # Set up the agent, with a tool checking a whole candidate list in one call
+    agent = create_agent(
+        model=model,
+        tools=domain_tools + [BulkDomainCheckTool(checker)],
+        add_base_tools=True,
+        additional_authorized_imports=["time", "pandas", "json"],
+    )
+    return agent
 
-            try:
-                print("\nThinking...")
-                result = agent.run(task)
-                print("\nAgent response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
 
+    # REPL loop, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, prompt="Enter news query", thinking=True, session="3_mcp_domain_name")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,27 +1,14 @@
 # adding mcp (google calendar) from https://github.com/nspady/google-calendar-mcp
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import create_agent, mcp_tools, repl
+from tracing import trace_agent
+from prefetch import use_prefetch
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
 import os
 
 load_dotenv()
 
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-
+def build_agent(model=None):
     # Set up the MCP server parameters for google-calendar-mcp
     current_dir = os.path.dirname(os.path.abspath(__file__))
     mcp_dir = os.path.abspath(
@@ -36,28 +23,26 @@ def main():
         env=os.environ.copy(),
     )
 
-    # Retrieve tools from the Google Calendar MCP server, sanitizing names
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as calendar_tool_list:
-        calendar_tools = [*calendar_tool_list]
-        
-        # Manager agent orchestrates the workflow
-        agent = CodeAgent(
-            tools=calendar_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time"],
-        )
-
-        # Interactive REPL via manager
-        while True:
-            task = input("\nEnter task (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
-            try:
-                result = agent.run(task)
-                print("\nManager response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+    # Retrieve tools from the Google Calendar MCP server (kept warm in the shared pool), sanitizing names
+    calendar_tools = mcp_tools("google_calendar", server_parameters)
+
+    # Manager agent orchestrates the workflow
+    agent = create_agent(
+        model=model,
+        tools=calendar_tools,
+        add_base_tools=True,
+        additional_authorized_imports=["time"],
+    )
+
+    # Start calendar lookups while the model is still writing the code that makes them (writes are never started early)
+    return use_prefetch(agent, read_only=["list_*", "search_*", "get_*"])
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
+
+    # Interactive REPL via manager, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, response_label="Manager response", session="3_mcp_google_calendar")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,29 +1,16 @@
 # adding mcp from https://github.com/ltejedor/newsfeed-mcp
 
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import create_agent, mcp_tools, repl
+from news_index import LatestNewsTool, SearchNewsIndexTool, start_ingestion
+from tracing import trace_agent
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
 import os
 
 # Load environment variables
 load_dotenv()
 
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-    
+def build_agent(model=None):
     # Set up the MCP server parameters for newsfeed-mcp
     current_dir = os.path.dirname(os.path.abspath(__file__))
     mcp_dir = os.path.abspath(
@@ -37,32 +24,30 @@ def main():
         env=os.environ.copy(),
     )
     
-    # Retrieve tools from the News MCP server, sanitizing names
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as news_tool_list:
-        news_tools = [*news_tool_list]
-        
-        print(f"Loaded {len(news_tools)} news tools from MCP server")
-        
-        # News agent with access to the newsfeed tools
-        agent = CodeAgent(
-            tools=news_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time", "pandas", "json"],
-        )
-        
-        # Interactive REPL
-        while True:
-            task = input("\nEnter news query (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
-            
-            try:
-                print("\nThinking...")
-                result = agent.run(task)
-                print("\nAgent response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+    # Retrieve tools from the News MCP server (kept warm in the shared pool), sanitizing names
+    # Headlines and searches are reused for 2 minutes, and identical concurrent calls share one request
+    news_tools = mcp_tools("newsfeed", server_parameters, cache_ttl=120)
+
+    print(f"Loaded {len(news_tools)} news tools from MCP server")
+
+    # New items are pulled into a local search index every 5 minutes, so most questions are answered without a fetch
+    index = start_ingestion("newsfeed", interval=300).index
+
+    # News agent with access to the local index and the live newsfeed tools
+    agent = create_agent(
+        model=model,
+        tools=[SearchNewsIndexTool(index), LatestNewsTool(index)] + news_tools,
+        add_base_tools=True,
+        additional_authorized_imports=["time", "pandas", "json"],
+    )
+    return agent
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
+
+    # Interactive REPL, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, prompt="Enter news query", thinking=True, session="3_mcp_newsfeed")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
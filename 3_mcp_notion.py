@@ -1,28 +1,15 @@
 # adding notion mcp from https://github.com/makenotion/notion-mcp-server
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import create_agent, mcp_tools, repl
+from tracing import trace_agent
+from prefetch import use_prefetch
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
 import os
 import json
 
 load_dotenv()
 
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-    
+def build_agent(model=None):
     # Set up the MCP server parameters for Notion MCP
     # Make sure to have your Notion Integration token in .env as NOTION_API_KEY
     notion_api_key = os.environ.get('NOTION_API_KEY')
@@ -46,28 +33,26 @@ def main():
         env=notion_env,
     )
     
-    # Retrieve tools from the Notion MCP server, sanitizing names
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as notion_tool_list:
-        notion_tools = [*notion_tool_list]
-        
-        # Manager agent orchestrates the workflow
-        agent = CodeAgent(
-            tools=notion_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time"],
-        )
-        
-        # Interactive REPL via manager
-        while True:
-            task = input("\nEnter task (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
-            try:
-                result = agent.run(task)
-                print("\nManager response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+    # Retrieve tools from the Notion MCP server (kept warm in the shared pool), sanitizing names
+    notion_tools = mcp_tools("notion", server_parameters)
+
+    # Manager agent orchestrates the workflow
+    agent = create_agent(
+        model=model,
+        tools=notion_tools,
+        add_base_tools=True,
+        additional_authorized_imports=["time"],
+    )
+
+    # Start Notion lookups while the model is still writing the code that makes them (writes are never started early)
+    return use_prefetch(agent, read_only=["API_get_*", "API_retrieve_*", "API_post_search", "API_post_database_query"])
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
+
+    # Interactive REPL via manager, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, response_label="Manager response", session="3_mcp_notion")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
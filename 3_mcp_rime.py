@@ -1,28 +1,14 @@
 # adding mcp (rime) from https://github.com/MatthewDailey/rime-mcp
 # Will not work in Code Spaces - only locally
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import create_agent, mcp_tools, repl
+from tracing import trace_agent
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
 import os
 
 load_dotenv()
 
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
-
+def build_agent(model=None):
     # Set up the MCP server parameters for Rime MCP
     # Update this to point to the Rime MCP location specified in your documentation
     rime_mcp_dir = os.path.abspath(
@@ -49,28 +35,24 @@ def main():
         env=rime_env,
     )
 
-    # Retrieve tools from the Rime MCP server, sanitizing names
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as rime_tool_list:
-        rime_tools = [*rime_tool_list]
-        
-        # Manager agent orchestrates the workflow
-        agent = CodeAgent(
-            tools=rime_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time"],
-        )
+    # Retrieve tools from the Rime MCP server (kept warm in the shared pool), sanitizing names
+    rime_tools = mcp_tools("rime", server_parameters)
+
+    # Manager agent orchestrates the workflow
+    agent = create_agent(
+        model=model,
+        tools=rime_tools,
+        add_base_tools=True,
+        additional_authorized_imports=["time"],
+    )
+    return agent
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
 
-        # Interactive REPL via manager
-        while True:
-            task = input("\nEnter task (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
-            try:
-                result = agent.run(task)
-                print("\nManager response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+    # Interactive REPL via manager, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, response_label="Manager response", session="3_mcp_rime")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
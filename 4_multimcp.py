@@ -1,30 +1,16 @@
 # adding mcp (replicate and notion)
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel
-from mcpadapt.core import MCPAdapt
-from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from agent_factory import SafeNameAdapter, create_agent, repl
+from tracing import trace_agent
 from mcp import StdioServerParameters
-import re
-import pandas as pd
-import time
+from mcp_pool import get_pool
+from mcp_loader import load_servers, print_report
+from tool_retrieval import use_tool_retrieval
 import os
 
 load_dotenv()
-# Create environment variables with your Notion integration secret
-notion_env = os.environ.copy()
-notion_env["OPENAPI_MCP_HEADERS"] = '{"Authorization": "Bearer ' + os.getenv('NOTION_INTEGRATION_ID') + '", "Notion-Version": "2022-06-28"}'
-
-class SafeNameAdapter(SmolAgentsAdapter):
-    def adapt(self, func, tool):
-        # Ensure tool names are valid Python identifiers
-        safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
-        tool.name = safe_name
-        return super().adapt(func, tool)
-
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
 
+def build_agent(model=None):
     # Set up the MCP server parameters for mcp-replicate
     current_dir = os.path.dirname(os.path.abspath(__file__))
     mcp_dir = os.path.abspath(
@@ -39,37 +25,41 @@ def main():
         env=os.environ.copy(),
     )
 
+    # Create environment variables with your Notion integration secret
+    notion_env = os.environ.copy()
+    notion_env["OPENAPI_MCP_HEADERS"] = '{"Authorization": "Bearer ' + os.getenv('NOTION_INTEGRATION_ID') + '", "Notion-Version": "2022-06-28"}'
+
     # Launch the notion MCP server using its CLI (requires OPENAPI_MCP_HEADERS in env)
     notion_server_parameters = StdioServerParameters(
         command="npx",
         args=["-y", "@notionhq/notion-mcp-server"],
         env=notion_env,
     )
-    # Retrieve tools from both replicate and notion MCP servers, sanitizing names
-    with MCPAdapt(server_parameters, SafeNameAdapter()) as replicate_tool_list, \
-         MCPAdapt(notion_server_parameters, SafeNameAdapter()) as notion_tool_list:
-        # Combine and sanitize
-        data_tools = [*replicate_tool_list, *notion_tool_list]
-        
+    # Retrieve tools from both replicate and notion MCP servers (kept warm in the shared pool), sanitizing names
+    pool = get_pool()
+    pool.register("replicate", server_parameters, SafeNameAdapter())
+    pool.register("notion", notion_server_parameters, SafeNameAdapter())
+    # Start both servers at once and combine their tools
+    data_tools, report = load_servers(pool, ["replicate", "notion"])
+    print_report(report)
 
-        # Manager agent orchestrates the workflow
-        agent = CodeAgent(
-            tools=data_tools,
-            model=model,
-            add_base_tools=True,
-            additional_authorized_imports=["time", "pandas", "numpy"],
-        )
+    # Manager agent orchestrates the workflow
+    agent = create_agent(
+        model=model,
+        tools=data_tools,
+        add_base_tools=True,
+        additional_authorized_imports=["time", "pandas", "numpy"],
+    )
+
+    # Only the replicate and Notion tools relevant to each task go into the prompt; find_tools looks up others
+    return use_tool_retrieval(agent, data_tools, k=8)
+
+def main():
+    # Time model calls, code, tools and sub-agents; a summary prints after each task
+    agent = trace_agent(build_agent())
 
-        # Interactive REPL via manager
-        while True:
-            task = input("\nEnter task (or 'exit' to quit): ")
-            if task.lower() in ['exit', 'quit']:
-                break
-            try:
-                result = agent.run(task)
-                print("\nManager response:\n", result)
-            except Exception as e:
-                print(f"Error: {e}")
+    # Interactive REPL via manager, remembered across tasks and restarts (type 'new' to start over)
+    repl(agent, response_label="Manager response", session="4_multimcp")
 
 if __name__ == '__main__':
     main()
@@ -1,43 +1,49 @@
 # gradio ui
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel, GradioUI
-import re
-import pandas as pd
-import time
+from agent_factory import create_agent, get_model
+from session_server import serve
+from fanout import DispatchTool
+import argparse
 import os
 
 load_dotenv()
 
-def main():
-    # Initialize the LLM model (Anthropic Claude)
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
+def build_agent(model=None):
+    # All three agents share one model client (and its connections); AGENT_RESPONSE_CACHE=1 answers repeated requests from the response cache
+    model = model or get_model()
 
-    research_agent=CodeAgent(
-        tools=[],
+    research_agent=create_agent(
         model=model,
         add_base_tools=True,
         name="research_agent",
         description="research and gather information from the internet and other sources",
     )
 
-    persona_agent=CodeAgent(
-        tools=[],
+    persona_agent=create_agent(
         model=model,
         add_base_tools=True,
         name="persona_agent",
         description="act as a persona and provide responses based on the given context",
     )
 
-    # Manager agent orchestrates the workflow
-    manager_agent = CodeAgent(
-        tools=[],
+    # Manager agent orchestrates the workflow, and can run independent subtasks in parallel
+    manager_agent = create_agent(
         model=model,
+        tools=[DispatchTool([research_agent, persona_agent], max_concurrency=2, timeout=300)],
         add_base_tools=False,
         managed_agents=[research_agent, persona_agent],
         additional_authorized_imports=[],
     )
+    return manager_agent
 
-    GradioUI(manager_agent).launch()
+def main():
+    # Every browser session gets its own agent, sharing the model client and tools;
+    # at most 8 runs execute at once and up to 64 more wait in the queue.
+    # Tokens and steps stream into the chat; with --trace, runs are traced to traces/ for profiling
+    parser = argparse.ArgumentParser(description="Serve the research team to many users.")
+    parser.add_argument("--trace", action="store_true", help="write a Chrome trace of the latest runs to traces/5_ui.json")
+    args = parser.parse_args()
+    serve(build_agent, concurrency_limit=8, max_queue=64, trace=os.path.join("traces", "5_ui.json") if args.trace else None)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
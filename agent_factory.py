@@ -0,0 +1,183 @@
+# build agents from one place, sharing the model client and mcp tools
+import functools
+import os
+import re
+import threading
+
+from smolagents import CodeAgent, InferenceClientModel
+
+from streaming import print_stream
+
+# The MCP stack, the caches and session memory are imported where they are
+# used, so scripts that need none of them start without loading them
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-72B-Instruct"
+
+
+@functools.cache
+def _safe_name_adapter():
+    from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+
+    class SafeNameAdapter(SmolAgentsAdapter):
+        def adapt(self, func, tool):
+            # Ensure tool names are valid Python identifiers
+            safe_name = re.sub(r'\W|^(?=\d)', '_', tool.name)
+            tool.name = safe_name
+            return super().adapt(func, tool)
+
+    return SafeNameAdapter
+
+
+def __getattr__(name):
+    # `from agent_factory import SafeNameAdapter` still works, loading MCPAdapt only then
+    if name == "SafeNameAdapter":
+        return _safe_name_adapter()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_id=None, **kwargs):
+    """The process-wide model for `model_id`.
+
+    Every agent and managed agent asking for the same model gets the same object,
+    so they share one inference client and its HTTP connection pool. `model_id`
+    defaults to `$AGENT_MODEL_ID`, then to Qwen2.5-72B-Instruct; `$AGENT_MODEL_URL`
+    serves it from another endpoint, e.g. a local server. Calls are paced by the
+    provider's `rate_limit` scheduler, which retries rate limits and server errors.
+    With `$AGENT_RESPONSE_CACHE=1`, repeated requests are answered from the
+    response cache (see `model_cache`).
+    """
+    from huggingface_hub import InferenceClient
+
+    from model_cache import CachedModel, cache_enabled
+    from rate_limit import RateLimitedModel, get_scheduler
+
+    model_id = model_id or os.environ.get("AGENT_MODEL_ID", DEFAULT_MODEL_ID)
+    base_url = kwargs.pop("base_url", None) or os.environ.get("AGENT_MODEL_URL")
+    key = (model_id, base_url, tuple(sorted(kwargs.items())))
+    with _models_lock:
+        if key not in _models:
+            if base_url:
+                # the client takes a model or a URL, not both; the model id still goes in each request
+                kwargs["client"] = InferenceClient(base_url=base_url, token=kwargs.get("token") or os.environ.get("HF_TOKEN"))
+            # the scheduler retries, with limits shared by every model of the provider
+            model = InferenceClientModel(model_id=model_id, **{"retry": False, **kwargs})
+            scheduler = get_scheduler(base_url or kwargs.get("provider") or "huggingface")
+            model = RateLimitedModel(model, scheduler)
+            _models[key] = CachedModel(model) if cache_enabled() else model
+        return _models[key]
+
+
+def mcp_tools(name, server_parameters, cache_ttl=None, size=None):
+    """Tools of an MCP server, started once per process in the shared pool with safe tool names.
+
+    With `cache_ttl` (seconds, or `{tool pattern: seconds}`), results are cached
+    and identical concurrent calls share one round-trip; see `tool_result_cache`.
+    `size` is the most server processes started for calls running at once
+    (the pool's default, 1, otherwise).
+    """
+    from mcp_pool import get_pool
+    from tool_cache import load_tools
+    from tool_result_cache import cache_tools
+
+    pool = get_pool()
+    pool.register(name, server_parameters, _safe_name_adapter()(), size=size)
+    tools = list(load_tools(pool, name))
+    if cache_ttl:
+        tools = cache_tools(tools, cache_ttl, server=name)
+    return tools
+
+
+def create_agent(model=None, tools=(), mcp_servers=None, managed_agents=(), **kwargs):
+    """A `CodeAgent` on the shared model.
+
+    Args:
+        model: Model to use instead of the shared `get_model()` one.
+        tools: Tools the agent can call.
+        mcp_servers: `{pool name: StdioServerParameters}` whose tools are added too.
+        managed_agents: Agents it can delegate to.
+        **kwargs: Passed on to `CodeAgent`, e.g. `add_base_tools` or `name`.
+    """
+    tools = list(tools)
+    for name, server_parameters in (mcp_servers or {}).items():
+        tools += mcp_tools(name, server_parameters)
+    return CodeAgent(
+        tools=tools,
+        model=model or get_model(),
+        managed_agents=list(managed_agents) or None,
+        **kwargs,
+    )
+
+
+def agent_from_config(config, model=None):
+    """Builds an agent from a plain dict, e.g. one loaded from JSON.
+
+    The keys are `create_agent`'s, plus `model_id`. MCP servers are given as
+    `{"command": ..., "args": [...], "env": {...}}` (env is added to the current
+    environment), and managed agents as nested configs:
+
+        {
+            "model_id": "Qwen/Qwen2.5-72B-Instruct",
+            "mcp_servers": {"newsfeed": {"command": "python", "args": ["mcp/newsfeed-mcp/news_mcp.py"]}},
+            "managed_agents": [{"name": "research_agent", "description": "...", "add_base_tools": True}],
+        }
+    """
+    from mcp import StdioServerParameters
+
+    config = dict(config)
+    model = model or get_model(config.pop("model_id", None))
+    mcp_servers = {
+        name: StdioServerParameters(
+            command=server["command"],
+            args=server.get("args", []),
+            env={**os.environ, **server.get("env", {})},
+        )
+        for name, server in config.pop("mcp_servers", {}).items()
+    }
+    managed_agents = [agent_from_config(managed, model=model) for managed in config.pop("managed_agents", [])]
+    return create_agent(model=model, mcp_servers=mcp_servers, managed_agents=managed_agents, **config)
+
+
+def repl(agent, prompt="Enter task", response_label="Agent response", thinking=False, session=None, first_task=None):
+    """Reads tasks until 'exit' or 'quit', streaming each run to the terminal.
+
+    With a `session` name, the conversation is kept across tasks and restarts in
+    `.cache/sessions/<session>.jsonl`, within a bounded prompt; 'new' starts over.
+    'retry' runs a task that failed again. `first_task` is handled before the
+    first prompt, e.g. one typed while the agent was starting.
+    """
+    memory = None
+    failed_task = None
+    if session is not None:
+        from agent_memory import SessionMemory, SessionStore
+
+        memory = SessionMemory(session, SessionStore())
+        memory.attach(agent)
+    while True:
+        task = first_task or input(f"\n{prompt} (or 'exit' to quit): ")
+        first_task = None
+        if task.lower() in ['exit', 'quit']:
+            break
+        if memory is not None and task.lower() == 'new':
+            memory.clear()
+            print("Started a new conversation.")
+            continue
+        if task.lower() == 'retry':
+            if failed_task is None:
+                print("Nothing to retry.")
+                continue
+            task = failed_task
+        failed_task = None
+        try:
+            if thinking:
+                print("\nThinking...")
+            # Stream tokens and steps to the terminal as they arrive
+            result = print_stream(agent, task, reset=memory is None)
+            print(f"\n{response_label}:\n", result)
+        except Exception as e:
+            # model calls were already retried; keep the task so it can be run again
+            failed_task = task
+            print(f"Error: {e}\nType 'retry' to run the task again.")
@@ -0,0 +1,310 @@
+# persistent conversation memory with a bounded prompt
+import dataclasses
+import json
+import os
+import threading
+import time
+
+from smolagents import ActionStep, PlanningStep, TaskStep
+from smolagents.memory import Timing
+from smolagents.models import ChatMessage, MessageRole
+
+SESSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sessions")
+
+
+def truncate(text, max_chars):
+    """Keeps the start and end of `text`, dropping the middle beyond `max_chars`."""
+    if text is None or len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return f"{text[:half]}\n...[{len(text) - 2 * half} characters truncated]...\n{text[-half:]}"
+
+
+class SessionStore:
+    """Append-only JSONL files of conversation turns, one file per session.
+
+    Each line is a record: a `task`, `plan` or `step`, or a `summary` standing
+    in for everything written before it. Sessions are read backwards
+    from the end, so resuming a long session only reads its latest turns.
+    """
+
+    def __init__(self, directory=SESSIONS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def append(self, session_id, records):
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        with self._lock, open(self.path(session_id), "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def tail(self, session_id):
+        """Yields the session's records newest first."""
+        path = self.path(session_id)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position, rest = f.tell(), b""
+            while position > 0:
+                size = min(65536, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + rest).split(b"\n")
+                # the first piece may be the end of a line that starts in the previous chunk
+                rest = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield json.loads(line)
+            if rest.strip():
+                yield json.loads(rest)
+
+    def delete(self, session_id):
+        with self._lock:
+            if os.path.exists(self.path(session_id)):
+                os.remove(self.path(session_id))
+
+    def sessions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[: -len(".jsonl")] for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+
+def extractive_summary(summary, turns):
+    """Default summarizer: one line per turn with its task and (shortened) answer."""
+    lines = [summary] if summary else []
+    for turn in turns:
+        lines.append(f"- {truncate(turn['task'], 300)} -> {truncate(str(turn.get('output')), 300)}")
+    return "\n".join(lines)
+
+
+def model_summarizer(model, max_chars=4000):
+    """Summarizer asking `model` to fold turns into the running summary."""
+
+    def summarize(summary, turns):
+        transcript = "\n\n".join(
+            f"Task: {turn['task']}\nWork: {truncate(turn['work'], 1500)}\nAnswer: {turn.get('output')}" for turn in turns
+        )
+        prompt = (
+            "Update the summary of this conversation with the turns below. Keep facts, decisions, names and results "
+            f"that later tasks may need, and stay under {max_chars} characters.\n\n"
+            f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"
+        )
+        message = model.generate([ChatMessage(role=MessageRole.USER, content=[{"type": "text", "text": prompt}])])
+        return truncate(message.content, max_chars)
+
+    return summarize
+
+
+class SessionMemory:
+    """Keeps an agent's memory across runs, on disk and within a prompt budget.
+
+    Once attached, the agent's prompt is built from a compacted view of its
+    memory: a summary of earlier turns, then the recent turns with long
+    observations truncated (except in the latest `keep_steps` steps). After each
+    run, however it ended (answered, failed, out of steps or interrupted), the
+    new steps are appended to the session file, and the oldest turns are
+    folded into the summary while the view is over `max_context_tokens` or there
+    are more than `max_turns` turns. Run the agent with `reset=False`.
+
+    Args:
+        session_id: Name of the session file.
+        store: `SessionStore` to persist to, or None to keep the session in memory only.
+        max_context_tokens: Approximate prompt budget for the conversation history.
+        max_turns: Turns kept in full before they are summarized.
+        keep_steps: Latest action steps whose observations are never truncated.
+        max_observation_chars: Length older observations are truncated to.
+        summarize: `summarize(summary, turns) -> str`; see `extractive_summary` and `model_summarizer`.
+    """
+
+    def __init__(
+        self,
+        session_id,
+        store=None,
+        max_context_tokens=6000,
+        max_turns=10,
+        keep_steps=3,
+        max_observation_chars=1500,
+        summarize=extractive_summary,
+    ):
+        self.session_id = session_id
+        self.store = store
+        self.max_context_tokens = max_context_tokens
+        self.max_turns = max_turns
+        self.keep_steps = keep_steps
+        self.max_observation_chars = max_observation_chars
+        self.summarize = summarize
+        self.summary = ""
+        self.agent = None
+        self._loaded = store is None
+        self._saved = set()
+
+    def attach(self, agent):
+        self.agent = agent
+        agent.write_memory_to_messages = self.to_messages
+        run = agent.run
+
+        def run_and_save(task, *args, **kwargs):
+            if kwargs.get("stream", args[0] if args else False):
+                return self._save_after(run(task, *args, **kwargs))
+            try:
+                return run(task, *args, **kwargs)
+            finally:
+                self.save()
+
+        agent.run = run_and_save
+        return agent
+
+    def _save_after(self, events):
+        # a streamed run is over when its events are, or when the reader stops
+        try:
+            yield from events
+        finally:
+            self.save()
+
+    def to_messages(self, summary_mode=False):
+        """The agent's prompt history, compacted; replaces `agent.write_memory_to_messages`."""
+        self._load()
+        memory = self.agent.memory
+        messages = memory.system_prompt.to_messages(summary_mode=summary_mode)
+        if self.summary:
+            messages.append(
+                ChatMessage(
+                    role=MessageRole.USER,
+                    content=[{"type": "text", "text": f"Summary of the earlier conversation:\n{self.summary}"}],
+                )
+            )
+        action_steps = [step for step in memory.steps if isinstance(step, ActionStep)]
+        recent = {id(step) for step in action_steps[-self.keep_steps :]} if self.keep_steps else set()
+        for step in memory.steps:
+            if isinstance(step, ActionStep) and id(step) not in recent and step.observations:
+                step = dataclasses.replace(step, observations=truncate(step.observations, self.max_observation_chars))
+            messages.extend(step.to_messages(summary_mode=summary_mode))
+        return messages
+
+    def clear(self):
+        """Forgets the session, on disk and in the agent."""
+        self.summary = ""
+        self._saved.clear()
+        if self.agent is not None:
+            self.agent.memory.reset()
+        if self.store is not None:
+            self.store.delete(self.session_id)
+
+    def turns(self):
+        """Turns currently held in the agent's memory, oldest first.
+
+        Each has the index range of its steps in `agent.memory.steps`, `start` to `end`.
+        """
+        turns = []
+        for index, step in enumerate(self.agent.memory.steps):
+            if isinstance(step, TaskStep):
+                turns.append({"task": step.task, "steps": [step], "start": index, "end": index + 1, "work": "", "output": None})
+            elif turns:
+                turns[-1]["steps"].append(step)
+                turns[-1]["end"] = index + 1
+                if isinstance(step, ActionStep):
+                    turns[-1]["work"] += f"{step.code_action or ''}\n{step.observations or ''}\n"
+                    if step.is_final_answer:
+                        turns[-1]["output"] = step.action_output
+        return turns
+
+    def _load(self):
+        # lazily, on the first prompt: the summary and the turns written after it
+        if self._loaded:
+            return
+        self._loaded = True
+        records = []
+        for record in self.store.tail(self.session_id):
+            if record["type"] == "summary":
+                self.summary = record["text"]
+                break
+            records.append(record)
+        steps = [self._to_step(record) for record in reversed(records)]
+        steps = [step for step in steps if step is not None]
+        self._saved.update(id(step) for step in steps)
+        # the task being started is already in memory, history goes before it
+        self.agent.memory.steps[:0] = steps
+
+    def _to_step(self, record):
+        if record["type"] == "task":
+            return TaskStep(task=record["task"])
+        if record["type"] == "plan":
+            message = ChatMessage(role=MessageRole.ASSISTANT, content=record["plan"])
+            return PlanningStep(model_input_messages=[], model_output_message=message, plan=record["plan"], timing=Timing(0, 0))
+        if record["type"] == "step":
+            observations = record.get("observations")
+            if record.get("error"):
+                observations = f"{observations or ''}\nError: {record['error']}".strip()
+            return ActionStep(
+                step_number=record["step"],
+                timing=Timing(0, 0),
+                model_output=record.get("model_output"),
+                code_action=record.get("code"),
+                observations=observations,
+                action_output=record.get("output"),
+                is_final_answer=record.get("is_final_answer", False),
+            )
+        return None
+
+    def _to_record(self, step):
+        if isinstance(step, TaskStep):
+            return {"type": "task", "task": step.task, "time": time.time()}
+        if isinstance(step, PlanningStep):
+            return {"type": "plan", "plan": step.plan}
+        if isinstance(step, ActionStep):
+            model_output = step.model_output if isinstance(step.model_output, str) else None
+            return {
+                "type": "step",
+                "step": step.step_number,
+                "model_output": model_output,
+                "code": step.code_action,
+                "observations": step.observations,
+                "error": str(step.error) if step.error else None,
+                "output": step.action_output if step.is_final_answer else None,
+                "is_final_answer": step.is_final_answer,
+            }
+        return None
+
+    def save(self):
+        """Appends the steps not saved yet to the session file, then compacts the memory."""
+        self._load()
+        records = []
+        # ids are only meaningful for steps still in memory
+        self._saved &= {id(step) for step in self.agent.memory.steps}
+        for step in self.agent.memory.steps:
+            if id(step) not in self._saved:
+                self._saved.add(id(step))
+                record = self._to_record(step)
+                if record is not None:
+                    records.append(record)
+        if self.store is not None:
+            self.store.append(self.session_id, records)
+        self._compact()
+
+    def _size(self):
+        # the budget covers the history, not the system prompt
+        history = self.to_messages()[len(self.agent.memory.system_prompt.to_messages()) :]
+        return sum(len(str(message.content)) for message in history) // 4
+
+    def _compact(self):
+        turns = self.turns()
+        folded = removed = 0
+        while len(turns) > 1 and (len(turns) > self.max_turns or self._size() > self.max_context_tokens):
+            turn = turns.pop(0)
+            folded += 1
+            # steps before the first task, if any, stay where they are
+            del self.agent.memory.steps[turn["start"] - removed : turn["end"] - removed]
+            removed += turn["end"] - turn["start"]
+            self.summary = self.summarize(self.summary, [turn])
+        if folded and self.store is not None:
+            # a summary stands in for everything before it, so the turns still kept are written again after it
+            records = [{"type": "summary", "text": self.summary, "turns": folded}]
+            records += [record for step in self.agent.memory.steps if (record := self._to_record(step)) is not None]
+            self.store.append(self.session_id, records)
+        self._saved = {id(step) for step in self.agent.memory.steps}
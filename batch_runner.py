@@ -0,0 +1,210 @@
+# run many tasks through an entry point's agent without the REPL
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from smolagents import ActionStep, PlanningStep
+from smolagents.monitoring import LogLevel
+
+from executor_pool import WorkerPool, use_worker_pool
+from tracing import Tracer
+
+
+def load_entry_point(path):
+    """Imports an entry point script (e.g. `0_agent.py`) that defines `build_agent()`."""
+    path = os.path.abspath(path)
+    module_name = "entry_" + os.path.splitext(os.path.basename(path))[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    # entry points live next to the helper modules they import
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    if not hasattr(module, "build_agent"):
+        raise ValueError(f"{path} does not define build_agent()")
+    return module
+
+
+def read_tasks(stream):
+    """Yields `(id, task)` pairs from JSONL lines: `{"id": ..., "task": ...}` or a JSON string."""
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        if isinstance(item, str):
+            yield number, item
+        else:
+            yield item.get("id", number), item["task"]
+
+
+def agent_tree(agent):
+    """The agent and, recursively, every managed agent under it."""
+    yield agent
+    for managed_agent in getattr(agent, "managed_agents", {}).values():
+        yield from agent_tree(managed_agent)
+
+
+class _TokenCounter:
+    # Step callback summing tokens over an agent and its managed agents
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def __call__(self, memory_step):
+        if memory_step.token_usage is not None:
+            self.input_tokens += memory_step.token_usage.input_tokens
+            self.output_tokens += memory_step.token_usage.output_tokens
+
+    def reset(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+
+class BatchRunner:
+    """Runs tasks through agents built by `build_agent`, one agent per worker thread.
+
+    Args:
+        build_agent: Callable returning a fresh agent.
+        workers: Number of tasks run at the same time.
+        verbose: Keep the agents' console logs (off by default, they interleave).
+        tracer: Optional `Tracer` recording spans for every worker's agent.
+        worker_pool: Optional `executor_pool.WorkerPool` running the agents' code in worker processes.
+    """
+
+    def __init__(self, build_agent, workers=4, verbose=False, tracer=None, worker_pool=None):
+        self.build_agent = build_agent
+        self.workers = workers
+        self.verbose = verbose
+        self.tracer = tracer
+        self.worker_pool = worker_pool
+        self._local = threading.local()
+
+    def _agent(self):
+        # agents keep per-run memory, so every worker thread gets its own
+        if not hasattr(self._local, "agent"):
+            agent = self.build_agent()
+            counter = _TokenCounter()
+            for member in agent_tree(agent):
+                if not self.verbose:
+                    member.logger.level = LogLevel.OFF
+                member.step_callbacks.register(ActionStep, counter)
+                member.step_callbacks.register(PlanningStep, counter)
+            if self.worker_pool is not None:
+                use_worker_pool(agent, self.worker_pool)
+            if self.tracer is not None:
+                # one summary for the whole batch rather than one per task
+                self.tracer.instrument(agent, report=False)
+            self._local.agent, self._local.counter = agent, counter
+        return self._local.agent, self._local.counter
+
+    def run_task(self, task_id, task):
+        started = time.perf_counter()
+        result = {"id": task_id, "task": task, "output": None, "error": None}
+        try:
+            agent, counter = self._agent()
+            counter.reset()
+            run = agent.run(task, return_full_result=True)
+            result["output"] = run.output
+            result["state"] = run.state
+            result["steps"] = len(run.steps)
+        except Exception as e:
+            counter = getattr(self._local, "counter", None)
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = time.perf_counter() - started
+        result["input_tokens"] = counter.input_tokens if counter else 0
+        result["output_tokens"] = counter.output_tokens if counter else 0
+        return result
+
+    def run(self, tasks, on_result):
+        """Runs `(id, task)` pairs and calls `on_result(result)` as each one finishes.
+
+        At most `2 * workers` tasks are read ahead, so large inputs and stdin streams
+        are consumed at the pace of the workers. Returns a throughput summary.
+        """
+        slots = threading.BoundedSemaphore(2 * self.workers)
+        lock = threading.Lock()
+        summary = {"tasks": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0, "task_seconds": 0.0}
+        started = time.perf_counter()
+
+        def done(future):
+            try:
+                result = future.result()
+                with lock:
+                    summary["tasks"] += 1
+                    summary["errors"] += result["error"] is not None
+                    summary["input_tokens"] += result["input_tokens"]
+                    summary["output_tokens"] += result["output_tokens"]
+                    summary["task_seconds"] += result["seconds"]
+                    on_result(result)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for task_id, task in tasks:
+                slots.acquire()
+                executor.submit(self.run_task, task_id, task).add_done_callback(done)
+
+        summary["wall_seconds"] = time.perf_counter() - started
+        summary["tasks_per_second"] = summary["tasks"] / summary["wall_seconds"] if summary["wall_seconds"] else 0.0
+        summary["mean_task_seconds"] = summary["task_seconds"] / summary["tasks"] if summary["tasks"] else 0.0
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL stream of tasks through an agent entry point.")
+    parser.add_argument("entry_point", help="script defining build_agent(), e.g. 0_agent.py")
+    parser.add_argument("tasks", nargs="?", default="-", help="JSONL file of tasks, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for results, '-' for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="tasks run at the same time")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show agent logs")
+    parser.add_argument("--trace", help="write a Chrome trace of all tasks to this file")
+    parser.add_argument("--isolate", action="store_true", help="run generated code in a pool of worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="don't answer repeated model requests from the response cache")
+    args = parser.parse_args()
+
+    # repeated tasks are expected here, unlike in the REPLs; set before the entry point builds its model
+    if not args.no_cache:
+        os.environ.setdefault("AGENT_RESPONSE_CACHE", "1")
+    module = load_entry_point(args.entry_point)
+    tracer = Tracer(args.trace) if args.trace else None
+    worker_pool = WorkerPool(size=args.workers) if args.isolate else None
+    runner = BatchRunner(
+        module.build_agent, workers=args.workers, verbose=args.verbose, tracer=tracer, worker_pool=worker_pool
+    )
+
+    tasks_file = sys.stdin if args.tasks == "-" else open(args.tasks, encoding="utf-8")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+
+        def write(result):
+            output_file.write(json.dumps(result, default=str) + "\n")
+            output_file.flush()
+
+        summary = runner.run(read_tasks(tasks_file), write)
+    finally:
+        if tasks_file is not sys.stdin:
+            tasks_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print(
+        f"{summary['tasks']} tasks ({summary['errors']} failed) in {summary['wall_seconds']:.2f}s: "
+        f"{summary['tasks_per_second']:.2f} tasks/s, {summary['mean_task_seconds']:.2f}s mean, "
+        f"{summary['input_tokens']:,} input / {summary['output_tokens']:,} output tokens",
+        file=sys.stderr,
+    )
+    if tracer is not None:
+        tracer.print_summary(file=sys.stderr)
+        tracer.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# deterministic offline stand-in for the llm, used by the benchmarks
+import re
+import threading
+import time
+from collections import deque
+
+from smolagents.models import ChatMessage, ChatMessageStreamDelta, MessageRole, Model
+from smolagents.monitoring import TokenUsage
+
+from prompt_cache import RECENT_PROMPTS, common_prefix_length, prompt_text
+
+# tools that need the network or end the run are never called by the fake model
+SKIPPED_TOOLS = {"final_answer", "web_search", "visit_webpage", "wikipedia_search", "python_interpreter"}
+
+ARGUMENT_VALUES = {
+    "string": '"benchmark"',
+    "str": '"benchmark"',
+    "integer": "1",
+    "number": "1.0",
+    "boolean": "True",
+    "array": "[]",
+    "object": "{}",
+    "any": '"benchmark"',
+}
+
+SIGNATURE = re.compile(r"^def (\w+)\((.*)\) ->", re.MULTILINE)
+PARAMETER = re.compile(r"(\w+): (\w+)")
+
+
+def _text(message):
+    content = message["content"] if isinstance(message, dict) else message.content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content or ""
+
+
+def _role(message):
+    role = message["role"] if isinstance(message, dict) else message.role
+    return getattr(role, "value", role)
+
+
+class FakeModel(Model):
+    """Scripted model answering like a `CodeAgent` would, without any network.
+
+    The first step calls every tool and team member listed in the system prompt
+    (up to `max_calls`, skipping web and final-answer tools) with placeholder
+    arguments; the next step gives the final answer. Every call sleeps for
+    `latency` plus one second per `tokens_per_second` output tokens.
+
+    With `prefill_tokens_per_second`, time to first token also grows with the
+    prompt tokens that do not start like a recent prompt, as on a server with
+    prefix caching.
+
+    Args:
+        latency: Seconds of simulated time to first token.
+        tokens_per_second: Simulated output speed.
+        max_calls: Tools called in the first step.
+        prefill_tokens_per_second: Simulated speed of processing uncached prompt tokens.
+    """
+
+    def __init__(self, latency=0.05, tokens_per_second=500, max_calls=4, model_id="fake-model", prefill_tokens_per_second=None):
+        super().__init__(model_id=model_id)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.max_calls = max_calls
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.prefilled_tokens = 0
+        self._recent = deque(maxlen=RECENT_PROMPTS)
+        self._lock = threading.Lock()
+
+    def _answer(self, messages):
+        system_prompt = _text(messages[0]) if messages and _role(messages[0]) == MessageRole.SYSTEM.value else ""
+        if any(_role(message) == MessageRole.ASSISTANT.value for message in messages):
+            return "Thought: I have what I need.\n<code>\nfinal_answer(\"benchmark done\")\n</code>"
+        calls = []
+        for name, parameters in SIGNATURE.findall(system_prompt):
+            if name in SKIPPED_TOOLS or len(calls) == self.max_calls:
+                continue
+            arguments = []
+            for parameter_name, parameter_type in PARAMETER.findall(parameters):
+                if parameter_name != "additional_args":
+                    value = ARGUMENT_VALUES.get(parameter_type, ARGUMENT_VALUES["any"])
+                    arguments.append(f"{parameter_name}={value}")
+            calls.append(f"print({name}({', '.join(arguments)}))")
+        code = "\n".join(calls) or 'print("nothing to call")'
+        return f"Thought: Let me use the available tools.\n<code>\n{code}\n</code>"
+
+    def _usage(self, messages, answer):
+        input_tokens = sum(len(_text(message)) for message in messages) // 4
+        return TokenUsage(input_tokens=input_tokens, output_tokens=len(answer) // 4)
+
+    def _time_to_first_token(self, messages):
+        if not self.prefill_tokens_per_second:
+            return self.latency
+        text = prompt_text(messages)
+        with self._lock:
+            cached = max((common_prefix_length(text, previous) for previous in self._recent), default=0)
+            self._recent.append(text)
+            uncached = (len(text) - cached) // 4
+            self.prefilled_tokens += uncached
+        return self.latency + uncached / self.prefill_tokens_per_second
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        answer = self._answer(messages)
+        usage = self._usage(messages, answer)
+        time.sleep(self._time_to_first_token(messages) + usage.output_tokens / self.tokens_per_second)
+        return ChatMessage(role=MessageRole.ASSISTANT, content=answer, token_usage=usage)
+
+    def generate_stream(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        answer = self._answer(messages)
+        usage = self._usage(messages, answer)
+        time.sleep(self._time_to_first_token(messages))
+        for line in answer.splitlines(keepends=True):
+            time.sleep(len(line) / 4 / self.tokens_per_second)
+            yield ChatMessageStreamDelta(content=line)
+        yield ChatMessageStreamDelta(content="", token_usage=usage)
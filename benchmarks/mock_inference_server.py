@@ -0,0 +1,146 @@
+# local openai-compatible chat server with a provider's rate limits, for testing the clients offline
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_model import FakeModel
+
+
+class MockProvider:
+    """The limits and answers of the mock server.
+
+    Requests over `requests_per_minute` or `tokens_per_minute` in the last
+    minute, or beyond `max_concurrency` at once, get a 429 with `Retry-After`.
+    Accepted ones take `latency` seconds, longer the more run at once, and are
+    answered like :class:`FakeModel` answers.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=8, latency=0.1):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.latency = latency
+        self.model = FakeModel(latency=0)
+        self.in_flight = 0
+        self.stats = {"served": 0, "rate_limited": 0, "max_in_flight": 0}
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def admit(self, tokens):
+        """None if the request may run, else the seconds it should retry after."""
+        now = time.monotonic()
+        with self._lock:
+            while self._window and self._window[0][0] < now - 60:
+                self._window.popleft()
+            retry_after = None
+            if self.in_flight >= self.max_concurrency:
+                retry_after = self.latency
+            elif self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+                retry_after = self._window[0][0] + 60 - now
+            elif self.tokens_per_minute and sum(used for _, used in self._window) + tokens > self.tokens_per_minute:
+                retry_after = self._window[0][0] + 60 - now if self._window else 1.0
+            if retry_after is not None:
+                self.stats["rate_limited"] += 1
+                return max(retry_after, 0.01)
+            self._window.append((now, tokens))
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+            return None
+
+    def answer(self, messages):
+        with self._lock:
+            load = self.in_flight / self.max_concurrency
+        try:
+            # a busy server is a slower server
+            time.sleep(self.latency * (1 + load))
+            content = self.model._answer(messages)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.stats["served"] += 1
+        return content
+
+
+def _handler(provider):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self._json(200, provider.stats)
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self._json(404, {"error": "not found"})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            messages = request.get("messages", [])
+            prompt_tokens = sum(len(json.dumps(message.get("content", ""))) for message in messages) // 4
+            retry_after = provider.admit(prompt_tokens + (request.get("max_tokens") or 0))
+            if retry_after is not None:
+                self._json(429, {"error": "Too Many Requests: rate limit exceeded"}, {"Retry-After": f"{retry_after:.2f}"})
+                return
+            content = provider.answer(messages)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4, "total_tokens": prompt_tokens + len(content) // 4}
+            common = {"id": "mock", "created": int(time.time()), "model": request.get("model", "mock")}
+            if not request.get("stream"):
+                message = {"role": "assistant", "content": content}
+                self._json(200, {**common, "object": "chat.completion", "choices": [{"index": 0, "message": message, "finish_reason": "stop"}], "usage": usage})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            chunks = [
+                {**common, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"role": "assistant", "content": line}, "finish_reason": None}]}
+                for line in content.splitlines(keepends=True)
+            ]
+            chunks.append({**common, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            for chunk in chunks:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def serve(port=0, **limits):
+    """Starts the server in a thread; returns it and its :class:`MockProvider`. Its URL ends in `/v1`."""
+    provider = MockProvider(**limits)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(provider))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return server, provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a rate-limited fake model at http://127.0.0.1:<port>/v1.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rpm", type=float, help="requests per minute")
+    parser.add_argument("--tpm", type=float, help="tokens per minute")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="requests at once before 429s")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request when idle")
+    args = parser.parse_args()
+    server, provider = serve(args.port, requests_per_minute=args.rpm, tokens_per_minute=args.tpm, max_concurrency=args.max_concurrency, latency=args.latency)
+    print(f"serving at {server.url} (stats at GET /), Ctrl-C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# benchmark the example agents offline with a fake model and stub mcp servers
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+sys.path.insert(0, REPO_DIR)
+
+ENTRY_POINTS = [
+    "0_agent.py",
+    "1_tools.py",
+    "2_multiagent.py",
+    "3_mcp_domain_name.py",
+    "3_mcp_google_calendar.py",
+    "3_mcp_newsfeed.py",
+    "3_mcp_notion.py",
+    "3_mcp_rime.py",
+    "4_multimcp.py",
+    "drink_making_agent.py",
+]
+
+# the scripts insist on these being set, the stub servers ignore them
+DUMMY_ENV = {"NOTION_API_KEY": "benchmark", "NOTION_INTEGRATION_ID": "benchmark", "RIME_API_KEY": "benchmark"}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = (len(values) - 1) * q
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+def register_stub_servers(pool, tool_latency):
+    """Registers a stub server under every pool name the scripts use.
+
+    The pool keeps the first registration of a name, so the scripts' own
+    `pool.register` calls for the real servers are ignored afterwards.
+    """
+    from mcp import StdioServerParameters
+    from stub_mcp_server import STUB_TOOLS
+
+    for name in STUB_TOOLS:
+        pool.register(
+            name,
+            StdioServerParameters(
+                command=sys.executable,
+                args=[os.path.join(BENCHMARKS_DIR, "stub_mcp_server.py"), name, "--latency", str(tool_latency)],
+            ),
+        )
+
+
+def bench_entry_point(entry_point, tasks, concurrency, latency, tool_latency):
+    """Measures one entry point in this process; run it in a fresh process per entry point."""
+    from batch_runner import BatchRunner, load_entry_point
+    from fake_model import FakeModel
+    from mcp_pool import get_pool
+
+    pool = get_pool()
+    register_stub_servers(pool, tool_latency)
+    model = FakeModel(latency=latency)
+
+    started = time.perf_counter()
+    module = load_entry_point(os.path.join(REPO_DIR, entry_point))
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    module.build_agent(model=model)
+    startup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    module.build_agent(model=model)
+    rebuild_seconds = time.perf_counter() - started
+
+    build_agent = partial(module.build_agent, model=model)
+    task_list = [(number, f"Benchmark task {number}") for number in range(tasks)]
+
+    # per-task latency, one task at a time
+    results = []
+    BatchRunner(build_agent, workers=1).run(task_list, results.append)
+    latencies = [result["seconds"] for result in results]
+    errors = [result["error"] for result in results if result["error"]]
+
+    throughput = {}
+    for workers in concurrency:
+        summary = BatchRunner(build_agent, workers=workers).run(task_list, lambda result: None)
+        throughput[str(workers)] = {
+            "tasks_per_second": summary["tasks_per_second"],
+            "wall_seconds": summary["wall_seconds"],
+            "errors": summary["errors"],
+        }
+
+    pool_metrics = pool.metrics()
+    pool.close()
+    return {
+        "entry_point": entry_point,
+        "import_seconds": import_seconds,
+        "startup_seconds": startup_seconds,
+        "rebuild_seconds": rebuild_seconds,
+        "latency": {
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies),
+        },
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": throughput,
+        "input_tokens": sum(result["input_tokens"] for result in results),
+        "output_tokens": sum(result["output_tokens"] for result in results),
+        "mcp_calls": sum(server["calls"] for server in pool_metrics.values()),
+        # ru_maxrss is in kilobytes on Linux; children are the stub servers
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(entry_point, args):
+    # a fresh interpreter per entry point keeps startup and peak memory independent
+    with tempfile.TemporaryDirectory() as work_dir:
+        output = os.path.join(work_dir, "result.json")
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            entry_point,
+            "--tasks", str(args.tasks),
+            "--concurrency", *map(str, args.concurrency),
+            "--latency", str(args.latency),
+            "--tool-latency", str(args.tool_latency),
+            "--single", output,
+        ]
+        env = {**os.environ, "HF_HUB_OFFLINE": "1"}
+        for key, value in DUMMY_ENV.items():
+            env.setdefault(key, value)
+        # tools like create_file write into the working directory
+        process = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+        if process.returncode != 0 or not os.path.exists(output):
+            return {"entry_point": entry_point, "failed": process.stderr.strip().splitlines()[-1:] or ["no output"]}
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def print_results(results, baseline=None):
+    baseline = {result["entry_point"]: result for result in (baseline or {}).get("results", [])}
+    print(f"{'entry point':<26} {'startup s':>9} {'p50 s':>7} {'p95 s':>7} {'tasks/s':>16} {'rss MB':>7}  errors")
+    for result in results:
+        if "failed" in result:
+            print(f"{result['entry_point']:<26} failed: {result['failed'][0]}")
+            continue
+        throughput = " ".join(f"{value['tasks_per_second']:.1f}" for value in result["throughput"].values())
+        print(
+            f"{result['entry_point']:<26} {result['startup_seconds']:>9.2f} {result['latency']['p50']:>7.3f} "
+            f"{result['latency']['p95']:>7.3f} {throughput:>16} {result['peak_rss_mb']:>7.0f}  {result['errors']}"
+        )
+        previous = baseline.get(result["entry_point"])
+        if previous and "failed" not in previous:
+            changes = []
+            for label, old, new in [
+                ("startup", previous["startup_seconds"], result["startup_seconds"]),
+                ("p50", previous["latency"]["p50"], result["latency"]["p50"]),
+                ("p95", previous["latency"]["p95"], result["latency"]["p95"]),
+                ("rss", previous["peak_rss_mb"], result["peak_rss_mb"]),
+            ]:
+                if old:
+                    changes.append(f"{label} {(new - old) / old:+.0%}")
+            print(f"{'':<26} vs baseline: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the example agents offline.")
+    parser.add_argument("entry_points", nargs="*", default=ENTRY_POINTS, help="scripts to benchmark (default: all)")
+    parser.add_argument("-n", "--tasks", type=int, default=20, help="tasks per measurement")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 4, 8], help="worker counts for throughput")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model seconds per call")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="stub MCP tool seconds per call")
+    parser.add_argument("-o", "--output", help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        # child process: benchmark one entry point and write its result
+        sys.path.insert(0, BENCHMARKS_DIR)
+        result = bench_entry_point(args.entry_points[0], args.tasks, args.concurrency, args.latency, args.tool_latency)
+        with open(args.single, "w", encoding="utf-8") as f:
+            json.dump(result, f, default=str)
+        return
+
+    results = []
+    for entry_point in args.entry_points:
+        print(f"benchmarking {entry_point}...", file=sys.stderr)
+        results.append(run_isolated(entry_point, args))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "settings": {
+            "tasks": args.tasks,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "tool_latency": args.tool_latency,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"\nsaved {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# stub stdio mcp servers standing in for the real ones in the benchmarks
+import argparse
+import json
+import time
+import zlib
+
+from mcp.server.fastmcp import FastMCP
+
+# tool names and arguments per pool name, shaped like the real servers' catalogs
+STUB_TOOLS = {
+    "domain": {"check_domain": ["domain"], "check_domains": ["domains"]},
+    "google_calendar": {"list_events": ["calendar_id"], "create_event": ["summary", "start", "end"]},
+    "newsfeed": {"get_headlines": ["topic"], "search_news": ["query"]},
+    "notion": {"search": ["query"], "retrieve_page": ["page_id"], "create_page": ["title", "content"]},
+    "rime": {"text_to_speech": ["text", "speaker"]},
+    "replicate": {"search_models": ["query"], "create_prediction": ["model", "prompt"]},
+}
+
+
+def make_tool(server, name, parameters, latency):
+    def stub(**kwargs):
+        time.sleep(latency)
+        return json.dumps({"server": server, "tool": name, "arguments": kwargs, "result": "ok"})
+
+    # fastmcp reads the tool's inputs from its signature
+    arguments = ", ".join(f"{parameter}: str" for parameter in parameters)
+    namespace = {"stub": stub}
+    exec(f"def {name}({arguments}):\n    return stub({', '.join(f'{p}={p}' for p in parameters)})", namespace)
+    function = namespace[name]
+    function.__doc__ = f"Stub of the {server} server's {name} tool."
+    return function
+
+
+def make_check_domains(latency):
+    # answers like FastDomainCheck, so domain_batch can parse it; about half the names are taken
+    def check_domains(domains: list[str]) -> str:
+        """Stub of the domain server's check_domains tool."""
+        time.sleep(latency)
+        return json.dumps({"results": {domain: {"registered": zlib.crc32(domain.encode()) % 2 == 0} for domain in domains}})
+
+    return check_domains
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub MCP server over stdio.")
+    parser.add_argument("server", choices=sorted(STUB_TOOLS))
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds each tool call takes")
+    args = parser.parse_args()
+
+    mcp = FastMCP(f"stub-{args.server}")
+    for name, parameters in STUB_TOOLS[args.server].items():
+        mcp.add_tool(make_tool(args.server, name, parameters, args.latency))
+    if args.server == "domain":
+        mcp.remove_tool("check_domains")
+        mcp.add_tool(make_check_domains(args.latency))
+    mcp.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+# check large lists of candidate domain names in chunks through the FastDomainCheck mcp server
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from smolagents import Tool
+
+DOMAIN_SERVER_BINARY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "mcp", "FastDomainCheck-MCP-Server", "FastDomainCheck-MCP-Server"
+)
+
+# FastDomainCheck accepts at most 50 domains per request
+MAX_CHUNK_SIZE = 50
+
+_DOMAIN = re.compile(r"^(?=.{1,253}$)([a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$")
+
+
+def candidates(names, tlds=("com",)):
+    """Full domain names for `names`: names without a TLD are tried with each of `tlds`."""
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if "." in name:
+            yield name
+        else:
+            for tld in tlds:
+                yield f"{name}.{tld.lstrip('.')}"
+
+
+def _parse(result):
+    # {"results": {"example.com": {"registered": true}, ...}} as text content
+    text = "".join(getattr(content, "text", "") or "" for content in result.content)
+    if getattr(result, "isError", False):
+        raise RuntimeError(text or "check_domains failed")
+    data = json.loads(text)
+    return data.get("results", data)
+
+
+class DomainChecker:
+    """Checks many domain names, a chunk per `check_domains` call, several chunks at a time.
+
+    Names are normalized and deduplicated; invalid ones are reported without being
+    sent. Results stream back as chunks finish, so thousands of candidates take
+    about `len(domains) / (chunk_size * concurrency)` round-trips, and only
+    `2 * concurrency` chunks are held at once.
+
+    Args:
+        server: Pool name of the FastDomainCheck server, registered beforehand.
+        chunk_size: Domains per call, at most 50.
+        max_concurrency: Calls running at the same time, at most the server's
+            replicas in the pool: calls sharing a server process would only queue
+            behind each other, and time out.
+        pool: The `MCPServerPool`, defaults to the process-wide one.
+    """
+
+    def __init__(self, server="domain", chunk_size=MAX_CHUNK_SIZE, max_concurrency=4, pool=None):
+        self.server = server
+        self.chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+        self.max_concurrency = max_concurrency
+        if pool is None:
+            from mcp_pool import get_pool
+
+            pool = get_pool()
+        self.pool = pool
+
+    def check_chunk(self, domains):
+        """Results for one chunk, in order: `{"domain", "available"}` or `{"domain", "error"}`."""
+        try:
+            results = _parse(self.pool.call(self.server, "check_domains", {"domains": domains}))
+        except Exception as e:
+            return [{"domain": domain, "error": f"{type(e).__name__}: {e}"} for domain in domains]
+        checked = []
+        for domain in domains:
+            result = results.get(domain)
+            if isinstance(result, dict) and "registered" in result:
+                checked.append({"domain": domain, "available": not result["registered"]})
+            else:
+                checked.append({"domain": domain, "error": "missing from the server's response"})
+        return checked
+
+    @property
+    def concurrency(self):
+        """Calls actually run at once: `max_concurrency`, limited to the server's replicas."""
+        return max(1, min(self.max_concurrency, self.pool.max_replicas(self.server)))
+
+    def check_iter(self, domains):
+        """Yields one result per distinct domain, in the order chunks finish."""
+        chunks = self._chunks(domains)
+        concurrency = self.concurrency
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            while True:
+                # keep the workers busy with a bounded number of chunks queued behind them
+                for chunk in islice(chunks, 2 * concurrency - len(pending)):
+                    if isinstance(chunk, dict):
+                        yield chunk
+                    else:
+                        pending.add(executor.submit(self.check_chunk, chunk))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+    def check(self, domains):
+        """All results at once: `{"available": [...], "registered": [...], "errors": {domain: error}}`."""
+        summary = {"available": [], "registered": [], "errors": {}}
+        for result in self.check_iter(domains):
+            if "error" in result:
+                summary["errors"][result["domain"]] = result["error"]
+            else:
+                summary["available" if result["available"] else "registered"].append(result["domain"])
+        return summary
+
+    def _chunks(self, domains):
+        # yields lists of valid domains, and an error result for each invalid one
+        seen, chunk = set(), []
+        for domain in domains:
+            domain = domain.strip().lower().rstrip(".")
+            if domain in seen:
+                continue
+            seen.add(domain)
+            if not _DOMAIN.match(domain):
+                yield {"domain": domain, "error": "not a valid domain name"}
+                continue
+            chunk.append(domain)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class BulkDomainCheckTool(Tool):
+    """Checks a whole candidate list in one tool call instead of one call per domain."""
+
+    name = "check_domains_bulk"
+    description = (
+        "Checks which of many domain names are available to register, in one call. Pass every candidate at once "
+        "(hundreds or thousands are fine) instead of checking them one by one. Returns a dict with the 'available' "
+        "domains, the number 'registered', and 'errors' for domains that could not be checked."
+    )
+    inputs = {
+        "domains": {
+            "type": "array",
+            "description": "Candidate names, e.g. ['brewbot.io', 'brewbot']. Names without a TLD are tried with each of tlds.",
+        },
+        "tlds": {
+            "type": "array",
+            "description": "TLDs to try for names without one, e.g. ['com', 'io']. Defaults to ['com'].",
+            "nullable": True,
+        },
+    }
+    output_type = "object"
+
+    def __init__(self, checker=None, max_errors=20):
+        super().__init__()
+        self.checker = checker or DomainChecker()
+        self.max_errors = max_errors
+
+    def forward(self, domains, tlds=None):
+        summary = self.checker.check(candidates(domains, tlds or ["com"]))
+        errors = dict(islice(summary["errors"].items(), self.max_errors))
+        return {
+            "available": summary["available"],
+            "registered": len(summary["registered"]),
+            "errors": errors,
+            "error_count": len(summary["errors"]),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check candidate domain names in bulk, streaming JSONL results.")
+    parser.add_argument("names", nargs="?", default="-", help="file of names or domains, one per line, '-' for stdin")
+    parser.add_argument("--tlds", nargs="+", default=["com"], help="TLDs tried for names without one")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="chunks checked at the same time")
+    parser.add_argument("--chunk-size", type=int, default=MAX_CHUNK_SIZE, help="domains per server call (max 50)")
+    parser.add_argument("--available-only", action="store_true", help="only print available domains")
+    args = parser.parse_args()
+
+    from mcp import StdioServerParameters
+
+    from mcp_pool import get_pool
+
+    pool = get_pool()
+    # one server process per concurrent chunk
+    server_parameters = StdioServerParameters(command=DOMAIN_SERVER_BINARY, args=[], env=os.environ.copy())
+    pool.register("domain", server_parameters, size=args.concurrency)
+    checker = DomainChecker(chunk_size=args.chunk_size, max_concurrency=args.concurrency, pool=pool)
+
+    names = sys.stdin if args.names == "-" else open(args.names, encoding="utf-8")
+    with names:
+        for result in checker.check_iter(candidates(names, args.tlds)):
+            if args.available_only and not result.get("available"):
+                continue
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,46 @@
 # drink_making_agent.py — for a SmolAgents Workshop Mocktail Station
 from dotenv import load_dotenv
-from smolagents import CodeAgent, InferenceClientModel, GradioUI, tool
+from smolagents import tool
+from agent_factory import create_agent
+from recipe_engine import RecipeEngine, load_inventory
+from session_server import serve
+import argparse
+import os
 import random
 
 load_dotenv()
 
+# A text file (one ingredient per line) or JSON list to use instead of INGREDIENTS, e.g. a venue's full inventory
+INVENTORY_PATH = os.getenv("MOCKTAIL_INVENTORY")
+
+# Participants can add or remove ingredients here to match their setup
+INGREDIENTS = (
+    "Pineapple seltzer",
+    "Lime seltzer",
+    "Iced coffee",
+    "Limes",
+    "Lemons",
+    "Cranberry juice",
+    "Watermelon lemonade seltzer",
+    "Black cherry vanilla seltzer",
+    "Plain seltzer",
+    "Oranges",
+    "Jalapeno limeade",
+    "Margarita mix",
+)
+
+# Recipes for unseeded calls, from one shared random generator
+engine_random = random.Random()
+
 @tool
 def get_available_ingredients() -> list[str]:
     """
     Returns a list of available mocktail ingredients.
-    Participants can add or remove ingredients from this function to match their setup.
     """
-    return [
-        "Pineapple seltzer",
-        "Lime seltzer",
-        "Iced coffee",
-        "Limes",
-        "Lemons",
-        "Cranberry juice",
-        "Watermelon lemonade seltzer",
-        "Black cherry vanilla seltzer",
-        "Plain seltzer",
-        "Oranges",
-        "Jalapeno limeade",
-        "Margarita mix",
-    ]
+    return list(load_inventory(INVENTORY_PATH) if INVENTORY_PATH else INGREDIENTS)
 
 @tool
-def drink_generator(name: str, ingredients: list[str]) -> str:
+def drink_generator(name: str, ingredients: list[str], seed: int | None = None) -> str:
     """
     Given a mocktail name and list of ingredients, returns a fun recipe script.
     The agent can choose how to interpret the name — literally, by vibe, or through flavor logic.
@@ -35,31 +48,40 @@ def drink_generator(name: str, ingredients: list[str]) -> str:
     Args:
         name (str): A name or theme for the drink (e.g. 'Sunset Glow', 'Boss Energy').
         ingredients (list[str]): List of available ingredients.
+        seed (int): Optional seed; the same seed, name and ingredients give the same recipe.
 
     Returns:
         A whimsical mocktail recipe script as a string.
     """
-    base = random.choice([i for i in ingredients if "seltzer" in i or "juice" in i])
-    citrus = random.choice([i for i in ingredients if "lime" in i.lower() or "lemon" in i.lower() or "orange" in i.lower()])
-    twist = random.choice([i for i in ingredients if i not in [base, citrus]])
-
-    steps = [
-        f"🔸 Start with a cold glass — chilled like your best ideas.",
-        f"🔸 Pour 3 oz of {base} as your base — fizzy foundations matter.",
-        f"🔸 Add a squeeze of {citrus} for a zesty punch.",
-        f"🔸 Stir in a dash of {twist} — trust your instincts here.",
-        f"🔸 Optional: Garnish with something that sparks joy.",
-        f"🔸 Name your creation: *{name}*. Serve with flair.",
-    ]
-    
-    return "\n".join(steps)
+    return recipe_engine(ingredients, seed).recipe(name)
 
-def main():
-    model = InferenceClientModel(model_id="Qwen/Qwen2.5-72B-Instruct")
+@tool
+def generate_recipes(names: list[str], ingredients: list[str], seed: int | None = None) -> list[str]:
+    """
+    Generates one recipe per drink name in a single call, no two with the same base, citrus and twist.
+    Use it instead of calling drink_generator once per drink when several guests or drinks are wanted.
+
+    Args:
+        names (list[str]): A name or theme for each drink.
+        ingredients (list[str]): List of available ingredients.
+        seed (int): Optional seed; the same seed, names and ingredients give the same recipes.
+
+    Returns:
+        A recipe script per name, in the same order.
+    """
+    return recipe_engine(ingredients, seed).batch(names)
+
+def recipe_engine(ingredients, seed):
+    # The ingredient index is built once per ingredient list and shared by every engine
+    engine = RecipeEngine(ingredients, seed)
+    if seed is None:
+        engine.random = engine_random
+    return engine
 
-    agent = CodeAgent(
-        tools=[get_available_ingredients, drink_generator],
+def build_agent(model=None):
+    agent = create_agent(
         model=model,
+        tools=[get_available_ingredients, drink_generator, generate_recipes],
         add_base_tools=True,
         name="mocktail_maker",
         description=(
@@ -68,10 +90,20 @@ def main():
             "The tools don't prescribe; they invite creativity and experimentation."
         ),
     )
+    return agent
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the mocktail agent to many users.")
+    parser.add_argument("--trace", action="store_true", help="write a Chrome trace of the latest runs to traces/drink_making_agent.json")
+    args = parser.parse_args()
 
     print("🍹 Welcome to the Mocktail Station 🍹\nType a drink name and let the agent invent something delicious.\nType 'exit' to leave.")
 
-    GradioUI(agent).launch()
+    # Every browser session gets its own agent, sharing the model client and tools;
+    # at most 8 runs execute at once and up to 64 more wait in the queue.
+    # Tokens and steps stream into the chat; with --trace, runs are traced to traces/ for profiling
+    trace = os.path.join("traces", "drink_making_agent.json") if args.trace else None
+    serve(build_agent, concurrency_limit=8, max_queue=64, trace=trace)
 
 if __name__ == "__main__":
     main()
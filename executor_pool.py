@@ -0,0 +1,466 @@
+# pool of pre-warmed worker processes running agents' code steps
+import atexit
+import builtins
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+
+from smolagents.local_python_executor import CodeOutput, InterpreterError, LocalPythonExecutor, PythonExecutor
+
+# imported once in the fork server, so workers start with them loaded
+DEFAULT_PRELOAD = ("numpy", "pandas")
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def _picklable(value):
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return repr(value)
+
+
+def _remote_error(type_name, message):
+    # re-raise builtin exception types as themselves, so error messages read like local ones
+    error_type = getattr(builtins, type_name, None)
+    if isinstance(error_type, type) and issubclass(error_type, Exception):
+        try:
+            return error_type(message)
+        except Exception:
+            pass
+    return RuntimeError(f"{type_name}: {message}")
+
+
+def _remote_tool(conn, name):
+    # runs the tool in the parent process, where its connections and state live
+    def call(*args, **kwargs):
+        conn.send(("call", name, args, kwargs))
+        reply = conn.recv()
+        if reply[0] == "error":
+            raise _remote_error(reply[1], reply[2])
+        return reply[1]
+
+    call.__name__ = name
+    return call
+
+
+def _set_memory_limit(memory_mb):
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _set_cpu_limit(cpu_seconds):
+    # RLIMIT_CPU counts the process's whole life, so each step gets its budget on top of what was used
+    try:
+        import resource
+    except ImportError:
+        return
+    if cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        soft = used + cpu_seconds if hard == resource.RLIM_INFINITY else min(used + cpu_seconds, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_mb, cpu_seconds):
+    _set_memory_limit(memory_mb)
+    executor = None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        kind = message[0]
+        try:
+            if kind == "setup":
+                _, authorized_imports, max_print_outputs_length, tool_names, variables = message
+                # tools can change during a lease, the code's variables are kept then
+                if executor is None or executor.additional_authorized_imports != authorized_imports:
+                    executor = LocalPythonExecutor(
+                        authorized_imports, max_print_outputs_length=max_print_outputs_length, timeout_seconds=None
+                    )
+                executor.send_variables(variables)
+                executor.send_tools({name: _remote_tool(conn, name) for name in tool_names})
+                conn.send(("ok",))
+            elif kind == "variables":
+                if executor is None:
+                    raise InterpreterError("The worker was not set up for these variables")
+                executor.send_variables(message[1])
+                conn.send(("ok",))
+            elif kind == "run":
+                _set_cpu_limit(cpu_seconds)
+                output = executor(message[1])
+                conn.send(("done", _picklable(output.output), output.logs, output.is_final_answer))
+            elif kind == "reset":
+                executor = None
+                conn.send(("ok",))
+        except Exception as e:
+            logs = str(executor.state.get("_print_outputs", "")) if executor is not None else ""
+            conn.send(("error", type(e).__name__, str(e), logs))
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, memory_mb, cpu_seconds):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_mb, cpu_seconds), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def request(self, message, tools=None, timeout=None):
+        """Sends `message` and returns the reply, serving the worker's tool calls meanwhile.
+
+        `timeout` counts time spent in the worker only, not in the tools it calls.
+        """
+        try:
+            self.conn.send(message)
+        except (BrokenPipeError, OSError):
+            raise WorkerDied(self.exit_reason()) from None
+        remaining = timeout
+        while True:
+            started = time.monotonic()
+            if not self.conn.poll(remaining):
+                raise TimeoutError
+            try:
+                reply = self.conn.recv()
+            except (EOFError, OSError):
+                raise WorkerDied(self.exit_reason()) from None
+            if remaining is not None:
+                remaining = max(0.0, remaining - (time.monotonic() - started))
+            if reply[0] != "call":
+                return reply
+            _, name, args, kwargs = reply
+            try:
+                result = ("ok", tools[name](*args, **kwargs))
+            except Exception as e:
+                result = ("error", type(e).__name__, str(e))
+            try:
+                self.conn.send(result)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                self.conn.send(("error", "TypeError", f"{name} returned a {type(result[1]).__name__}, which can't be sent to the worker"))
+
+    def exit_reason(self):
+        self.process.join(timeout=1)
+        code = self.process.exitcode
+        if code == -getattr(signal, "SIGXCPU", -1):
+            return "the code step used up its CPU time limit"
+        if code == -signal.SIGKILL:
+            return "the worker was killed, probably for running out of memory"
+        return f"the worker exited with code {code}"
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+
+
+def _context(preload):
+    # a fork server imports the preloaded packages once; every worker is forked from it already warm
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__, *preload])
+    return context
+
+
+class WorkerPool:
+    """Worker processes that agents lease to run their code steps.
+
+    `size` workers are started in the background and kept warm; when all of them
+    are leased (e.g. by managed agents whose manager holds a worker), more are
+    started and stopped again once returned. A returned worker forgets the
+    lease's variables, and is replaced after `max_tasks` code steps. Each worker
+    is limited to `memory_mb` of address space and each step to `cpu_seconds` of
+    CPU and `timeout` seconds outside of tool calls; a worker over a limit is
+    killed and replaced.
+
+    Args:
+        size: Workers kept warm, defaults to the number of CPUs.
+        preload: Packages imported before forking, e.g. the agents' `additional_authorized_imports`.
+            The fork server is shared by every pool in the process, so the first pool's list is used.
+        memory_mb: Address space limit per worker, None for no limit.
+        cpu_seconds: CPU time limit per code step, None for no limit.
+        timeout: Wall-clock limit per code step, None for no limit.
+        max_tasks: Code steps a worker runs before it is replaced.
+    """
+
+    def __init__(self, size=None, preload=DEFAULT_PRELOAD, memory_mb=2048, cpu_seconds=60, timeout=120, max_tasks=200):
+        self.size = size or os.cpu_count() or 1
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.stats = {"started": 0, "leases": 0, "tasks": 0, "recycled": 0, "killed": 0}
+        self._context = _context(preload)
+        self._idle = []
+        self._leased = 0
+        self._starting = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        atexit.register(self.close)
+        self._replenish()
+
+    def acquire(self):
+        """Leases a worker, starting one if none is idle."""
+        with self._condition:
+            # a worker that is already starting is sooner than a new one
+            while not self._idle and self._starting and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("The worker pool is closed")
+            worker = None
+            while self._idle and worker is None:
+                worker = self._idle.pop()
+                if not worker.is_alive():
+                    worker = None
+            self._leased += 1
+            self.stats["leases"] += 1
+        if worker is None:
+            try:
+                worker = self._start()
+            except Exception:
+                with self._condition:
+                    self._leased -= 1
+                raise
+        return worker
+
+    def release(self, worker):
+        """Returns a leased worker, resetting it or replacing it if it is worn out."""
+        keep = worker.is_alive() and worker.tasks < self.max_tasks
+        if keep:
+            try:
+                keep = worker.request(("reset",), timeout=5)[0] == "ok"
+            except (WorkerDied, TimeoutError):
+                keep = False
+        with self._condition:
+            self._leased -= 1
+            if not worker.is_alive() or worker.tasks >= self.max_tasks:
+                self.stats["recycled"] += 1
+            keep = keep and not self._closed and len(self._idle) + self._leased < self.size
+            if keep:
+                self._idle.append(worker)
+                self._condition.notify()
+        if not keep:
+            worker.stop()
+            self._replenish()
+
+    def discard(self, worker):
+        """Kills a leased worker, e.g. one that ran over its time limit."""
+        worker.stop()
+        with self._condition:
+            self._leased -= 1
+            self.stats["killed"] += 1
+        self._replenish()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def _start(self):
+        worker = _Worker(self._context, self.memory_mb, self.cpu_seconds)
+        with self._condition:
+            self.stats["started"] += 1
+        return worker
+
+    def _replenish(self):
+        # tops the pool back up to `size` workers in the background
+        with self._condition:
+            missing = self.size - len(self._idle) - self._leased - self._starting
+            if self._closed or missing <= 0:
+                return
+            self._starting += missing
+
+        def start():
+            for _ in range(missing):
+                try:
+                    worker = self._start()
+                except Exception as e:
+                    worker = None
+                    print(f"Could not start a code worker: {e}")
+                with self._condition:
+                    self._starting -= 1
+                    if worker is not None and not self._closed:
+                        self._idle.append(worker)
+                    elif worker is not None:
+                        worker.stop()
+                    self._condition.notify_all()
+
+        threading.Thread(target=start, daemon=True).start()
+
+
+class PooledExecutor(PythonExecutor):
+    """Drop-in for `LocalPythonExecutor` that runs code in a leased worker process.
+
+    The worker is leased when a run starts (`send_tools`) and kept across its
+    steps; `release()` returns it. Tools and managed agents stay in this process:
+    the code calls them through the worker's pipe. Variables and results cross
+    the pipe pickled, unpicklable results come back as their `repr`.
+    """
+
+    def __init__(self, pool, additional_authorized_imports=(), max_print_outputs_length=None):
+        self.pool = pool
+        self.additional_authorized_imports = list(additional_authorized_imports)
+        self.max_print_outputs_length = max_print_outputs_length
+        self.state = {"_print_outputs": ""}
+        self._tools = {}
+        self._variables = {}
+        self._worker = None
+        self._tools_sent = False
+        self._lock = threading.Lock()
+
+    def send_variables(self, variables):
+        self._variables.update({name: _picklable(value) for name, value in variables.items()})
+        # a worker not set up yet gets them with its setup
+        if self._worker is not None and self._tools_sent:
+            reply = self._request(("variables", self._variables))
+            if reply[0] == "error":
+                raise InterpreterError(reply[2])
+
+    def send_tools(self, tools):
+        # may be called by a tool while the worker runs code, so the tools go with the next step
+        self._tools = dict(tools)
+        self._tools_sent = False
+        self._lease()
+
+    def __call__(self, code_action):
+        worker = self._lease()
+        if not self._tools_sent:
+            self._setup(worker)
+        worker.tasks += 1
+        self.pool.stats["tasks"] += 1
+        kind, *reply = self._request(("run", code_action), timeout=self.pool.timeout)
+        if kind == "error":
+            type_name, message, logs = reply
+            self.state["_print_outputs"] = logs
+            raise InterpreterError(message) if type_name == "InterpreterError" else _remote_error(type_name, message)
+        output, logs, is_final_answer = reply
+        self.state["_print_outputs"] = logs
+        return CodeOutput(output=output, logs=logs, is_final_answer=is_final_answer)
+
+    def release(self):
+        """Returns the worker to the pool; the next run leases one again."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self.pool.release(worker)
+
+    def cleanup(self):
+        self.release()
+
+    def _lease(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = self.pool.acquire()
+                self._tools_sent = False
+            return self._worker
+
+    def _setup(self, worker):
+        reply = self._request(
+            (
+                "setup",
+                self.additional_authorized_imports,
+                self.max_print_outputs_length,
+                list(self._tools),
+                self._variables,
+            ),
+            timeout=30,
+        )
+        if reply[0] == "error":
+            raise InterpreterError(reply[2])
+        self._tools_sent = True
+
+    def _request(self, message, timeout=None):
+        worker = self._worker
+        try:
+            return worker.request(message, self._tools, timeout)
+        except TimeoutError:
+            self._lose_worker(worker)
+            raise InterpreterError(
+                f"Code execution took longer than {timeout}s and was stopped; variables from earlier steps are lost"
+            ) from None
+        except WorkerDied as e:
+            self._lose_worker(worker)
+            raise InterpreterError(f"Code execution failed: {e}; variables from earlier steps are lost") from None
+
+    def _lose_worker(self, worker):
+        with self._lock:
+            if self._worker is worker:
+                self._worker = None
+        self.pool.discard(worker)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_worker_pool():
+    """The process-wide pool, created on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WorkerPool()
+        return _default_pool
+
+
+def use_worker_pool(agent, pool=None):
+    """Runs the code steps of `agent` and its managed agents in workers leased from `pool`.
+
+    Each agent leases a worker for the length of a run and returns it when the
+    run ends, however it ends. Call before instrumenting the agent with a `Tracer`.
+    """
+    pool = pool or default_worker_pool()
+    agents = [agent]
+    while agents:
+        member = agents.pop()
+        agents.extend(getattr(member, "managed_agents", {}).values())
+        if getattr(member, "python_executor", None) is None:
+            continue
+        executor = PooledExecutor(pool, member.additional_authorized_imports, member.max_print_outputs_length)
+        member.python_executor = executor
+        member.run = _releasing(member.run, executor)
+    return agent
+
+
+def _releasing(run, executor):
+    # returns the worker when the run is over: answered, failed, interrupted or its stream closed
+    def run_and_release(task, *args, **kwargs):
+        if kwargs.get("stream", args[0] if args else False):
+            return _release_after(run(task, *args, **kwargs), executor)
+        try:
+            return run(task, *args, **kwargs)
+        finally:
+            executor.release()
+
+    return run_and_release
+
+
+def _release_after(events, executor):
+    try:
+        yield from events
+    finally:
+        executor.release()
@@ -0,0 +1,102 @@
+# run several managed-agent calls at the same time
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from smolagents import Tool
+
+# seconds an interrupted sub-agent gets to stop at its next step before the manager stops waiting for it
+INTERRUPT_GRACE = 5
+
+
+class DispatchTool(Tool):
+    """Lets a manager agent call several of its managed agents in parallel.
+
+    Calls to the same agent are still run one after another (an agent has a single
+    memory), calls to different agents overlap, so a fan-out takes about as long as
+    its slowest sub-agent.
+
+    Args:
+        agents: The managed agents that can be dispatched to.
+        max_concurrency: Maximum number of sub-agent calls running at once.
+        timeout: Seconds a sub-agent may run before it is interrupted (at its next step).
+            One stuck inside a step is reported as timed out and left to stop in the
+            background, so the manager never waits much longer than the fan-out should take.
+    """
+
+    name = "dispatch_agents"
+    description = (
+        "Runs several team member calls at the same time and returns their answers in order. "
+        "Use it instead of calling team members one by one when their subtasks do not depend on each other."
+    )
+    inputs = {
+        "calls": {
+            "type": "array",
+            "description": "List of calls, each a dict like {'agent': 'research_agent', 'task': 'detailed task'}.",
+        }
+    }
+    output_type = "array"
+
+    def __init__(self, agents, max_concurrency=4, timeout=300):
+        super().__init__()
+        self.agents = {agent.name: agent for agent in agents}
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._locks = {name: threading.Lock() for name in self.agents}
+        self.description += f" Available team members: {', '.join(self.agents)}."
+
+    def forward(self, calls):
+        for call in calls:
+            if call.get("agent") not in self.agents:
+                raise ValueError(f"Unknown team member '{call.get('agent')}', choose from {list(self.agents)}")
+
+        slots = threading.Semaphore(self.max_concurrency)
+        abandoned = threading.Event()
+
+        def run(call):
+            agent = self.agents[call["agent"]]
+            with slots, self._locks[call["agent"]]:
+                if abandoned.is_set():
+                    # the manager stopped waiting while this call was queued
+                    return None
+                # the clock starts once the sub-agent actually runs, not while it is queued
+                timer = threading.Timer(self.timeout, agent.interrupt)
+                timer.start()
+                try:
+                    return {"agent": call["agent"], "task": call["task"], "result": agent(call["task"])}
+                except Exception as e:
+                    error = f"timed out after {self.timeout}s" if not timer.is_alive() else f"{type(e).__name__}: {e}"
+                    return {"agent": call["agent"], "task": call["task"], "error": error}
+                finally:
+                    timer.cancel()
+
+        # calls run `timeout` each, in rounds: queued behind calls to the same agent or for a free slot
+        per_agent = Counter(call["agent"] for call in calls)
+        rounds = max(max(per_agent.values(), default=0), math.ceil(len(calls) / self.max_concurrency))
+        deadline = time.monotonic() + rounds * self.timeout + INTERRUPT_GRACE
+        futures = []
+        for call in calls:
+            future = Future()
+            # daemon threads: a sub-agent stuck in a step holds up neither the manager nor the process's exit
+            threading.Thread(target=lambda call=call, future=future: future.set_result(run(call)), daemon=True).start()
+            futures.append(future)
+        results = []
+        try:
+            for call, future in zip(calls, futures):
+                try:
+                    results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+                except FutureTimeoutError:
+                    self.agents[call["agent"]].interrupt()
+                    results.append(
+                        {
+                            "agent": call["agent"],
+                            "task": call["task"],
+                            "error": f"timed out after {self.timeout}s, interrupted in the background",
+                        }
+                    )
+        finally:
+            abandoned.set()
+        return results
@@ -0,0 +1,331 @@
+# file tools for large outputs: appends, chunked atomic writes, bulk writes and mmap reads
+import atexit
+import itertools
+import mmap
+import os
+import shutil
+import threading
+
+from smolagents import tool
+
+# most text a read returns at once, so a multi-GB file is read a window at a time
+MAX_READ_CHARS = 1_000_000
+
+
+def _ensure_dir(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def _temp_file(path):
+    # in the target's directory, so the final rename stays on one filesystem and is atomic
+    _ensure_dir(path)
+    directory, name = os.path.split(os.path.abspath(path))
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{os.urandom(4).hex()}.tmp")
+        try:
+            # created like any new file, so the umask applies (mkstemp would make it private)
+            handle = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            continue
+    if os.path.exists(path):
+        # a replaced file keeps its mode
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+    return os.fdopen(handle, "w", encoding="utf-8"), temp_path
+
+
+def _commit(f, temp_path, path):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(temp_path, path)
+
+
+def _discard(f, temp_path):
+    f.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def _backup(path, temp_path):
+    # a second name for the file about to be replaced, so it can be put back; None if there is none
+    if not os.path.exists(path):
+        return None
+    backup_path = f"{temp_path}.bak"
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        shutil.copy2(path, backup_path)
+    return backup_path
+
+
+def _restore(replaced):
+    # puts back the files write_files replaced, newest first; False if one could not be
+    restored = True
+    for path, backup_path in reversed(replaced):
+        try:
+            if backup_path is None:
+                os.remove(path)
+            else:
+                os.replace(backup_path, path)
+        except OSError:
+            restored = False
+    return restored
+
+
+def atomic_write(path, chunks):
+    """Writes text `chunks` to a temp file and renames it over `path`: readers see the old file or the whole new one."""
+    f, temp_path = _temp_file(path)
+    try:
+        for chunk in chunks:
+            f.write(chunk)
+        _commit(f, temp_path, path)
+    except BaseException:
+        _discard(f, temp_path)
+        raise
+
+
+class _Writers:
+    # open chunked writes, by handle; each is a temp file until committed
+    def __init__(self):
+        self._files = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def open(self, path, append=False):
+        f, temp_path = _temp_file(path)
+        if append and os.path.exists(path):
+            f.close()
+            with open(path, "rb") as source, open(temp_path, "wb") as target:
+                while chunk := source.read(1 << 20):
+                    target.write(chunk)
+            f = open(temp_path, "a", encoding="utf-8")
+        with self._lock:
+            handle = f"w{next(self._ids)}"
+            self._files[handle] = (f, temp_path, path)
+        return handle
+
+    def get(self, handle):
+        with self._lock:
+            if handle not in self._files:
+                raise ValueError(f"No open file writer '{handle}'")
+            return self._files[handle]
+
+    def close(self, handle, commit):
+        f, temp_path, path = self.get(handle)
+        with self._lock:
+            self._files.pop(handle, None)
+        if commit:
+            _commit(f, temp_path, path)
+        else:
+            _discard(f, temp_path)
+        return path
+
+    def abort_all(self):
+        with self._lock:
+            files, self._files = self._files, {}
+        for f, temp_path, _ in files.values():
+            _discard(f, temp_path)
+
+
+_writers = _Writers()
+# writes never committed leave the original files as they were
+atexit.register(_writers.abort_all)
+
+
+@tool
+def append_to_file(path: str, content: str) -> str:
+    """
+    Appends content to the end of a file, creating it if needed. Use it to build large files piece by piece.
+
+    Args:
+        path: The filesystem path of the file.
+        content: The text to add at the end of the file.
+
+    Returns:
+        The file's new size, or an error.
+    """
+    try:
+        _ensure_dir(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(content)
+        return f"Appended to {path}, now {os.path.getsize(path):,} bytes"
+    except Exception as e:
+        return f"Error appending to file: {e}"
+
+
+@tool
+def open_file_writer(path: str, append: bool = False) -> str:
+    """
+    Starts writing a file in chunks. Nothing is visible at `path` until close_file_writer commits it, so a failure
+    halfway leaves the existing file untouched. Use it for large outputs: write_chunk each piece as it is produced
+    instead of building the whole content in memory.
+
+    Args:
+        path: The filesystem path of the file to write.
+        append: Whether to start from the existing file's content instead of an empty file.
+
+    Returns:
+        A writer handle to pass to write_chunk and close_file_writer, or an error.
+    """
+    try:
+        return _writers.open(path, append)
+    except Exception as e:
+        return f"Error opening file writer: {e}"
+
+
+@tool
+def write_chunk(handle: str, content: str) -> str:
+    """
+    Writes the next chunk of a file opened with open_file_writer.
+
+    Args:
+        handle: The handle returned by open_file_writer.
+        content: The text to write after the previous chunks.
+
+    Returns:
+        The number of bytes written so far, or an error.
+    """
+    try:
+        f, _, _ = _writers.get(handle)
+        f.write(content)
+        return f"{f.tell():,} bytes written"
+    except Exception as e:
+        return f"Error writing chunk: {e}"
+
+
+@tool
+def close_file_writer(handle: str, commit: bool = True) -> str:
+    """
+    Finishes a file opened with open_file_writer, replacing the file at its path in one step.
+
+    Args:
+        handle: The handle returned by open_file_writer.
+        commit: False to throw the chunks away and leave the file as it was.
+
+    Returns:
+        Where the file was written, that it was discarded, or an error.
+    """
+    try:
+        path = _writers.close(handle, commit)
+        if not commit:
+            return f"Discarded the changes to {path}"
+        return f"File written at {path} ({os.path.getsize(path):,} bytes)"
+    except Exception as e:
+        return f"Error closing file writer: {e}"
+
+
+@tool
+def write_files(files: dict) -> str:
+    """
+    Writes several files in one call. Either all of them are written or, if one fails, the ones already
+    replaced are put back and none is changed.
+
+    Args:
+        files: A dict mapping each file path to its text content.
+
+    Returns:
+        The files written, or an error.
+    """
+    staged = []
+    try:
+        for path, content in files.items():
+            f, temp_path = _temp_file(path)
+            staged.append((f, temp_path, path))
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        for f, _, _ in staged:
+            f.close()
+    except Exception as e:
+        for f, temp_path, _ in staged:
+            _discard(f, temp_path)
+        return f"Error writing files, none was changed: {e}"
+    replaced = []
+    try:
+        for _, temp_path, path in staged:
+            backup_path = _backup(path, temp_path)
+            os.replace(temp_path, path)
+            replaced.append((path, backup_path))
+    except Exception as e:
+        restored = _restore(replaced)
+        for _, temp_path, _ in staged:
+            for leftover in (temp_path, f"{temp_path}.bak"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        if not restored:
+            return f"Error writing files, some may have changed: {e}"
+        return f"Error writing files, none was changed: {e}"
+    for _, backup_path in replaced:
+        if backup_path is not None:
+            os.remove(backup_path)
+    return f"Wrote {len(staged)} files: {', '.join(path for _, _, path in staged)}"
+
+
+@tool
+def read_file_chunk(path: str, offset: int = 0, length: int = 65536) -> str:
+    """
+    Reads part of a file, however large, without loading the rest of it. Read big files a window at a time.
+
+    Args:
+        path: The filesystem path of the file.
+        offset: The byte position to start reading at.
+        length: How many bytes to read (at most 1,000,000).
+
+    Returns:
+        The text in that range, after a header with the range and the file size, or an error.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0 or offset >= size:
+            return f"[{path}: {size:,} bytes, nothing at offset {offset:,}]"
+        length = min(length, MAX_READ_CHARS, size - offset)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[offset : offset + length].decode("utf-8", errors="replace")
+        return f"[{path}: bytes {offset:,}-{offset + length:,} of {size:,}]\n{text}"
+    except Exception as e:
+        return f"Error reading file: {e}"
+
+
+@tool
+def find_in_file(path: str, text: str, max_matches: int = 20) -> str:
+    """
+    Finds a text in a file of any size, without loading it. Use the offsets with read_file_chunk.
+
+    Args:
+        path: The filesystem path of the file.
+        text: The exact text to look for.
+        max_matches: The most matches to return.
+
+    Returns:
+        One line per match with its byte offset and the line it is on, or an error.
+    """
+    needle = text.encode("utf-8")
+    matches = []
+    try:
+        if not needle or os.path.getsize(path) == 0:
+            return "No matches"
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = data.find(needle)
+            while position >= 0 and len(matches) < max_matches:
+                start = data.rfind(b"\n", max(0, position - 200), position) + 1 or max(0, position - 200)
+                end = data.find(b"\n", position, position + 200)
+                line = data[start : end if end >= 0 else position + 200].decode("utf-8", errors="replace")
+                matches.append(f"{position}: {line}")
+                position = data.find(needle, position + len(needle))
+    except Exception as e:
+        return f"Error searching file: {e}"
+    return "\n".join(matches) or "No matches"
+
+
+FILE_TOOLS = [
+    append_to_file,
+    open_file_writer,
+    write_chunk,
+    close_file_writer,
+    write_files,
+    read_file_chunk,
+    find_in_file,
+]
@@ -0,0 +1,161 @@
+# start an entry point's repl right away and build its agent in the background
+import argparse
+import builtins
+import contextlib
+import os
+import sys
+import threading
+import time
+
+
+class ImportProfiler:
+    """Times the first import of each top-level package while active.
+
+    Each package is charged only its own time: packages it pulls in are timed
+    (and reported) separately. It replaces `builtins.__import__`, which is
+    process-wide: while active, imports on every thread go through it.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._local = threading.local()
+        self._import = None
+
+    def __enter__(self):
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        package = name.partition(".")[0]
+        if level or package in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        # stack of [package, time spent in packages it imported]
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append([package, 0.0])
+        started = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            _, nested = stack.pop()
+            self.times[package] = self.times.get(package, 0.0) + elapsed - nested
+            if stack:
+                stack[-1][1] += elapsed
+
+    def report(self, limit=10, file=None):
+        file = file or sys.stdout
+        total = sum(self.times.values())
+        print(f"imports: {total:.2f}s", file=file)
+        for package, seconds in sorted(self.times.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            print(f"  {package:<24} {seconds:>6.2f}s", file=file)
+
+
+class BackgroundAgent:
+    """Imports an entry point and builds its agent on a background thread.
+
+    Args:
+        path: Entry point script defining `build_agent()`, e.g. `3_mcp_notion.py`.
+        profile: Whether to time the imports with an :class:`ImportProfiler`.
+    """
+
+    def __init__(self, path, profile=False):
+        self.path = path
+        self.profiler = ImportProfiler() if profile else None
+        self.import_seconds = None
+        self.build_seconds = None
+        self.module = None
+        self._agent = None
+        self._error = None
+        self._started = time.perf_counter()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._load, daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            with self.profiler or contextlib.nullcontext():
+                from batch_runner import load_entry_point
+
+                self.module = load_entry_point(self.path)
+            self.import_seconds = time.perf_counter() - self._started
+            started = time.perf_counter()
+            self._agent = self.module.build_agent()
+            self.build_seconds = time.perf_counter() - started
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        """Waits for the agent and returns it, re-raising any startup error."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"{self.path} did not start within {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._agent
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        if self.profiler is not None:
+            self.profiler.report(file=file)
+        elif self.import_seconds is not None:
+            print(f"imports: {self.import_seconds:.2f}s", file=file)
+        if self.build_seconds is not None:
+            print(f"build_agent: {self.build_seconds:.2f}s", file=file)
+            print(f"ready after {self.import_seconds + self.build_seconds:.2f}s", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an entry point's REPL, starting the agent in the background.")
+    parser.add_argument("entry_point", help="script defining build_agent(), e.g. 3_mcp_notion.py")
+    parser.add_argument("--profile", action="store_true", help="only start the agent and print where the time went")
+    parser.add_argument("--session", help="conversation to keep across tasks and restarts instead of the script's own")
+    args = parser.parse_args()
+
+    loader = BackgroundAgent(args.entry_point, profile=args.profile)
+    if args.profile:
+        try:
+            loader.get()
+        finally:
+            loader.report()
+        return
+
+    # The prompt shows right away; the first task waits for the agent if it is still starting
+    task = input("\nEnter task (or 'exit' to quit): ")
+    if task.lower() in ['exit', 'quit']:
+        return
+    if not loader.ready():
+        print("Waiting for the agent to finish starting...")
+    try:
+        agent = loader.get()
+    except Exception as e:
+        print(f"Error: could not start {args.entry_point}: {e}")
+        return
+    loader.report()
+
+    import agent_factory
+
+    def repl(agent, **kwargs):
+        if args.session:
+            kwargs["session"] = args.session
+        return agent_factory.repl(agent, first_task=task, **kwargs)
+
+    module = loader.module
+    if not hasattr(module, "main"):
+        repl(agent, session=os.path.splitext(os.path.basename(args.entry_point))[0])
+        return
+    # the script's own main(), with its tracing, reports and REPL settings, on the agent built in the background
+    module.build_agent = lambda model=None: agent
+    module.repl = repl
+    module.main()
+
+
+if __name__ == '__main__':
+    main()
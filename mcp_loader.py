@@ -0,0 +1,109 @@
+# start several mcp servers at once
+import asyncio
+import functools
+import threading
+import time
+
+from tool_cache import load_tools
+
+
+def _in_thread(func, *args):
+    """Runs `func(*args)` in a daemon thread; returns a future of its result.
+
+    Not `asyncio.to_thread`: the event loop's executor is joined when
+    `asyncio.run` returns, so a hung server would hold up its caller.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(result, error):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def run():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(deliver, result, error)
+        except RuntimeError:
+            # the loop is closed: nobody is waiting any more
+            pass
+
+    threading.Thread(target=run, name=f"mcp-load-{args[-1]}", daemon=True).start()
+    return future
+
+
+async def aload_servers(pool, names, timeout=60, on_ready=None):
+    """Starts the pool servers `names` concurrently and collects their tools.
+
+    A server that fails or times out is reported and skipped; the others are not
+    held up by it, and neither is the caller: a server still starting after
+    `timeout` is left to finish in a daemon thread.
+
+    Args:
+        pool: The `MCPServerPool` the servers are registered in.
+        names: Names the servers were registered under.
+        timeout: Seconds to wait for each server.
+        on_ready: Optional callback `on_ready(name, tools)` called as each server comes up.
+
+    Returns:
+        The merged tool list (in the order of `names`) and a report mapping each name
+        to the seconds until its tools were ready, tool count and error, if any,
+        whether the tools came from the tool cache (`cached`), and the server's own
+        startup time if it was started for them (`startup_seconds`).
+    """
+    started = time.perf_counter()
+
+    async def load(name):
+        details = {}
+        # asyncio.wait rather than wait_for, so a server's own TimeoutError is not
+        # mistaken for ours
+        task = _in_thread(functools.partial(load_tools, report=details), pool, name)
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            return name, [], f"timed out after {timeout}s", details
+        try:
+            return name, task.result(), None, details
+        except Exception as e:
+            return name, [], str(e) or type(e).__name__, details
+
+    tools_by_name = {}
+    report = {}
+    for finished in asyncio.as_completed([load(name) for name in names]):
+        name, tools, error, details = await finished
+        tools_by_name[name] = tools
+        report[name] = {
+            "seconds": time.perf_counter() - started,
+            "tools": len(tools),
+            "error": error,
+            "cached": details.get("cached", False),
+            "startup_seconds": details.get("startup_seconds"),
+        }
+        if error is None and on_ready is not None:
+            on_ready(name, tools)
+
+    merged = [tool for name in names for tool in tools_by_name[name]]
+    return merged, {name: report[name] for name in names}
+
+
+def load_servers(pool, names, timeout=60, on_ready=None):
+    """Synchronous wrapper around :func:`aload_servers` for the REPL scripts; returns after at most `timeout`."""
+    return asyncio.run(aload_servers(pool, names, timeout=timeout, on_ready=on_ready))
+
+
+def print_report(report):
+    for name, entry in report.items():
+        if entry["error"]:
+            print(f"MCP server '{name}' failed after {entry['seconds']:.2f}s: {entry['error']}")
+        elif entry.get("cached"):
+            print(f"MCP server '{name}': {entry['tools']} tools from the tool cache in {entry['seconds']:.2f}s, server starting in the background")
+        elif entry.get("startup_seconds") is not None:
+            print(f"MCP server '{name}' started in {entry['startup_seconds']:.2f}s, ready in {entry['seconds']:.2f}s with {entry['tools']} tools")
+        else:
+            print(f"MCP server '{name}' ready in {entry['seconds']:.2f}s with {entry['tools']} tools")
@@ -0,0 +1,354 @@
+# shared pool of long-lived mcp servers
+import asyncio
+import atexit
+import statistics
+import threading
+import time
+from collections import deque
+
+from mcpadapt.core import MCPAdapt, ToolAdapter
+from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+
+
+class _CaptureAdapter(ToolAdapter):
+    # Hands back the raw MCP definition and call function instead of a framework tool,
+    # so the pool can adapt each catalog once and route calls to any live replica.
+    def adapt(self, func, mcp_tool):
+        return mcp_tool.model_copy(deep=True), func
+
+
+class _Replica:
+    """One running MCP server process and the raw call functions it exposes."""
+
+    def __init__(self, server_parameters, connect_timeout):
+        self.server_parameters = server_parameters
+        self.connect_timeout = connect_timeout
+        self.context = None
+        self.definitions = []
+        self.funcs = {}
+        self.in_flight = 0
+        self.retired = False
+        self.startup_time = None
+
+    def start(self):
+        started = time.perf_counter()
+        self.context = MCPAdapt(
+            self.server_parameters, _CaptureAdapter(), connect_timeout=self.connect_timeout
+        )
+        try:
+            self.context.start()
+            captured = self.context.tools()
+        except Exception:
+            self.close()
+            raise
+        self.definitions = [definition for definition, _ in captured]
+        self.funcs = {definition.name: func for definition, func in captured}
+        self.startup_time = time.perf_counter() - started
+
+    def is_alive(self):
+        if self.context is None:
+            return False
+        task = self.context.task
+        return self.context.thread.is_alive() and task is not None and not task.done()
+
+    def ping(self, timeout=5):
+        # a dead stdio server leaves the session loop running, so ask the server itself
+        if not self.is_alive():
+            return False
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self.context.sessions[0].send_ping(), self.context.loop
+            ).result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        if self.context is None:
+            return
+        context, self.context = self.context, None
+        try:
+            context.close()
+        except Exception:
+            pass
+
+
+class _Server:
+    """Registration for one named server: its parameters, adapter and replicas."""
+
+    def __init__(self, name, server_parameters, adapter, size):
+        self.name = name
+        self.server_parameters = server_parameters
+        self.adapter = adapter
+        self.size = size
+        self.replicas = []
+        self.definitions = None
+        self.tools = None
+        self.lock = threading.Lock()
+        # replicas being started outside the lock, and calls waiting for them
+        self.starting = 0
+        self.started = threading.Condition(self.lock)
+        self.startup_times = []
+        self.restarts = 0
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=1000)
+
+
+class MCPServerPool:
+    """Keeps MCP servers warm for the lifetime of the process.
+
+    Servers are registered by name and started lazily. Every adapted tool routes its
+    calls through the pool, which picks the least busy live replica of its server,
+    starts extra replicas (up to `size`) when all of them are busy, and restarts
+    replicas whose process has died.
+
+    Args:
+        size: Maximum number of replicas started per server.
+        connect_timeout: Seconds to wait for a server to finish its handshake.
+    """
+
+    def __init__(self, size=1, connect_timeout=30):
+        self.size = size
+        self.connect_timeout = connect_timeout
+        self._servers = {}
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    def register(self, name, server_parameters, adapter=None, size=None):
+        """Register a server under `name`. The first registration of a name wins."""
+        with self._lock:
+            if name not in self._servers:
+                self._servers[name] = _Server(
+                    name, server_parameters, adapter or SmolAgentsAdapter(), size or self.size
+                )
+        return name
+
+    def server_parameters(self, name):
+        return self._server(name).server_parameters
+
+    def startup_time(self, name):
+        """Seconds the first replica of server `name` took to start, or None if none has."""
+        server = self._server(name)
+        with server.lock:
+            return server.startup_times[0] if server.startup_times else None
+
+    def max_replicas(self, name):
+        """How many replicas of server `name` may run, so how many of its calls run in parallel."""
+        return self._server(name).size
+
+    def definitions(self, name):
+        """Returns the MCP tool definitions of a server, starting it if needed."""
+        server = self._server(name)
+        with server.lock:
+            definitions = server.definitions
+        if definitions is None:
+            self._release(server, self._acquire(server))
+            definitions = server.definitions
+        return list(definitions)
+
+    def adapt(self, name, definitions):
+        """Adapts MCP tool definitions into agent tools that call through the pool."""
+        server = self._server(name)
+        tools = []
+        for definition in definitions:
+            original_name = definition.name
+            # the adapter may rename the tool in place, keep the server-side name for routing
+            definition = definition.model_copy(deep=True)
+
+            def call(arguments=None, tool_name=original_name):
+                return self.call(name, tool_name, arguments)
+
+            tools.append(server.adapter.adapt(call, definition))
+        return tools
+
+    def tools(self, name, definitions=None):
+        """Returns the adapted tools of a server. Adapted once, reused afterwards.
+
+        Pass `definitions` (e.g. from a cached catalog) to adapt the tools without
+        waiting for the server; it is then only started by the first call.
+        """
+        server = self._server(name)
+        if server.tools is None:
+            if definitions is None:
+                definitions = self.definitions(name)
+            with server.lock:
+                if server.tools is None:
+                    server.tools = self.adapt(name, definitions)
+        return list(server.tools)
+
+    def call(self, name, tool_name, arguments=None):
+        """Calls `tool_name` on a live replica of server `name`."""
+        server = self._server(name)
+        replica = self._acquire(server)
+        started = time.perf_counter()
+        try:
+            if tool_name not in replica.funcs:
+                raise ValueError(f"MCP server '{name}' has no tool named '{tool_name}'")
+            return replica.funcs[tool_name](arguments)
+        except Exception:
+            with server.lock:
+                server.errors += 1
+            # a tool error from a server that still answers is just the tool's
+            if not replica.ping():
+                with server.lock:
+                    self._retire(server, replica)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with server.lock:
+                server.calls += 1
+                server.latencies.append(elapsed)
+            self._release(server, replica)
+
+    def check(self):
+        """Retires every replica whose server process is no longer running (see :meth:`_retire`),
+        starting a new one for a server left without any."""
+        restarted = []
+        for server in list(self._servers.values()):
+            with server.lock:
+                replicas = list(server.replicas)
+            # pinged without the lock, so calls are not held up by a hung server
+            dead = [replica for replica in replicas if not replica.ping()]
+            if not dead:
+                continue
+            with server.lock:
+                unused = [replica for replica in dead if self._retire(server, replica)]
+                replace = not server.replicas and not server.starting
+                if replace:
+                    server.starting += 1
+            for replica in unused:
+                replica.close()
+            if replace:
+                self._release(server, self._start_replica(server))
+            restarted.extend(server.name for _ in dead)
+        return restarted
+
+    def start_health_checks(self, interval=30):
+        """Runs :meth:`check` every `interval` seconds in a daemon thread."""
+        if self._health_thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"MCP health check failed: {e}")
+
+        self._health_thread = threading.Thread(target=loop, daemon=True)
+        self._health_thread.start()
+
+    def metrics(self):
+        """Startup and per-call latency metrics (in seconds) for every server."""
+        metrics = {}
+        for name, server in self._servers.items():
+            with server.lock:
+                latencies = sorted(server.latencies)
+                metrics[name] = {
+                    "replicas": len(server.replicas),
+                    "startup_times": list(server.startup_times),
+                    "restarts": server.restarts,
+                    "calls": server.calls,
+                    "errors": server.errors,
+                    "latency_mean": statistics.fmean(latencies) if latencies else None,
+                    "latency_p50": _percentile(latencies, 50),
+                    "latency_p95": _percentile(latencies, 95),
+                }
+        return metrics
+
+    def close(self):
+        self._stop.set()
+        for server in list(self._servers.values()):
+            with server.lock:
+                for replica in server.replicas:
+                    replica.close()
+                server.replicas = []
+
+    def _server(self, name):
+        try:
+            return self._servers[name]
+        except KeyError:
+            raise KeyError(f"No MCP server registered under '{name}'") from None
+
+    def _start_replica(self, server):
+        # called without server.lock, after _acquire counted it in server.starting;
+        # calls to the other replicas go on meanwhile. Returned in use by the caller
+        replica = _Replica(server.server_parameters, self.connect_timeout)
+        try:
+            replica.start()
+        finally:
+            with server.lock:
+                server.starting -= 1
+                if replica.context is not None:
+                    replica.in_flight = 1
+                    server.replicas.append(replica)
+                    server.startup_times.append(replica.startup_time)
+                    if server.definitions is None:
+                        server.definitions = replica.definitions
+                server.started.notify_all()
+        return replica
+
+    def _retire(self, server, replica):
+        # called with server.lock held. A dead replica gets no new calls and is
+        # replaced by the next _acquire. Returns whether it is unused and should be
+        # closed now (after the lock is released); otherwise the last call running
+        # on it closes it, so a restart never cuts other calls short
+        if replica in server.replicas:
+            server.replicas.remove(replica)
+            server.restarts += 1
+        replica.retired = True
+        return replica.in_flight == 0
+
+    def _acquire(self, server):
+        unused = []
+        try:
+            with server.lock:
+                while True:
+                    for replica in list(server.replicas):
+                        if not replica.is_alive() and self._retire(server, replica):
+                            unused.append(replica)
+                    live = server.replicas
+                    idle = [replica for replica in live if replica.in_flight == 0]
+                    if idle or (live and len(live) + server.starting >= server.size):
+                        replica = idle[0] if idle else min(live, key=lambda r: r.in_flight)
+                        replica.in_flight += 1
+                        return replica
+                    if len(live) + server.starting < server.size:
+                        server.starting += 1
+                        break
+                    # every replica there will be is still starting: wait for one
+                    server.started.wait()
+        finally:
+            for replica in unused:
+                replica.close()
+        return self._start_replica(server)
+
+    def _release(self, server, replica):
+        with server.lock:
+            replica.in_flight -= 1
+            abandoned = replica.retired and replica.in_flight == 0
+        if abandoned:
+            replica.close()
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide pool shared by every agent in this process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MCPServerPool()
+            atexit.register(_pool.close)
+        return _pool
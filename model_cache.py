@@ -0,0 +1,272 @@
+# response cache for llm calls
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+
+from smolagents.models import (
+    ChatMessage,
+    ChatMessageStreamDelta,
+    ChatMessageToolCallFunction,
+    ChatMessageToolCallStreamDelta,
+    Model,
+    agglomerate_stream_deltas,
+    get_tool_json_schema,
+)
+from smolagents.monitoring import TokenUsage
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_responses.sqlite")
+
+
+class ResponseCache:
+    """Two-tier cache of model responses: an in-memory LRU in front of SQLite.
+
+    Args:
+        path: SQLite file for the disk tier, or None to keep responses in memory only.
+        max_entries: Responses kept in memory.
+        max_disk_entries: Responses kept on disk; the least recently used are evicted.
+        ttl: Seconds a response stays valid.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=512, max_disk_entries=20000, ttl=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT, created REAL, used REAL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, now)
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def _remember(self, key, created, value):
+        # called with the lock held
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def cache_enabled():
+    """Whether `$AGENT_RESPONSE_CACHE` turns the response cache on for the shared models.
+
+    It is off by default: in a REPL, asking the same thing again should get a
+    fresh answer. Batch runs, where identical requests are expected, turn it on.
+    """
+    return os.environ.get("AGENT_RESPONSE_CACHE", "").lower() in ("1", "true", "yes", "on")
+
+
+def default_cache():
+    """The process-wide cache shared by every `CachedModel` created without one."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def _normalize_message(message):
+    if isinstance(message, ChatMessage):
+        message = {"role": message.role, "content": message.content, "tool_calls": _tool_calls(message)}
+    role = message["role"]
+    role = getattr(role, "value", role)
+    content = message.get("content")
+    if isinstance(content, list):
+        # consecutive text parts render the same prompt however they were split
+        parts, text = [], []
+        for part in content:
+            if part.get("type") == "text":
+                text.append(part["text"])
+            else:
+                if text:
+                    parts.append({"type": "text", "text": "".join(text)})
+                    text = []
+                parts.append(part)
+        if text:
+            parts.append({"type": "text", "text": "".join(text)})
+        content = parts[0]["text"] if len(parts) == 1 and parts[0]["type"] == "text" else parts
+    if isinstance(content, str):
+        content = content.strip()
+    return {"role": role, "content": content, "tool_calls": message.get("tool_calls")}
+
+
+class CachedModel(Model):
+    """Wraps a model so identical requests are answered from a `ResponseCache`.
+
+    Requests match when the model, normalized messages, stop sequences, response
+    format, tool schemas and generation arguments are all the same. Cached answers
+    report zero token usage, since no tokens were spent on them.
+
+    Args:
+        model: The model to wrap, e.g. an `InferenceClientModel`.
+        cache: The cache to use, defaults to the shared :func:`default_cache`.
+    """
+
+    def __init__(self, model, cache=None):
+        super().__init__(model_id=model.model_id)
+        self.model = model
+        self.cache = cache if cache is not None else default_cache()
+
+    def cache_key(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        request = {
+            "model": type(self.model).__name__,
+            "model_id": self.model.model_id,
+            "model_kwargs": self.model.kwargs,
+            "messages": [_normalize_message(message) for message in messages],
+            "stop_sequences": stop_sequences,
+            "response_format": response_format,
+            "tools": [get_tool_json_schema(tool) for tool in tools_to_call_from or []],
+            "kwargs": kwargs,
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        key = self.cache_key(messages, stop_sequences, response_format, tools_to_call_from, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return ChatMessage.from_dict(dict(cached), token_usage=TokenUsage(input_tokens=0, output_tokens=0))
+        message = self.model.generate(
+            messages,
+            stop_sequences=stop_sequences,
+            response_format=response_format,
+            tools_to_call_from=tools_to_call_from,
+            **kwargs,
+        )
+        self.cache.put(key, _to_cache_value(message))
+        return message
+
+    def generate_stream(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        key = self.cache_key(messages, stop_sequences, response_format, tools_to_call_from, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield _stream_delta(cached, TokenUsage(input_tokens=0, output_tokens=0))
+            return
+        call_kwargs = dict(
+            stop_sequences=stop_sequences,
+            response_format=response_format,
+            tools_to_call_from=tools_to_call_from,
+            **kwargs,
+        )
+        if not hasattr(self.model, "generate_stream"):
+            message = self.model.generate(messages, **call_kwargs)
+            value = _to_cache_value(message)
+            self.cache.put(key, value)
+            yield _stream_delta(value, message.token_usage)
+            return
+        deltas = []
+        for delta in self.model.generate_stream(messages, **call_kwargs):
+            deltas.append(delta)
+            yield delta
+        # only complete streams are cached
+        self.cache.put(key, _to_cache_value(agglomerate_stream_deltas(deltas)))
+
+
+def _tool_calls(message):
+    if not message.tool_calls:
+        return None
+    return [asdict(tool_call) for tool_call in message.tool_calls]
+
+
+def _to_cache_value(message):
+    # built by hand: ChatMessage.dict() would deep-copy the raw provider response
+    return {
+        "role": getattr(message.role, "value", message.role),
+        "content": message.content,
+        "tool_calls": _tool_calls(message),
+    }
+
+
+def _arguments_text(arguments):
+    # streamed arguments are text, put together by concatenation
+    return arguments if isinstance(arguments, str) else json.dumps(arguments)
+
+
+def _stream_delta(value, token_usage):
+    # a whole cached message as one stream delta, tool calls included
+    tool_calls = [
+        ChatMessageToolCallStreamDelta(
+            index=index,
+            id=tool_call["id"],
+            type=tool_call["type"],
+            function=ChatMessageToolCallFunction(
+                name=tool_call["function"]["name"], arguments=_arguments_text(tool_call["function"]["arguments"])
+            ),
+        )
+        for index, tool_call in enumerate(value["tool_calls"] or [])
+    ]
+    return ChatMessageStreamDelta(content=value["content"], tool_calls=tool_calls or None, token_usage=token_usage)
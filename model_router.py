@@ -0,0 +1,145 @@
+# send each agent step to a small or a large model, escalating to the large one when a step fails
+import os
+import threading
+
+from smolagents import ActionStep
+from smolagents.models import ChatMessageStreamDelta, Model
+
+from agent_factory import get_model
+
+DEFAULT_SMALL_MODEL_ID = "Qwen/Qwen2.5-7B-Instruct"
+
+# where each kind of model call goes unless an agent says otherwise; failed steps always go large
+DEFAULT_ROUTES = {"planning": "large", "final_answer": "large", "step": "small"}
+
+
+def get_small_model(model_id=None, base_url=None):
+    """The process-wide small model, from `get_model` like the large one.
+
+    Its calls are paced by the provider's scheduler, and with
+    `$AGENT_RESPONSE_CACHE=1` repeated requests are answered from the response cache.
+
+    `model_id` defaults to `$AGENT_SMALL_MODEL_ID`, then to Qwen2.5-7B-Instruct.
+    With `base_url` (default `$AGENT_SMALL_MODEL_URL`) it is served from there
+    instead, e.g. by a local llama.cpp, Ollama or vLLM server
+    (`http://localhost:11434/v1`), so cheap steps never leave the machine.
+    """
+    model_id = model_id or os.environ.get("AGENT_SMALL_MODEL_ID", DEFAULT_SMALL_MODEL_ID)
+    base_url = base_url or os.environ.get("AGENT_SMALL_MODEL_URL")
+    return get_model(model_id, base_url=base_url) if base_url else get_model(model_id)
+
+
+def _text(message):
+    content = message["content"] if isinstance(message, dict) else message.content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return content or ""
+
+
+def _opening(template):
+    # the fixed text a rendered template starts with, before its first variable
+    return template.split("{{")[0].split("{%")[0].strip()
+
+
+class RoutingModel(Model):
+    """Sends each of an agent's model calls to `small` or `large`.
+
+    Calls are told apart by the agent's prompt templates: planning, the final
+    answer it is forced to give after its last step, or an ordinary step. Each
+    goes where `routes` says, except that a step following a failed one (a code
+    error, unparsable output...) and a call the small model raises on go to the
+    large model.
+
+    Args:
+        large: The model for hard calls, e.g. the shared 72B one.
+        small: The model for the others; any smolagents `Model`, e.g. a local one.
+        agent: The agent whose calls are routed; its memory shows failed steps.
+        routes: `{"planning" | "final_answer" | "step": "small" | "large"}`, over `DEFAULT_ROUTES`.
+    """
+
+    def __init__(self, large, small, agent, routes=None):
+        super().__init__(model_id=f"{small.model_id} / {large.model_id}")
+        self.large = large
+        self.small = small
+        self.agent = agent
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.stats = {"small": 0, "large": 0, "escalations": 0}
+        self._lock = threading.Lock()
+
+    def kind(self, messages):
+        """"planning", "final_answer" or "step"."""
+        first = _text(messages[0]).lstrip() if messages else ""
+        templates = self.agent.prompt_templates
+        if first.startswith(_opening(templates["final_answer"]["pre_messages"])):
+            return "final_answer"
+        planning = templates["planning"]
+        if any(first.startswith(_opening(planning[name])) for name in ("initial_plan", "update_plan_pre_messages")):
+            return "planning"
+        return "step"
+
+    def choose(self, messages):
+        """The model for this call, and whether it is the small one."""
+        kind = self.kind(messages)
+        steps = [step for step in self.agent.memory.steps if isinstance(step, ActionStep)]
+        failed = kind == "step" and steps and steps[-1].error is not None
+        if failed and self.routes[kind] == "small":
+            self._count("escalations")
+        use_small = self.routes[kind] == "small" and not failed
+        self._count("small" if use_small else "large")
+        return (self.small if use_small else self.large), use_small
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        model, use_small = self.choose(messages)
+        call_kwargs = dict(stop_sequences=stop_sequences, response_format=response_format, tools_to_call_from=tools_to_call_from, **kwargs)
+        try:
+            return model.generate(messages, **call_kwargs)
+        except Exception:
+            if not use_small:
+                raise
+            self._escalate()
+            return self.large.generate(messages, **call_kwargs)
+
+    def generate_stream(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        model, use_small = self.choose(messages)
+        call_kwargs = dict(stop_sequences=stop_sequences, response_format=response_format, tools_to_call_from=tools_to_call_from, **kwargs)
+        started = False
+        try:
+            for delta in self._stream(model, messages, call_kwargs):
+                started = True
+                yield delta
+        except Exception:
+            # once tokens went out they cannot be taken back; before that, the large model takes over
+            if not use_small or started:
+                raise
+            self._escalate()
+            yield from self._stream(self.large, messages, call_kwargs)
+
+    @staticmethod
+    def _stream(model, messages, call_kwargs):
+        if not hasattr(model, "generate_stream"):
+            message = model.generate(messages, **call_kwargs)
+            yield ChatMessageStreamDelta(content=message.content, token_usage=message.token_usage)
+            return
+        yield from model.generate_stream(messages, **call_kwargs)
+
+    def _escalate(self):
+        with self._lock:
+            self.stats["escalations"] += 1
+            self.stats["small"] -= 1
+            self.stats["large"] += 1
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def route_model(agent, small=None, large=None, routes=None):
+    """Routes the calls of `agent` between `small` (default :func:`get_small_model`) and `large` (default its model).
+
+    See :class:`RoutingModel`; managed agents are configured separately.
+    """
+    large = large or agent.model
+    if isinstance(large, RoutingModel):
+        large = large.large
+    agent.model = RoutingModel(large, small or get_small_model(), agent, routes)
+    return agent
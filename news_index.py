@@ -0,0 +1,398 @@
+# local full-text index of news items, filled incrementally from the newsfeed mcp server
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from smolagents import Tool
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "news.sqlite")
+
+# field names used by common news APIs, first present wins
+FIELDS = {
+    "url": ("url", "link", "href"),
+    "title": ("title", "headline", "name"),
+    "summary": ("summary", "description", "snippet", "content", "text"),
+    "source": ("source", "publisher", "site", "feed"),
+    "published": ("published", "publishedAt", "published_at", "pubDate", "date", "time", "created_at"),
+}
+# tool parameters that take the time of the last pull, so the server only returns newer items
+SINCE_PARAMETERS = ("since", "after", "from", "from_date", "start_date", "published_after")
+
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    url TEXT,
+    title TEXT,
+    summary TEXT,
+    source TEXT,
+    published TEXT,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_published ON items (published);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(title, summary, source, content='items', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, summary, source) VALUES (new.id, new.title, new.summary, new.source);
+END;
+CREATE TABLE IF NOT EXISTS checkpoints (
+    feed TEXT PRIMARY KEY,
+    published TEXT,
+    pulled REAL NOT NULL
+);
+"""
+
+
+def normalize_date(value):
+    """ISO 8601 UTC for ISO, RFC 2822 or epoch dates, so they sort as text; None if unparseable."""
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            date = datetime.fromtimestamp(value, timezone.utc)
+        else:
+            try:
+                date = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            except ValueError:
+                date = parsedate_to_datetime(str(value))
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return date.astimezone(timezone.utc).isoformat(timespec="seconds")
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def item_key(item):
+    """Dedup key: the URL without query string or fragment, else a hash of title and source."""
+    if item.get("url"):
+        return re.sub(r"[?#].*$", "", item["url"]).rstrip("/").lower()
+    text = f"{item.get('title') or ''}\n{item.get('source') or ''}".lower()
+    return "sha1:" + hashlib.sha1(text.encode()).hexdigest()
+
+
+def _field(record, name):
+    for key in FIELDS[name]:
+        value = record.get(key)
+        if value not in (None, ""):
+            if isinstance(value, dict):
+                value = value.get("name") or value.get("title") or json.dumps(value)
+            return value
+    return None
+
+
+def parse_items(text):
+    """News items found in a tool result: JSON records (or a JSON object holding a list of them),
+    or failing that, one item per line with a URL."""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        data = None
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        data = lists[0] if lists else [data]
+    if isinstance(data, list):
+        items = []
+        for record in data:
+            if isinstance(record, dict):
+                item = {name: _field(record, name) for name in FIELDS}
+                if item["url"] or item["title"]:
+                    items.append(item)
+        return items
+    items = []
+    for line in str(text).splitlines():
+        match = _URL.search(line)
+        if match:
+            title = line.replace(match.group(0), "").strip(" -*:|[]()\t")
+            items.append({"url": match.group(0), "title": title or None, "summary": None, "source": None, "published": None})
+    return items
+
+
+class NewsIndex:
+    """News items in SQLite with an FTS5 index over title, summary and source.
+
+    Items are deduplicated by :func:`item_key` on insert. Safe to share between
+    threads; a search matching a few hundred of tens of thousands of items
+    takes under a millisecond.
+
+    Args:
+        path: Database file, created if needed (":memory:" for a throwaway index).
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def add(self, items):
+        """Inserts the items not already indexed; returns how many were new."""
+        now = time.time()
+        rows = [
+            (
+                item_key(item),
+                item.get("url"),
+                item.get("title"),
+                item.get("summary"),
+                str(item["source"]) if item.get("source") is not None else None,
+                normalize_date(item.get("published")),
+                now,
+            )
+            for item in items
+        ]
+        with self._lock, self._db:
+            # rowcount leaves out the rows the trigger writes to the FTS index
+            return self._db.executemany(
+                "INSERT OR IGNORE INTO items (key, url, title, summary, source, published, fetched) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+
+    def search(self, query, limit=10, since=None):
+        """Best matches for `query` (FTS5 syntax, plain words are ANDed), newest first among equals."""
+        # quote each word so punctuation in user queries is not read as FTS5 syntax
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+        if not match:
+            return self.latest(limit, since=since)
+        sql = (
+            "SELECT items.*, snippet(items_fts, 1, '', '', '...', 24) AS snippet FROM items_fts "
+            "JOIN items ON items.id = items_fts.rowid WHERE items_fts MATCH ?"
+        )
+        parameters = [match]
+        if since:
+            sql += " AND items.published >= ?"
+            parameters.append(normalize_date(since))
+        sql += " ORDER BY bm25(items_fts), items.published DESC LIMIT ?"
+        parameters.append(limit)
+        return self._query(sql, parameters)
+
+    def latest(self, limit=10, source=None, since=None):
+        """Most recently published (else fetched) items, optionally from one source."""
+        sql, parameters = "SELECT items.*, NULL AS snippet FROM items WHERE 1", []
+        if source:
+            sql += " AND source LIKE ?"
+            parameters.append(f"%{source}%")
+        if since:
+            sql += " AND published >= ?"
+            parameters.append(normalize_date(since))
+        sql += " ORDER BY coalesce(published, strftime('%Y-%m-%dT%H:%M:%S+00:00', fetched, 'unixepoch')) DESC LIMIT ?"
+        parameters.append(limit)
+        return self._query(sql, parameters)
+
+    def checkpoint(self, feed):
+        """`(latest published date, time of last pull)` recorded for `feed`, or `(None, None)`."""
+        with self._lock:
+            row = self._db.execute("SELECT published, pulled FROM checkpoints WHERE feed = ?", (feed,)).fetchone()
+        return (row["published"], row["pulled"]) if row else (None, None)
+
+    def set_checkpoint(self, feed, published):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO checkpoints (feed, published, pulled) VALUES (?, ?, ?) "
+                "ON CONFLICT (feed) DO UPDATE SET published = coalesce(excluded.published, published), pulled = excluded.pulled",
+                (feed, published, time.time()),
+            )
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM items").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, parameters):
+        with self._lock:
+            rows = self._db.execute(sql, parameters).fetchall()
+        return [
+            {
+                "title": row["title"],
+                "url": row["url"],
+                "source": row["source"],
+                "published": row["published"],
+                "summary": row["snippet"] or row["summary"],
+            }
+            for row in rows
+        ]
+
+
+class NewsIngester:
+    """Pulls new items from MCP news tools into a :class:`NewsIndex`.
+
+    Each feed is a `(tool name, arguments)` pair; by default every tool of the
+    server that needs no arguments. A feed's checkpoint is the newest publish
+    date it has returned: it is passed to tools taking a `since`-like parameter.
+    Items are not filtered by it, since a feed may publish an item late with an
+    older date; they are deduplicated by key across feeds and pulls instead.
+
+    Args:
+        index: The `NewsIndex` to fill.
+        server: Pool name of the news server, registered beforehand.
+        feeds: `[(tool name, arguments)]` to pull, instead of the argument-free tools.
+        pool: The `MCPServerPool`, defaults to the process-wide one.
+    """
+
+    def __init__(self, index, server="newsfeed", feeds=None, pool=None):
+        self.index = index
+        self.server = server
+        if pool is None:
+            from mcp_pool import get_pool
+
+            pool = get_pool()
+        self.pool = pool
+        self._feeds = feeds
+        self._thread = None
+        self._stop = threading.Event()
+
+    def feeds(self):
+        if self._feeds is None:
+            self._feeds = [
+                (definition.name, {})
+                for definition in self.pool.definitions(self.server)
+                if not definition.inputSchema.get("required")
+            ]
+        return self._feeds
+
+    def ingest(self):
+        """Pulls every feed once; returns `{"fetched", "new", "seconds"}`."""
+        started = time.perf_counter()
+        fetched = new = 0
+        definitions = {definition.name: definition for definition in self.pool.definitions(self.server)}
+        for tool_name, arguments in self.feeds():
+            feed = f"{self.server}/{tool_name}:{json.dumps(arguments, sort_keys=True)}"
+            checkpoint, _ = self.index.checkpoint(feed)
+            arguments = dict(arguments)
+            properties = definitions[tool_name].inputSchema.get("properties", {}) if tool_name in definitions else {}
+            since = next((name for name in SINCE_PARAMETERS if name in properties), None)
+            if checkpoint and since and since not in arguments:
+                arguments[since] = checkpoint
+            result = self.pool.call(self.server, tool_name, arguments)
+            text = "".join(getattr(content, "text", "") or "" for content in result.content)
+            if getattr(result, "isError", False):
+                raise RuntimeError(f"{tool_name} failed: {text}")
+            items = parse_items(text)
+            for item in items:
+                item["published"] = normalize_date(item["published"])
+            fetched += len(items)
+            new += self.index.add(items)
+            dates = [item["published"] for item in items if item["published"]]
+            if checkpoint:
+                dates.append(checkpoint)
+            self.index.set_checkpoint(feed, max(dates) if dates else None)
+        return {"fetched": fetched, "new": new, "seconds": time.perf_counter() - started}
+
+    def start(self, interval=300):
+        """Ingests now and then every `interval` seconds, in a daemon thread."""
+        if self._thread is not None:
+            return self
+
+        def loop():
+            while True:
+                try:
+                    self.ingest()
+                except Exception as e:
+                    print(f"News ingestion failed: {e}")
+                if self._stop.wait(interval):
+                    break
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_default_index = None
+_ingesters = {}
+_shared_lock = threading.Lock()
+
+
+def default_index():
+    """The process-wide index at `.cache/news.sqlite`."""
+    global _default_index
+    with _shared_lock:
+        if _default_index is None:
+            _default_index = NewsIndex()
+        return _default_index
+
+
+def start_ingestion(server="newsfeed", interval=300, feeds=None):
+    """The process-wide ingester of `server` into :func:`default_index`, started on first use."""
+    index = default_index()
+    with _shared_lock:
+        if server not in _ingesters:
+            _ingesters[server] = NewsIngester(index, server, feeds).start(interval)
+        return _ingesters[server]
+
+
+class SearchNewsIndexTool(Tool):
+    name = "search_news_index"
+    description = (
+        "Searches the local index of recent news by keywords, in milliseconds. Try it before the live news tools; "
+        "use those only when the index has nothing relevant or nothing recent enough. "
+        "Returns a list of dicts with title, url, source, published and summary."
+    )
+    inputs = {
+        "query": {"type": "string", "description": "Keywords to search for, e.g. 'openai funding'."},
+        "limit": {"type": "integer", "description": "Maximum number of items, default 10.", "nullable": True},
+        "since": {"type": "string", "description": "Only items published on or after this ISO date.", "nullable": True},
+    }
+    output_type = "array"
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def forward(self, query, limit=None, since=None):
+        return self.index.search(query, limit=limit or 10, since=since)
+
+
+class LatestNewsTool(Tool):
+    name = "latest_news"
+    description = (
+        "Lists the most recent items in the local news index, optionally from one source. "
+        "Returns a list of dicts with title, url, source, published and summary."
+    )
+    inputs = {
+        "limit": {"type": "integer", "description": "Maximum number of items, default 10.", "nullable": True},
+        "source": {"type": "string", "description": "Only items whose source contains this text.", "nullable": True},
+    }
+    output_type = "array"
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def forward(self, limit=None, source=None):
+        return self.index.latest(limit=limit or 10, source=source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the local news index.")
+    parser.add_argument("query", nargs="?", help="keywords; lists the latest items if left out")
+    parser.add_argument("-n", "--limit", type=int, default=10)
+    parser.add_argument("--index", default=INDEX_PATH, help="index database file")
+    args = parser.parse_args()
+
+    index = NewsIndex(args.index)
+    started = time.perf_counter()
+    items = index.search(args.query, args.limit) if args.query else index.latest(args.limit)
+    for item in items:
+        print(json.dumps(item))
+    print(f"{len(items)} of {index.count()} items in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
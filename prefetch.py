@@ -0,0 +1,183 @@
+# start read-only tool calls while the model is still writing the code that makes them
+import ast
+import copy
+import fnmatch
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from streaming import enable_streaming
+
+# attempts at closing a call's parentheses before giving up on it for this delta
+MAX_CLOSE_ATTEMPTS = 64
+
+
+def call_key(tool, args, kwargs):
+    """Arguments as `Tool.__call__` passes them on, keyed by name, so positional and keyword calls match."""
+    if len(args) == 1 and not kwargs and isinstance(args[0], dict) and all(key in tool.inputs for key in args[0]):
+        args, kwargs = (), args[0]
+    arguments = dict(zip(tool.inputs, args))
+    arguments.update(kwargs)
+    return tool.name, json.dumps(arguments, sort_keys=True, default=str)
+
+
+def _literal_call(source, name):
+    # the call's (args, kwargs) if `source` is exactly `name(...)` with literal arguments, else None
+    try:
+        node = ast.parse(source, mode="eval").body
+    except SyntaxError:
+        return None
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name):
+        return None
+    try:
+        args = [ast.literal_eval(arg) for arg in node.args]
+        kwargs = {keyword.arg: ast.literal_eval(keyword.value) for keyword in node.keywords if keyword.arg}
+    except ValueError:
+        return None
+    if len(kwargs) != len(node.keywords):
+        return None
+    return args, kwargs
+
+
+class Prefetcher:
+    """Runs calls to side-effect-free tools as soon as they appear in streamed code.
+
+    :meth:`scan` is given the model output so far; every complete call to one of
+    `tools` with literal arguments (`search(query="q3 plan")`, not
+    `search(query=q)`) is started in the background. When the code runs, the
+    tool's proxy from :meth:`proxy` takes the prefetched result instead of making
+    the call again. Only pass tools that are safe to call speculatively: the code
+    may end up not making the call at all.
+
+    Args:
+        tools: The read-only tools.
+        max_workers: Prefetched calls running at the same time.
+        code_tag: Text opening a code block; calls are only looked for after it.
+    """
+
+    def __init__(self, tools, max_workers=4, code_tag="<code>"):
+        self.tools = {tool.name: tool for tool in tools}
+        self.code_tag = code_tag
+        self.stats = {"prefetched": 0, "hits": 0, "wasted": 0}
+        self._forwards = {tool.name: tool.forward for tool in tools}
+        self._pattern = re.compile(r"\b(" + "|".join(re.escape(name) for name in self.tools) + r")\s*\(") if tools else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending = {}
+        self._scanned = set()
+        self._lock = threading.Lock()
+
+    def start_step(self):
+        """Forgets the previous step's prefetches that its code never used."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scanned = set()
+            self.stats["wasted"] += len(pending)
+        for future in pending.values():
+            future.cancel()
+
+    def scan(self, text):
+        """Starts the complete read-only calls in `text` that were not started yet."""
+        if self._pattern is None:
+            return
+        start = text.find(self.code_tag) if self.code_tag else 0
+        if start < 0:
+            return
+        for match in self._pattern.finditer(text, start):
+            if match.start() in self._scanned:
+                continue
+            call = self._complete_call(text, match)
+            if call is None:
+                continue
+            self._scanned.add(match.start())
+            name = match.group(1)
+            self.prefetch(name, *call)
+
+    def prefetch(self, name, args, kwargs):
+        key = call_key(self.tools[name], args, kwargs)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(self._forwards[name], *args, **kwargs)
+            self.stats["prefetched"] += 1
+
+    def take(self, tool, args, kwargs):
+        """The prefetched future for this call, if any; each prefetch is used once."""
+        with self._lock:
+            future = self._pending.pop(call_key(tool, args, kwargs), None)
+            if future is not None:
+                self.stats["hits"] += 1
+        return future
+
+    def proxy(self, tool):
+        """A copy of `tool` that uses prefetched results when there are some."""
+        proxy = copy.copy(tool)
+        forward = self._forwards[tool.name]
+
+        def prefetched_forward(*args, **kwargs):
+            future = self.take(tool, args, kwargs)
+            if future is None:
+                return forward(*args, **kwargs)
+            return future.result()
+
+        proxy.forward = prefetched_forward
+        return proxy
+
+    def _complete_call(self, text, match):
+        # tries each closing parenthesis after the call's name until the call parses
+        position = match.end()
+        for _ in range(MAX_CLOSE_ATTEMPTS):
+            position = text.find(")", position)
+            if position < 0:
+                return None
+            call = _literal_call(text[match.start() : position + 1], match.group(1))
+            if call is not None:
+                return call
+            position += 1
+        return None
+
+
+class PrefetchingModel:
+    """Wraps a model so its streamed output is scanned by a :class:`Prefetcher`."""
+
+    def __init__(self, model, prefetcher):
+        self.model = model
+        self.prefetcher = prefetcher
+
+    def generate_stream(self, messages, **kwargs):
+        self.prefetcher.start_step()
+        text = ""
+        for delta in self.model.generate_stream(messages, **kwargs):
+            if delta.content:
+                text += delta.content
+                self.prefetcher.scan(text)
+            yield delta
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def use_prefetch(agent, read_only, max_workers=4):
+    """Prefetches the agent's read-only tool calls while its model streams the code.
+
+    Args:
+        agent: A `CodeAgent`; token streaming is turned on.
+        read_only: Names or patterns (e.g. `"get_*"`) of tools without side effects.
+        max_workers: Prefetched calls running at the same time.
+    """
+    model = agent.model
+    if isinstance(model, PrefetchingModel):
+        model = model.model
+    tools = [
+        tool
+        for name, tool in agent.tools.items()
+        if name != "final_answer" and any(fnmatch.fnmatchcase(name, pattern) for pattern in read_only)
+    ]
+    code_tag = agent.code_block_tags[0] if hasattr(agent, "code_block_tags") else "<code>"
+    # markdown tags are regexes like "```(?:python|py)"; their fence is enough to find the block
+    prefetcher = Prefetcher(tools, max_workers=max_workers, code_tag=code_tag.split("(")[0])
+    for tool in tools:
+        agent.tools[tool.name] = prefetcher.proxy(tool)
+    agent.model = PrefetchingModel(model, prefetcher)
+    agent.prefetcher = prefetcher
+    return enable_streaming(agent)
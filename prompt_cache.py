@@ -0,0 +1,227 @@
+# system prompts that stay byte-identical between steps and agents, so servers can reuse their prefix cache
+import copy
+import hashlib
+import json
+import sys
+import threading
+from collections import deque
+
+from smolagents import ActionStep, FinalAnswerStep
+from smolagents.agents import populate_template
+
+# argument descriptions shorter than this are left in place: the reference would be about as long
+MIN_SHARED_DESCRIPTION = 40
+
+# earlier prompts a new one is compared with; the server's prefix cache holds at least this many
+RECENT_PROMPTS = 32
+
+
+def prompt_text(messages):
+    """The messages as one string, in order, for comparing what two prompts have in common."""
+    parts = []
+    for message in messages:
+        role = message["role"] if isinstance(message, dict) else message.role
+        content = message["content"] if isinstance(message, dict) else message.content
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") if part.get("type") == "text" else f"<{part.get('type')}>" for part in content)
+        parts.append(f"{getattr(role, 'value', role)}\n{content or ''}\n")
+    return "".join(parts)
+
+
+def common_prefix_length(a, b):
+    # binary search on slices: the comparisons run in C, unlike a character loop
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _tool_order(tool):
+    # by name, so picking or loading tools in another order renders the same prompt; final_answer stays last
+    return (tool.name == "final_answer", tool.name)
+
+
+class PromptLayout:
+    """Renders `CodeAgent` system prompts the same way every time, once per distinct set of tools.
+
+    Tools and team members are listed by name whatever order the agent holds them
+    in, and an argument described the same way by several tools is described once,
+    at its first tool; later ones point back to it. Rendered prompts are kept, so
+    agents with the same tools share one string instead of re-rendering the template.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def system_prompt(self, agent):
+        tools = sorted(agent.tools.values(), key=_tool_order)
+        managed_agents = sorted(agent.managed_agents.values(), key=lambda managed: managed.name)
+        variables = {
+            "authorized_imports": (
+                "You can import from any package you want."
+                if "*" in agent.authorized_imports
+                else str(agent.authorized_imports)
+            ),
+            "custom_instructions": agent.instructions,
+            "code_block_opening_tag": agent.code_block_tags[0],
+            "code_block_closing_tag": agent.code_block_tags[1],
+        }
+        template = agent.prompt_templates["system_prompt"]
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    template,
+                    variables,
+                    [(tool.name, tool.description, tool.inputs, tool.output_type, getattr(tool, "output_schema", None)) for tool in tools],
+                    [(managed.name, managed.description) for managed in managed_agents],
+                ],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+        with self._lock:
+            prompt = self._prompts.get(key)
+        if prompt is not None:
+            return prompt
+        variables["tools"] = {tool.name: tool for tool in self.compact_tools(tools)}
+        variables["managed_agents"] = {managed.name: managed for managed in managed_agents}
+        prompt = populate_template(template, variables)
+        with self._lock:
+            if len(self._prompts) >= self.max_entries:
+                self._prompts.clear()
+            self._prompts[key] = prompt
+        return prompt
+
+    @staticmethod
+    def compact_tools(tools):
+        """Copies of `tools` whose repeated argument descriptions refer to the first tool giving them."""
+        first = {}
+        compacted = []
+        for tool in tools:
+            inputs = {}
+            for name, spec in tool.inputs.items():
+                description = spec.get("description", "")
+                owner = first.setdefault((name, description), tool.name)
+                if owner != tool.name and len(description) >= MIN_SHARED_DESCRIPTION:
+                    spec = {**spec, "description": f"as in {owner}."}
+                inputs[name] = spec
+            if inputs != tool.inputs:
+                tool = copy.copy(tool)
+                tool.inputs = inputs
+            compacted.append(tool)
+        return compacted
+
+
+class PromptStats:
+    """Prompt tokens per agent step, and how many of them an earlier prompt started with.
+
+    Those are the tokens a server with prefix caching does not need to process
+    again. Prompts are compared as text with the `RECENT_PROMPTS` before them, from
+    every agent, since agents sharing a model share its server's cache. Token
+    counts are the model's; the reusable part is prorated from the text.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self._recent = deque(maxlen=RECENT_PROMPTS)
+        self._lock = threading.Lock()
+
+    def record(self, agent_name, memory_step):
+        if not memory_step.model_input_messages:
+            return
+        text = prompt_text(memory_step.model_input_messages)
+        usage = memory_step.token_usage
+        tokens = usage.input_tokens if usage and usage.input_tokens else len(text) // 4
+        with self._lock:
+            shared = max((common_prefix_length(text, previous) for previous in self._recent), default=0)
+            self._recent.append(text)
+            reusable = tokens * shared // len(text) if text else 0
+            self.steps.append(
+                {
+                    "agent": agent_name,
+                    "step": memory_step.step_number,
+                    "prompt_tokens": tokens,
+                    "reusable_tokens": reusable,
+                    "new_tokens": tokens - reusable,
+                    "prompt_chars": len(text),
+                }
+            )
+
+    def summary(self, since=0):
+        """Totals of the steps from index `since`: prompt, reusable and new tokens."""
+        with self._lock:
+            steps = self.steps[since:]
+        totals = {"steps": len(steps), "prompt_tokens": 0, "reusable_tokens": 0, "new_tokens": 0}
+        for step in steps:
+            for name in ("prompt_tokens", "reusable_tokens", "new_tokens"):
+                totals[name] += step[name]
+        return totals
+
+    def print_report(self, since=0, file=None):
+        file = file or sys.stdout
+        with self._lock:
+            steps = self.steps[since:]
+        if not steps:
+            return
+        print(f"\n{'agent':<24} {'step':>4} {'prompt tok':>10} {'reusable':>9} {'new':>7}", file=file)
+        for step in steps:
+            print(
+                f"{step['agent'][:24]:<24} {step['step']:>4} {step['prompt_tokens']:>10} "
+                f"{step['reusable_tokens']:>9} {step['new_tokens']:>7}",
+                file=file,
+            )
+        totals = self.summary(since)
+        share = totals["reusable_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        print(f"{'total':<24} {totals['steps']:>4} {totals['prompt_tokens']:>10} {totals['reusable_tokens']:>9} {totals['new_tokens']:>7}  ({share:.0%} reusable)", file=file)
+
+
+_default_layout = None
+_default_layout_lock = threading.Lock()
+
+
+def default_layout():
+    """The process-wide layout, so every agent shares the rendered prompts."""
+    global _default_layout
+    with _default_layout_lock:
+        if _default_layout is None:
+            _default_layout = PromptLayout()
+        return _default_layout
+
+
+def use_prompt_cache(agent, stats=None, layout=None):
+    """Renders the system prompts of `agent` and its managed agents with a :class:`PromptLayout`.
+
+    Prompt tokens of every step are recorded in `agent.prompt_stats`.
+    """
+    _use_layout(agent, stats if stats is not None else PromptStats(), layout or default_layout())
+    return agent
+
+
+def report_prompts(agent):
+    """Prints the prompt tokens of each step of a run of `agent` when it ends; see :func:`use_prompt_cache`."""
+    stats = agent.prompt_stats
+    reported = [len(stats.steps)]
+
+    def print_report(memory_step):
+        stats.print_report(since=reported[0])
+        reported[0] = len(stats.steps)
+
+    agent.step_callbacks.register(FinalAnswerStep, print_report)
+    return agent
+
+
+def _use_layout(agent, stats, layout):
+    if getattr(agent, "prompt_stats", None) is stats:
+        return
+    agent.prompt_stats = stats
+    agent.initialize_system_prompt = lambda: layout.system_prompt(agent)
+    name = agent.name or type(agent).__name__
+    agent.step_callbacks.register(ActionStep, lambda memory_step: stats.record(name, memory_step))
+    for managed_agent in agent.managed_agents.values():
+        _use_layout(managed_agent, stats, layout)
@@ -0,0 +1,357 @@
+# client-side rate limits, retries and adaptive concurrency for model calls
+import os
+import random
+import threading
+import time
+
+from smolagents.models import ChatMessageStreamDelta, Model
+
+# output tokens assumed for a call until its usage is known
+EXPECTED_OUTPUT_TOKENS = 500
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `per_minute` units a minute, in bursts of up to `capacity`.
+
+    Args:
+        per_minute: Refill rate, e.g. requests or tokens per minute; None for no limit.
+        capacity: Largest burst, by default a tenth of a minute's worth.
+    """
+
+    def __init__(self, per_minute=None, capacity=None):
+        self.per_minute = per_minute
+        self.capacity = capacity or (max(per_minute / 10, 1) if per_minute else 0)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Waits until `amount` units are available and takes them.
+
+        More than `capacity` is allowed once the bucket is full, leaving it in debt,
+        so one large request is delayed rather than refused forever.
+        """
+        if not self.per_minute:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self._level >= needed:
+                    self._level -= amount
+                    return waited
+                delay = (needed - self._level) * 60 / self.per_minute
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount):
+        """Takes `amount` more units (or gives them back if negative), e.g. once the real token count is known."""
+        if not self.per_minute:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self._level - amount, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+
+class AdaptiveConcurrency:
+    """How many calls may run at once, found by AIMD like TCP congestion control.
+
+    Each successful call raises the limit by `1 / limit` (about one per round of
+    calls); a rate-limit error halves it, at most once per round so a burst of
+    errors from the same round counts once. Calls much slower than the fastest
+    seen lately (`latency_factor` times) shrink it by a tenth, before the server
+    starts refusing. Calls whose output tokens are known are compared per token,
+    so long answers are not mistaken for a congested server.
+
+    Args:
+        initial: Starting limit.
+        minimum, maximum: Bounds of the limit.
+        latency_factor: Slowdown over the best latency treated as congestion; None to ignore latency.
+        latency_window: Seconds a best latency is kept, so a server that got slower for good is not taken for a congested one.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, latency_factor=3.0, latency_window=60.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_factor = latency_factor
+        self.latency_window = latency_window
+        self.in_flight = 0
+        # best seconds per call and per output token, with when they were seen
+        self._best = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def best_latency(self):
+        """The fastest call seen lately, in seconds, or None before any."""
+        best = self._best.get("call")
+        return best[0] if best else None
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False, tokens=None):
+        """Ends a call: `throttled` if it hit a rate limit, with its `latency` in seconds and output `tokens` (if known) if it succeeded."""
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if latency is not None and not throttled:
+                self._observe("call", latency, now)
+                if tokens:
+                    self._observe("token", latency / tokens, now)
+            round_trip = self.best_latency or 1.0
+            if throttled:
+                if now - self._last_decrease > round_trip:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            elif (
+                self.latency_factor
+                and latency is not None
+                and self._slow(latency, tokens)
+                and now - self._last_decrease > round_trip
+            ):
+                self.limit = max(self.minimum, self.limit * 0.9)
+                self._last_decrease = now
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _observe(self, unit, latency, now):
+        # called with the lock held; an old best gives way to the next latency
+        best = self._best.get(unit)
+        if best is None or latency <= best[0] or now - best[1] > self.latency_window:
+            self._best[unit] = (latency, now)
+
+    def _slow(self, latency, tokens):
+        unit, latency = ("token", latency / tokens) if tokens else ("call", latency)
+        return latency > self._best[unit][0] * self.latency_factor
+
+
+def status_code(exception):
+    response = getattr(exception, "response", None)
+    return getattr(response, "status_code", None) or getattr(exception, "status_code", None)
+
+
+def is_rate_limited(exception):
+    if status_code(exception) == 429:
+        return True
+    text = str(exception).lower()
+    return "429" in text or "rate limit" in text or "too many requests" in text or "rate_limit" in text
+
+
+def is_retryable(exception):
+    """Rate limits, overloaded or failing servers and dropped connections; not bad requests."""
+    if is_rate_limited(exception) or status_code(exception) in RETRYABLE_STATUS:
+        return True
+    return isinstance(exception, (ConnectionError, TimeoutError)) or type(exception).__name__ in {
+        "ConnectError",
+        "ReadTimeout",
+        "ConnectTimeout",
+        "RemoteProtocolError",
+        "ChunkedEncodingError",
+    }
+
+
+def retry_after(exception):
+    """Seconds the server asked to wait (`Retry-After`), if it did."""
+    headers = getattr(getattr(exception, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Scheduler:
+    """Paces calls to a provider: rate limits, adaptive concurrency and retries.
+
+    Every attempt waits for a concurrency slot, a request and its estimated
+    tokens from the per-minute buckets. Retryable failures are retried after a
+    jittered exponential backoff (full jitter, or the server's `Retry-After`),
+    up to `max_attempts`.
+
+    Args:
+        requests_per_minute, tokens_per_minute: Provider limits, None for none.
+        concurrency: The :class:`AdaptiveConcurrency`, by default starting at 8.
+        max_attempts: Attempts per call, including the first.
+        base_delay, max_delay: Backoff before the first retry, and its ceiling, in seconds.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, concurrency=None, max_attempts=6, base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0, "waited_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt, exception=None):
+        """Seconds to wait before retry number `attempt` (from 1)."""
+        requested = retry_after(exception) if exception is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, estimated_tokens=0, usage=None):
+        """Runs `func()` under the limits, retrying retryable failures.
+
+        `usage(result)` gives the call's `TokenUsage`, which replaces the token estimate.
+        """
+        self._count("calls")
+        for attempt in range(1, self.max_attempts + 1):
+            self.wait(estimated_tokens)
+            started = time.monotonic()
+            try:
+                result = func()
+            except Exception as e:
+                if not self.failed(e, attempt):
+                    raise
+                continue
+            self.succeeded(time.monotonic() - started, estimated_tokens, usage(result) if usage else None)
+            return result
+
+    def succeeded(self, seconds, estimated_tokens=0, usage=None):
+        """Ends an attempt that worked, correcting the token estimate if the usage is known."""
+        if usage is None:
+            self.concurrency.release(latency=seconds)
+            return
+        self.concurrency.release(latency=seconds, tokens=usage.output_tokens)
+        self.tokens.adjust((usage.input_tokens or 0) + (usage.output_tokens or 0) - estimated_tokens)
+
+    def failed(self, exception, attempt, retry=True):
+        """Ends an attempt that raised; waits and returns True if it should be retried."""
+        throttled = is_rate_limited(exception)
+        self.concurrency.release(throttled=throttled)
+        if throttled:
+            self._count("throttled")
+        if not retry or not is_retryable(exception) or attempt == self.max_attempts:
+            self._count("failed")
+            return False
+        self._count("retries")
+        time.sleep(self.backoff(attempt, exception))
+        return True
+
+    def wait(self, estimated_tokens=0):
+        """Takes a concurrency slot, a request and the tokens; release the slot with `concurrency.release`."""
+        started = time.monotonic()
+        self.concurrency.acquire()
+        self.requests.acquire(1)
+        self.tokens.acquire(estimated_tokens)
+        with self._lock:
+            self.stats["waited_seconds"] += time.monotonic() - started
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def estimate_tokens(messages, kwargs):
+    # about four characters a token, plus the output budget
+    characters = 0
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message.content
+        if isinstance(content, list):
+            characters += sum(len(part.get("text", "")) for part in content)
+        else:
+            characters += len(content or "")
+    return characters // 4 + (kwargs.get("max_tokens") or EXPECTED_OUTPUT_TOKENS)
+
+
+class RateLimitedModel(Model):
+    """Wraps a model so every call goes through a :class:`Scheduler`.
+
+    A stream is retried only until its first token arrives: after that, part of
+    the answer is already out.
+
+    Args:
+        model: The model to wrap; turn off its own retries (e.g. `retry=False`) to not retry twice.
+        scheduler: The scheduler, shared by every model calling the same provider.
+    """
+
+    def __init__(self, model, scheduler):
+        super().__init__(model_id=model.model_id)
+        self.model = model
+        self.scheduler = scheduler
+        # generation arguments are the wrapped model's, e.g. for CachedModel's keys
+        self.kwargs = model.kwargs
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        return self.scheduler.call(
+            lambda: self.model.generate(
+                messages,
+                stop_sequences=stop_sequences,
+                response_format=response_format,
+                tools_to_call_from=tools_to_call_from,
+                **kwargs,
+            ),
+            estimated_tokens=estimate_tokens(messages, kwargs),
+            usage=lambda message: message.token_usage,
+        )
+
+    def generate_stream(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        scheduler = self.scheduler
+        estimated = estimate_tokens(messages, kwargs)
+        call_kwargs = dict(stop_sequences=stop_sequences, response_format=response_format, tools_to_call_from=tools_to_call_from, **kwargs)
+        if not hasattr(self.model, "generate_stream"):
+            message = self.generate(messages, **call_kwargs)
+            yield ChatMessageStreamDelta(content=message.content, token_usage=message.token_usage)
+            return
+        scheduler._count("calls")
+        for attempt in range(1, scheduler.max_attempts + 1):
+            scheduler.wait(estimated)
+            started = time.monotonic()
+            usage = None
+            streamed = False
+            try:
+                for delta in self.model.generate_stream(messages, **call_kwargs):
+                    streamed = True
+                    if delta.token_usage is not None:
+                        usage = delta.token_usage
+                    yield delta
+            except Exception as e:
+                if not scheduler.failed(e, attempt, retry=not streamed):
+                    raise
+                continue
+            except BaseException:
+                # the caller stopped reading the stream
+                scheduler.concurrency.release()
+                raise
+            scheduler.succeeded(time.monotonic() - started, estimated, usage)
+            return
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider="default"):
+    """The process-wide scheduler for `provider`, configured from the environment.
+
+    `$AGENT_REQUESTS_PER_MINUTE` and `$AGENT_TOKENS_PER_MINUTE` set the provider's
+    limits (none by default), `$AGENT_MAX_CONCURRENCY` the most calls the
+    adaptive limit may reach (64).
+    """
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            requests_per_minute = os.environ.get("AGENT_REQUESTS_PER_MINUTE")
+            tokens_per_minute = os.environ.get("AGENT_TOKENS_PER_MINUTE")
+            maximum = int(os.environ.get("AGENT_MAX_CONCURRENCY", 64))
+            _schedulers[provider] = Scheduler(
+                requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+                concurrency=AdaptiveConcurrency(initial=min(8, maximum), maximum=maximum),
+            )
+        return _schedulers[provider]
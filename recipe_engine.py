@@ -0,0 +1,120 @@
+# mocktail recipes from an ingredient index built once, many distinct recipes per call
+import functools
+import json
+import os
+import random
+
+# an ingredient is a base or a citrus if its name contains one of these words; anything can be the twist
+BASE_WORDS = ("seltzer", "juice")
+CITRUS_WORDS = ("lime", "lemon", "orange")
+
+RECIPE_STEPS = (
+    "🔸 Start with a cold glass — chilled like your best ideas.",
+    "🔸 Pour 3 oz of {base} as your base — fizzy foundations matter.",
+    "🔸 Add a squeeze of {citrus} for a zesty punch.",
+    "🔸 Stir in a dash of {twist} — trust your instincts here.",
+    "🔸 Optional: Garnish with something that sparks joy.",
+    "🔸 Name your creation: *{name}*. Serve with flair.",
+)
+
+
+class IngredientIndex:
+    """Ingredients sorted into bases, citrus and twists once, instead of on every recipe.
+
+    Args:
+        ingredients: Ingredient names; duplicates are dropped.
+    """
+
+    def __init__(self, ingredients):
+        self.ingredients = tuple(dict.fromkeys(ingredients))
+        lowered = [ingredient.lower() for ingredient in self.ingredients]
+        self.bases = tuple(i for i, name in zip(self.ingredients, lowered) if any(word in name for word in BASE_WORDS))
+        self.citrus = tuple(i for i, name in zip(self.ingredients, lowered) if any(word in name for word in CITRUS_WORDS))
+        self.twists = self.ingredients
+        # distinct (base, citrus, twist) recipes: the three differ, so each pair leaves all twists but itself
+        pairs = sum(1 for base in self.bases for citrus in self.citrus if base != citrus)
+        self.combinations = pairs * max(len(self.twists) - 2, 0)
+
+    def decode(self, number):
+        """The recipe numbered `number` in `range(len(bases) * len(citrus) * len(twists))`, None if not distinct."""
+        number, twist = divmod(number, len(self.twists))
+        base, citrus = divmod(number, len(self.citrus))
+        recipe = (self.bases[base], self.citrus[citrus], self.twists[twist])
+        return recipe if len(set(recipe)) == 3 else None
+
+
+@functools.lru_cache(maxsize=32)
+def ingredient_index(ingredients):
+    """The :class:`IngredientIndex` of a tuple of ingredients, built once per distinct tuple."""
+    return IngredientIndex(ingredients)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_inventory(path, modified):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        return tuple(json.loads(text))
+    return tuple(line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#"))
+
+
+def load_inventory(path):
+    """Ingredients from a file: a JSON list, or one per line with `#` comments. Re-read only when the file changes."""
+    return _load_inventory(os.path.abspath(path), os.path.getmtime(path))
+
+
+def recipe_text(name, base, citrus, twist):
+    return "\n".join(step.format(name=name, base=base, citrus=citrus, twist=twist) for step in RECIPE_STEPS)
+
+
+class RecipeEngine:
+    """Picks recipes from an :class:`IngredientIndex`.
+
+    Args:
+        ingredients: The ingredients to pick from.
+        seed: Seed of the engine's random generator; the same seed gives the same recipes.
+    """
+
+    def __init__(self, ingredients, seed=None):
+        self.index = ingredient_index(tuple(ingredients))
+        self.random = random.Random(seed)
+
+    def recipe(self, name):
+        """One recipe script for the drink `name`."""
+        return self.batch([name])[0]
+
+    def batch(self, names):
+        """One recipe script per name, no two with the same base, citrus and twist.
+
+        Raises:
+            ValueError: If the ingredients allow fewer distinct recipes than names.
+        """
+        return [recipe_text(name, *recipe) for name, recipe in zip(names, self.sample(len(names)))]
+
+    def sample(self, count):
+        """`count` distinct `(base, citrus, twist)` triples."""
+        index = self.index
+        if count > index.combinations:
+            raise ValueError(
+                f"These ingredients make {index.combinations} distinct recipes, not {count}: "
+                "add bases (seltzers, juices), citrus or other ingredients"
+            )
+        if count == 0:
+            return []
+        total = len(index.bases) * len(index.citrus) * len(index.twists)
+        if count > index.combinations // 2:
+            # most recipes are wanted: shuffling them all is cheaper than drawing until enough are new
+            numbers = self.random.sample(range(total), total)
+        else:
+            numbers = iter(lambda: self.random.randrange(total), None)
+        recipes, seen = [], set()
+        for number in numbers:
+            if number in seen:
+                continue
+            seen.add(number)
+            recipe = index.decode(number)
+            if recipe is not None:
+                recipes.append(recipe)
+                if len(recipes) == count:
+                    break
+        return recipes
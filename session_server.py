@@ -0,0 +1,186 @@
+# serve an agent to many gradio users at once, one agent per browser session
+import argparse
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from rich.console import Console
+from smolagents import GradioUI
+
+from agent_memory import SessionMemory
+from batch_runner import agent_tree, load_entry_point
+from streaming import enable_streaming
+from tracing import Tracer
+
+# spans a server's trace keeps; it is rewritten after every message
+MAX_TRACE_SPANS = 20000
+
+
+class SessionPool:
+    """Keeps one agent per session, built on first use by `build_agent`.
+
+    Agents hold the conversation memory, so sessions never share one. The model
+    client is shared: the first agent built is kept as a prototype and its model is
+    passed to `build_agent(model=...)` for every session. Tools returned by the MCP
+    pool are already shared by the whole process.
+
+    Args:
+        build_agent: Callable returning a fresh agent, accepting an optional `model`.
+        max_sessions: Idle sessions beyond this are dropped, least recently used first.
+        idle_timeout: Seconds after which an idle session is dropped.
+        tracer: Optional `Tracer` shared by all sessions.
+    """
+
+    def __init__(self, build_agent, max_sessions=64, idle_timeout=1800, tracer=None):
+        self.build_agent = build_agent
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.tracer = tracer
+        self.prototype = build_agent()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_agent(self, session_id):
+        agent = self.build_agent(model=self.prototype.model)
+        enable_streaming(agent)
+        # the conversation carries over between messages, within a bounded prompt
+        SessionMemory(session_id).attach(agent)
+        for member in agent_tree(agent):
+            # rich allows one live display per console, and streaming agents open one per run
+            member.logger.console = Console(quiet=True)
+        if self.tracer is not None:
+            self.tracer.instrument(agent, report=False)
+        return agent
+
+    def acquire(self, session_id):
+        """Returns the session's agent and marks it busy until `release`."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {"agent": None, "lock": threading.Lock(), "busy": 0, "used": time.time()}
+                self._sessions[session_id] = session
+            session["busy"] += 1
+            session["used"] = time.time()
+            self._sessions.move_to_end(session_id)
+            self._evict()
+        # one run per session at a time, building the agent outside the pool lock
+        session["lock"].acquire()
+        if session["agent"] is None:
+            try:
+                session["agent"] = self._new_agent(session_id)
+            except Exception:
+                self.release(session_id, session)
+                raise
+        return session
+
+    def release(self, session_id, session):
+        session["lock"].release()
+        with self._lock:
+            session["busy"] -= 1
+            session["used"] = time.time()
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and not session["busy"]:
+                del self._sessions[session_id]
+
+    def _evict(self):
+        # called with the lock held; busy sessions are never dropped
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if session["busy"]:
+                continue
+            if len(self._sessions) > self.max_sessions or now - session["used"] > self.idle_timeout:
+                del self._sessions[session_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SessionGradioUI(GradioUI):
+    """`GradioUI` giving every browser session its own agent from a `SessionPool`.
+
+    Args:
+        sessions: The `SessionPool` to take agents from.
+        concurrency_limit: Agent runs executing at the same time across all users.
+        max_queue: Requests waiting for a free slot; users beyond it are told the queue is full.
+    """
+
+    def __init__(self, sessions, concurrency_limit=8, max_queue=64, **kwargs):
+        super().__init__(sessions.prototype, **kwargs)
+        self.sessions = sessions
+        self.concurrency_limit = concurrency_limit
+        self.max_queue = max_queue
+
+    def _session_response(self, message, history, session_id):
+        session_id = session_id or uuid.uuid4().hex
+        session = self.sessions.acquire(session_id)
+        try:
+            for messages in self._stream_response_for(session["agent"], message, history):
+                yield messages, session_id
+        finally:
+            self.sessions.release(session_id, session)
+            if self.sessions.tracer is not None:
+                self.sessions.tracer.save()
+
+    def _stream_response_for(self, agent, message, history):
+        # GradioUI reads self.agent, so run it on a shallow copy bound to the session's agent
+        ui = object.__new__(GradioUI)
+        ui.__dict__.update(self.__dict__, agent=agent)
+        return GradioUI._stream_response(ui, message, history)
+
+    def create_app(self):
+        import gradio as gr
+
+        # the session id lives in the browser tab; gradio drops it when the tab closes
+        session_state = gr.State(None, delete_callback=self.sessions.drop)
+        demo = gr.ChatInterface(
+            fn=self._session_response,
+            chatbot=gr.Chatbot(label="Agent"),
+            title=self.name.replace("_", " ").capitalize(),
+            multimodal=self.file_upload_folder is not None,
+            additional_inputs=[session_state],
+            additional_outputs=[session_state],
+            concurrency_limit=self.concurrency_limit,
+            api_name="chat",
+        )
+        return demo.queue(max_size=self.max_queue)
+
+
+def serve(build_agent, concurrency_limit=8, max_queue=64, max_sessions=64, trace=None, **launch_kwargs):
+    """Launches a multi-session Gradio app for `build_agent`.
+
+    With `trace`, runs are traced to that file, which keeps the latest
+    `MAX_TRACE_SPANS` spans so a long-lived server's trace stays small.
+    """
+    tracer = Tracer(trace, max_spans=MAX_TRACE_SPANS) if trace else None
+    sessions = SessionPool(build_agent, max_sessions=max_sessions, tracer=tracer)
+    SessionGradioUI(sessions, concurrency_limit=concurrency_limit, max_queue=max_queue).launch(**launch_kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an entry point's agent to many users, one agent per session.")
+    parser.add_argument("entry_point", help="script defining build_agent(model=None), e.g. 5_ui.py")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="agent runs at the same time")
+    parser.add_argument("-q", "--max-queue", type=int, default=64, help="requests waiting for a slot")
+    parser.add_argument("-s", "--max-sessions", type=int, default=64, help="idle sessions kept in memory")
+    parser.add_argument("--trace", help="write a Chrome trace of the latest runs of all sessions to this file")
+    parser.add_argument("--share", action="store_true", help="create a public gradio link")
+    args = parser.parse_args()
+
+    module = load_entry_point(args.entry_point)
+    serve(
+        module.build_agent,
+        concurrency_limit=args.concurrency,
+        max_queue=args.max_queue,
+        max_sessions=args.max_sessions,
+        trace=args.trace,
+        share=args.share,
+    )
+
+
+if __name__ == '__main__':
+    main()
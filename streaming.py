@@ -0,0 +1,78 @@
+# stream model tokens and agent steps as they happen
+import sys
+
+from rich.console import Console
+from smolagents import ActionStep, FinalAnswerStep, PlanningStep
+from smolagents.models import ChatMessageStreamDelta
+
+
+def enable_streaming(agent):
+    """Turns on token streaming for an agent whose model supports `generate_stream`.
+
+    `GradioUI` streams tokens into the chat by itself once this is set.
+    """
+    if hasattr(agent.model, "generate_stream"):
+        agent.stream_outputs = True
+    return agent
+
+
+def iter_events(agent, task, reset=True):
+    """Runs `agent` on `task` and yields plain dict events as they happen.
+
+    Events are `{"type": "token", "text"}` for model output, `{"type": "plan", "plan"}`,
+    `{"type": "step", "step", "seconds", "input_tokens", "output_tokens", "observations", "error"}`
+    after each action step, and finally `{"type": "final", "output"}`.
+    """
+    enable_streaming(agent)
+    for event in agent.run(task, stream=True, reset=reset):
+        if isinstance(event, ChatMessageStreamDelta):
+            if event.content:
+                yield {"type": "token", "text": event.content}
+        elif isinstance(event, PlanningStep):
+            yield {"type": "plan", "plan": event.plan}
+        elif isinstance(event, ActionStep):
+            usage = event.token_usage
+            yield {
+                "type": "step",
+                "step": event.step_number,
+                "seconds": event.timing.duration,
+                "input_tokens": usage.input_tokens if usage else None,
+                "output_tokens": usage.output_tokens if usage else None,
+                "observations": event.observations,
+                "error": str(event.error) if event.error else None,
+            }
+        elif isinstance(event, FinalAnswerStep):
+            yield {"type": "final", "output": event.output}
+
+
+def print_stream(agent, task, file=None, reset=True):
+    """REPL helper: prints tokens and step summaries while the agent runs.
+
+    The agent's own console output is muted for the run so nothing is shown twice.
+    Returns the final answer.
+    """
+    file = file or sys.stdout
+    console, agent.logger.console = agent.logger.console, Console(quiet=True)
+    output = None
+    try:
+        for event in iter_events(agent, task, reset=reset):
+            if event["type"] == "token":
+                file.write(event["text"])
+                file.flush()
+            elif event["type"] == "plan":
+                file.write(f"\n{event['plan']}\n")
+            elif event["type"] == "step":
+                summary = f"\n[step {event['step']}: {event['seconds']:.2f}s"
+                if event["input_tokens"] is not None:
+                    summary += f", {event['input_tokens']:,} input / {event['output_tokens']:,} output tokens"
+                file.write(summary + "]\n")
+                if event["observations"]:
+                    file.write(event["observations"].rstrip() + "\n")
+                if event["error"]:
+                    file.write(f"Error: {event['error']}\n")
+            elif event["type"] == "final":
+                output = event["output"]
+        file.flush()
+    finally:
+        agent.logger.console = console
+    return output
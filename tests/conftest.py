@@ -0,0 +1,7 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules are flat scripts next to each other, the fake model lives with the benchmarks
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
@@ -0,0 +1,46 @@
+import pytest
+from fake_model import FakeModel
+from smolagents import CodeAgent
+
+from executor_pool import WorkerPool, use_worker_pool
+
+
+class FailingModel(FakeModel):
+    def generate(self, messages, **kwargs):
+        raise RuntimeError("provider down")
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, preload=())
+    yield pool
+    pool.close()
+
+
+def test_worker_returned_after_answer(pool):
+    agent = use_worker_pool(CodeAgent(tools=[], model=FakeModel(latency=0), verbosity_level=0), pool)
+    assert agent.run("anything") == "benchmark done"
+    assert pool._leased == 0
+    assert agent.python_executor._worker is None
+
+
+def test_worker_returned_after_failed_runs(pool):
+    agent = use_worker_pool(CodeAgent(tools=[], model=FailingModel(latency=0), verbosity_level=0), pool)
+    for _ in range(3):
+        with pytest.raises(Exception):
+            agent.run("anything")
+    assert pool._leased == 0
+    assert agent.python_executor._worker is None
+
+
+def test_worker_returned_when_stream_is_closed(pool):
+    agent = use_worker_pool(CodeAgent(tools=[], model=FakeModel(latency=0), verbosity_level=0), pool)
+    events = agent.run("anything", stream=True)
+    next(events)
+    next(events)
+    try:
+        events.close()
+    except RuntimeError:
+        # smolagents' run stream yields its final step even when closed
+        pass
+    assert pool._leased == 0
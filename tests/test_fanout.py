@@ -0,0 +1,57 @@
+import threading
+import time
+
+import fanout
+from fanout import DispatchTool
+
+
+class StubAgent:
+    """Answers after `seconds`, or at its next step once interrupted; with `stuck`, not before `seconds`."""
+
+    def __init__(self, name, seconds=0.0, stuck=False):
+        self.name = name
+        self.seconds = seconds
+        self.stuck = stuck
+        self.interrupted = threading.Event()
+
+    def __call__(self, task):
+        self.interrupted.clear()
+        if self.stuck:
+            time.sleep(self.seconds)
+        elif self.interrupted.wait(self.seconds):
+            raise RuntimeError("Agent interrupted.")
+        return f"{self.name}: {task}"
+
+    def interrupt(self):
+        self.interrupted.set()
+
+
+def test_calls_run_at_the_same_time():
+    tool = DispatchTool([StubAgent("a", 0.3), StubAgent("b", 0.3)], timeout=5)
+    started = time.monotonic()
+    results = tool.forward([{"agent": "a", "task": "one"}, {"agent": "b", "task": "two"}])
+
+    assert time.monotonic() - started < 0.5
+    assert [result["result"] for result in results] == ["a: one", "b: two"]
+
+
+def test_slow_agent_is_interrupted_at_its_next_step():
+    tool = DispatchTool([StubAgent("slow", 10), StubAgent("fast")], timeout=0.2)
+    results = tool.forward([{"agent": "slow", "task": "one"}, {"agent": "fast", "task": "two"}])
+
+    assert results[0]["error"] == "timed out after 0.2s"
+    assert results[1]["result"] == "fast: two"
+
+
+def test_agent_stuck_in_a_step_does_not_hold_up_the_manager(monkeypatch):
+    monkeypatch.setattr(fanout, "INTERRUPT_GRACE", 0.2)
+    stuck = StubAgent("stuck", 5, stuck=True)
+    tool = DispatchTool([stuck, StubAgent("fast")], timeout=0.2)
+
+    started = time.monotonic()
+    results = tool.forward([{"agent": "stuck", "task": "one"}, {"agent": "fast", "task": "two"}])
+
+    assert time.monotonic() - started < 1
+    assert results[0]["error"] == "timed out after 0.2s, interrupted in the background"
+    assert results[1]["result"] == "fast: two"
+    assert stuck.interrupted.is_set()
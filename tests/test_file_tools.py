@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from file_tools import close_file_writer, open_file_writer, write_chunk, write_files
+
+
+@pytest.fixture
+def umask():
+    previous = os.umask(0o027)
+    yield 0o027
+    os.umask(previous)
+
+
+def test_write_files_writes_them_all(tmp_path):
+    first, second = tmp_path / "a.txt", tmp_path / "sub" / "b.txt"
+    first.write_text("old")
+
+    result = write_files({str(first): "new a", str(second): "new b"})
+
+    assert result.startswith("Wrote 2 files")
+    assert first.read_text() == "new a" and second.read_text() == "new b"
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "sub"]
+
+
+def test_failed_replace_rolls_back_the_files_already_written(tmp_path):
+    replaced, created, directory = tmp_path / "a.txt", tmp_path / "b.txt", tmp_path / "c"
+    replaced.write_text("old")
+    directory.mkdir()
+
+    # a directory can't be replaced by a file: the third rename fails after the first two
+    result = write_files({str(replaced): "new", str(created): "new", str(directory): "new"})
+
+    assert result.startswith("Error writing files, none was changed")
+    assert replaced.read_text() == "old"
+    assert not created.exists()
+    assert directory.is_dir()
+    # no temp files or backups left behind
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "c"]
+
+
+def test_new_files_follow_the_umask(tmp_path, umask):
+    path = tmp_path / "new.txt"
+    write_files({str(path): "text"})
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_replaced_files_keep_their_mode(tmp_path, umask):
+    path = tmp_path / "private.txt"
+    path.write_text("old")
+    path.chmod(0o600)
+    write_files({str(path): "new"})
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_discarded_writer_leaves_the_file_as_it_was(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("old")
+
+    handle = open_file_writer(str(path), append=True)
+    write_chunk(handle, " and more")
+    assert path.read_text() == "old"
+    close_file_writer(handle, commit=False)
+
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["a.txt"]
+
+    handle = open_file_writer(str(path), append=True)
+    write_chunk(handle, " and more")
+    close_file_writer(handle)
+    assert path.read_text() == "old and more"
@@ -0,0 +1,48 @@
+import time
+
+import mcp_loader
+
+
+def fake_load_tools(pool, name, report=None):
+    time.sleep(pool[name])
+    return [f"{name}_tool"]
+
+
+def test_hung_server_does_not_block_the_caller(monkeypatch):
+    monkeypatch.setattr(mcp_loader, "load_tools", fake_load_tools)
+    started = time.perf_counter()
+    tools, report = mcp_loader.load_servers({"fast": 0.1, "hung": 8}, ["fast", "hung"], timeout=1)
+    elapsed = time.perf_counter() - started
+
+    assert 1 <= elapsed < 1.5
+    assert tools == ["fast_tool"]
+    assert report["fast"]["error"] is None
+    assert report["hung"]["error"] == "timed out after 1s"
+
+
+def test_failing_server_is_reported(monkeypatch):
+    def failing(pool, name, report=None):
+        raise RuntimeError("no such server")
+
+    monkeypatch.setattr(mcp_loader, "load_tools", failing)
+    tools, report = mcp_loader.load_servers({}, ["broken"], timeout=1)
+
+    assert tools == []
+    assert report["broken"]["error"] == "no such server"
+
+
+def test_cache_hits_are_told_apart_from_started_servers(monkeypatch, capsys):
+    def load_tools(pool, name, report=None):
+        report["cached"] = name == "cached"
+        report["startup_seconds"] = None if name == "cached" else 1.5
+        return [f"{name}_tool"]
+
+    monkeypatch.setattr(mcp_loader, "load_tools", load_tools)
+    tools, report = mcp_loader.load_servers({}, ["cached", "started"], timeout=1)
+
+    assert report["cached"]["cached"] and report["cached"]["startup_seconds"] is None
+    assert not report["started"]["cached"] and report["started"]["startup_seconds"] == 1.5
+    mcp_loader.print_report(report)
+    cached, started = capsys.readouterr().out.splitlines()
+    assert "from the tool cache" in cached and "started in" not in cached
+    assert "started in 1.50s" in started
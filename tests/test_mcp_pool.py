@@ -0,0 +1,74 @@
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+from mcp import StdioServerParameters
+
+from mcp_pool import MCPServerPool
+
+SERVER = textwrap.dedent(
+    """
+    import os
+    import time
+
+    from mcp.server.fastmcp import FastMCP
+
+    # replicas started once the marker exists are slow to come up
+    if os.path.exists(os.environ["SLOW_START"]):
+        time.sleep(3)
+
+    server = FastMCP("test")
+
+
+    @server.tool()
+    def wait(seconds: float) -> str:
+        time.sleep(seconds)
+        return "done"
+
+
+    server.run()
+    """
+)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    marker = tmp_path / "slow"
+    pool = MCPServerPool(size=2)
+    pool.register("test", StdioServerParameters(command=sys.executable, args=[str(script)], env={"SLOW_START": str(marker)}))
+    pool.marker = marker
+    yield pool
+    pool.close()
+
+
+def test_calls_go_on_while_a_replica_starts(pool):
+    pool.definitions("test")
+    pool.marker.touch()
+
+    busy = threading.Thread(target=pool.call, args=("test", "wait", {"seconds": 2}))
+    busy.start()
+    time.sleep(0.5)
+    # both replicas' worth of calls: this one starts the second, slowly
+    starting = threading.Thread(target=pool.call, args=("test", "wait", {"seconds": 0}))
+    starting.start()
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    pool.metrics()
+    pool.call("test", "wait", {"seconds": 0})
+    # queued on the first replica instead of waiting behind the start
+    assert time.perf_counter() - started < 2
+    busy.join()
+    starting.join()
+    assert pool.metrics()["test"]["replicas"] == 2
+
+
+def test_errors_are_counted(pool):
+    with pytest.raises(ValueError):
+        pool.call("test", "missing")
+    assert pool.metrics()["test"]["errors"] == 1
+    assert pool.metrics()["test"]["calls"] == 1
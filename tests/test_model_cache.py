@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from fake_model import FakeModel
+from smolagents.models import (
+    ChatMessage,
+    ChatMessageToolCall,
+    ChatMessageToolCallFunction,
+    MessageRole,
+    agglomerate_stream_deltas,
+)
+
+from model_cache import CachedModel, ResponseCache
+
+MESSAGES = [{"role": "user", "content": [{"type": "text", "text": "What is 2 + 2?"}]}]
+
+
+class CountingModel(FakeModel):
+    def __init__(self):
+        super().__init__(latency=0)
+        self.calls = 0
+
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        return super().generate(messages, **kwargs)
+
+    def generate_stream(self, messages, **kwargs):
+        self.calls += 1
+        yield from super().generate_stream(messages, **kwargs)
+
+
+class ToolCallingModel(CountingModel):
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        tool_call = ChatMessageToolCall(
+            id="call_0", type="function", function=ChatMessageToolCallFunction(name="add", arguments={"a": 2, "b": 2})
+        )
+        return ChatMessage(role=MessageRole.ASSISTANT, content="", tool_calls=[tool_call])
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(path=None)
+
+
+def test_miss_then_hit(cache):
+    model = CountingModel()
+    cached = CachedModel(model, cache)
+    first = cached.generate(MESSAGES)
+    second = cached.generate(MESSAGES)
+
+    assert model.calls == 1
+    assert second.content == first.content
+    assert second.token_usage.input_tokens == second.token_usage.output_tokens == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_different_requests_miss(cache):
+    model = CountingModel()
+    cached = CachedModel(model, cache)
+    cached.generate(MESSAGES)
+    cached.generate([{"role": "user", "content": "What is 3 + 3?"}])
+    cached.generate(MESSAGES, stop_sequences=["Observation:"])
+
+    assert model.calls == 3
+
+
+def test_entries_expire(cache, monkeypatch):
+    cache.put("key", {"content": "old"})
+    assert cache.get("key") == {"content": "old"}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + cache.ttl + 1)
+    assert cache.get("key") is None
+
+
+def test_expired_entries_leave_disk(tmp_path, monkeypatch):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path=path).put("key", {"content": "old"})
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 7 * 24 * 3600 + 1)
+    assert ResponseCache(path=path).get("key") is None
+    monkeypatch.undo()
+    assert ResponseCache(path=path).get("key") is None
+
+
+def test_least_recently_used_evicted_from_memory():
+    cache = ResponseCache(path=None, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_least_recently_used_evicted_from_disk(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path=path, max_entries=1, max_disk_entries=2)
+    for key in "abc":
+        cache.put(key, key)
+
+    # a fresh cache has nothing in memory, so this reads the disk tier
+    reopened = ResponseCache(path=path)
+    assert reopened.get("a") is None
+    assert reopened.get("b") == "b" and reopened.get("c") == "c"
+    assert reopened.stats()["disk_hits"] == 2
+
+
+def test_streamed_hit_replays_the_answer(cache):
+    model = CountingModel()
+    cached = CachedModel(model, cache)
+    streamed = agglomerate_stream_deltas(list(cached.generate_stream(MESSAGES)))
+    replayed = list(cached.generate_stream(MESSAGES))
+
+    assert model.calls == 1
+    assert len(replayed) == 1
+    assert replayed[0].content == streamed.content
+    assert replayed[0].token_usage.output_tokens == 0
+
+
+def test_streamed_hit_replays_tool_calls(cache):
+    model = ToolCallingModel()
+    cached = CachedModel(model, cache)
+    answer = cached.generate(MESSAGES)
+    replayed = agglomerate_stream_deltas(list(cached.generate_stream(MESSAGES)))
+
+    assert model.calls == 1
+    assert [call.function.name for call in replayed.tool_calls] == ["add"]
+    assert replayed.tool_calls[0].id == answer.tool_calls[0].id
+    assert replayed.tool_calls[0].function.arguments == '{"a": 2, "b": 2}'
@@ -0,0 +1,117 @@
+import pytest
+from fake_model import FakeModel
+from smolagents import CodeAgent, tool
+
+from model_router import RoutingModel, route_model
+
+
+class RecordingModel(FakeModel):
+    def __init__(self, model_id, fails=False):
+        super().__init__(latency=0, model_id=model_id)
+        self.fails = fails
+        self.calls = []
+
+    def generate(self, messages, **kwargs):
+        self.calls.append(messages)
+        if self.fails:
+            raise RuntimeError(f"{self.model_id} is down")
+        return super().generate(messages, **kwargs)
+
+
+@tool
+def lookup(query: str) -> str:
+    """Looks something up.
+
+    Args:
+        query: What to look up.
+    """
+    return "found"
+
+
+@tool
+def broken(query: str) -> str:
+    """Always fails.
+
+    Args:
+        query: Anything.
+    """
+    raise ValueError("broken tool")
+
+
+@pytest.fixture
+def models():
+    return RecordingModel("small"), RecordingModel("large")
+
+
+def routed_agent(models, tools=(), routes=None, **kwargs):
+    small, large = models
+    agent = CodeAgent(tools=list(tools), model=large, verbosity_level=0, **kwargs)
+    return route_model(agent, small=small, routes=routes)
+
+
+def kinds(agent, model):
+    return [agent.model.kind(messages) for messages in model.calls]
+
+
+def test_steps_go_to_the_small_model(models):
+    small, large = models
+    agent = routed_agent(models, [lookup])
+
+    assert agent.run("Look it up.") == "benchmark done"
+    assert kinds(agent, small) == ["step", "step"]
+    assert large.calls == []
+    assert agent.model.stats == {"small": 2, "large": 0, "escalations": 0}
+
+
+def test_planning_goes_to_the_large_model(models):
+    small, large = models
+    agent = routed_agent(models, [lookup], planning_interval=5)
+    agent.run("Look it up.")
+
+    assert kinds(agent, large) == ["planning"]
+    assert kinds(agent, small) == ["step"]
+
+
+def test_final_answer_after_the_last_step_goes_to_the_large_model(models):
+    small, large = models
+    agent = routed_agent(models, [lookup], max_steps=1)
+    agent.run("Look it up.")
+
+    assert kinds(agent, small) == ["step"]
+    assert kinds(agent, large) == ["final_answer"]
+
+
+def test_routes_override_the_defaults(models):
+    small, large = models
+    agent = routed_agent(models, [lookup], routes={"step": "large"})
+    agent.run("Look it up.")
+
+    assert small.calls == []
+    assert kinds(agent, large) == ["step", "step"]
+
+
+def test_step_after_an_error_escalates(models):
+    small, large = models
+    agent = routed_agent(models, [broken])
+    agent.run("Use the broken tool.")
+
+    # the first step fails on the tool, the one after it goes large
+    assert kinds(agent, small) == ["step"]
+    assert kinds(agent, large) == ["step"]
+    assert agent.model.stats == {"small": 1, "large": 1, "escalations": 1}
+
+
+def test_small_model_failure_escalates():
+    small, large = RecordingModel("small", fails=True), RecordingModel("large")
+    agent = routed_agent((small, large), [lookup])
+
+    assert agent.run("Look it up.") == "benchmark done"
+    assert len(small.calls) == len(large.calls) == 2
+    assert agent.model.stats == {"small": 0, "large": 2, "escalations": 2}
+
+
+def test_routing_twice_keeps_the_large_model(models):
+    small, large = models
+    agent = route_model(routed_agent(models), small=small)
+    assert isinstance(agent.model, RoutingModel)
+    assert agent.model.large is large
@@ -0,0 +1,53 @@
+import json
+from types import SimpleNamespace
+
+from news_index import NewsIndex, NewsIngester
+
+
+class FeedPool:
+    """Answers `latest_news` with whatever `items` holds, recording the arguments."""
+
+    def __init__(self):
+        self.items = []
+        self.arguments = []
+
+    def definitions(self, server):
+        schema = {"type": "object", "properties": {"since": {"type": "string"}}}
+        return [SimpleNamespace(name="latest_news", inputSchema=schema)]
+
+    def call(self, server, tool_name, arguments):
+        self.arguments.append(arguments)
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(self.items))], isError=False)
+
+
+def item(url, published):
+    return {"url": url, "title": url.rsplit("/", 1)[-1], "published": published}
+
+
+def test_late_items_with_older_dates_are_indexed():
+    pool = FeedPool()
+    index = NewsIndex(":memory:")
+    ingester = NewsIngester(index, pool=pool)
+
+    pool.items = [item("https://news.test/a", "2026-01-02T00:00:00Z"), item("https://news.test/b", "2026-01-03T00:00:00Z")]
+    assert ingester.ingest()["new"] == 2
+
+    # published today, dated before the checkpoint; the items seen before are not added again
+    pool.items = [item("https://news.test/b", "2026-01-03T00:00:00Z"), item("https://news.test/late", "2026-01-01T00:00:00Z")]
+    assert ingester.ingest()["new"] == 1
+    assert index.count() == 3
+    assert pool.arguments[-1] == {"since": "2026-01-03T00:00:00+00:00"}
+
+
+def test_checkpoint_never_moves_back():
+    pool = FeedPool()
+    index = NewsIndex(":memory:")
+    ingester = NewsIngester(index, pool=pool)
+
+    pool.items = [item("https://news.test/a", "2026-01-03T00:00:00Z")]
+    ingester.ingest()
+    pool.items = [item("https://news.test/late", "2026-01-01T00:00:00Z")]
+    ingester.ingest()
+    ingester.ingest()
+
+    assert pool.arguments[-1] == {"since": "2026-01-03T00:00:00+00:00"}
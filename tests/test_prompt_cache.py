@@ -0,0 +1,85 @@
+from fake_model import FakeModel
+from smolagents import CodeAgent, tool
+
+from prompt_cache import MIN_SHARED_DESCRIPTION, PromptLayout, use_prompt_cache
+
+QUERY = "The text to look for, in plain words, as a user would type it into a search box."
+
+
+@tool
+def search_news(query: str) -> str:
+    """Searches the news.
+
+    Args:
+        query: The text to look for, in plain words, as a user would type it into a search box.
+    """
+    return "no news"
+
+
+@tool
+def search_web(query: str) -> str:
+    """Searches the web.
+
+    Args:
+        query: The text to look for, in plain words, as a user would type it into a search box.
+    """
+    return "no pages"
+
+
+@tool
+def word_count(text: str) -> int:
+    """Counts the words of a text.
+
+    Args:
+        text: The text.
+    """
+    return len(text.split())
+
+
+def make_agent(tools, model):
+    return use_prompt_cache(CodeAgent(tools=tools, model=model, verbosity_level=0), layout=PromptLayout())
+
+
+def system_prompt(agent):
+    agent.memory.system_prompt.system_prompt = agent.initialize_system_prompt()
+    return agent.memory.system_prompt.system_prompt
+
+
+def test_prompt_is_identical_across_runs():
+    agent = make_agent([search_news, word_count], FakeModel(latency=0))
+    prompts = []
+    for _ in range(2):
+        agent.run("How many words?")
+        prompts.append(agent.memory.system_prompt.system_prompt)
+    assert prompts[0] == prompts[1]
+
+
+def test_prompt_does_not_depend_on_tool_order():
+    model = FakeModel(latency=0)
+    layout = PromptLayout()
+    first = use_prompt_cache(CodeAgent(tools=[search_news, search_web, word_count], model=model), layout=layout)
+    second = use_prompt_cache(CodeAgent(tools=[word_count, search_web, search_news], model=model), layout=layout)
+    # rendered once, shared by both agents
+    assert system_prompt(first) is system_prompt(second)
+
+
+def test_repeated_descriptions_are_shared():
+    assert len(QUERY) >= MIN_SHARED_DESCRIPTION
+    prompt = system_prompt(make_agent([search_web, search_news, word_count], FakeModel(latency=0)))
+    assert prompt.count(QUERY) == 1
+    assert "as in search_news." in prompt
+    # short descriptions are left in place
+    assert "text: The text." in prompt
+
+
+def test_reordered_agents_reuse_the_servers_prefix_cache():
+    def prefilled(tool_lists):
+        model = FakeModel(latency=0, prefill_tokens_per_second=10**9)
+        for tools in tool_lists:
+            make_agent(tools, model).run("How many words?")
+        return model.prefilled_tokens
+
+    once = prefilled([[search_news, search_web, word_count]])
+    twice = prefilled([[search_news, search_web, word_count], [word_count, search_web, search_news]])
+    # the second agent's prompts start like the first one's, so hardly any of it is processed again
+    assert twice - once < once / 10
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+from huggingface_hub import InferenceClient
+from mock_inference_server import serve
+from smolagents import InferenceClientModel
+
+from rate_limit import AdaptiveConcurrency, RateLimitedModel, Scheduler, retry_after
+
+MESSAGES = [{"role": "user", "content": [{"type": "text", "text": "hi"}]}]
+
+
+@pytest.fixture
+def mock_provider():
+    servers = []
+
+    def start(**limits):
+        server, provider = serve(**limits)
+        servers.append(server)
+        return provider, InferenceClientModel(model_id="mock", client=InferenceClient(base_url=server.url), retry=False)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def run_at_once(model, calls):
+    errors = []
+
+    def call():
+        try:
+            model.generate(MESSAGES)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_rate_limited_calls_are_retried(mock_provider):
+    provider, model = mock_provider(max_concurrency=2, latency=0.1)
+    scheduler = Scheduler(concurrency=AdaptiveConcurrency(initial=8), max_attempts=20, base_delay=0.05)
+
+    assert run_at_once(RateLimitedModel(model, scheduler), 8) == []
+    assert provider.stats["rate_limited"] > 0
+    assert provider.stats["served"] == 8
+    assert scheduler.stats["retries"] >= provider.stats["rate_limited"]
+    assert scheduler.stats["failed"] == 0
+
+
+def test_retry_after_is_honoured(mock_provider):
+    provider, model = mock_provider(requests_per_minute=1, latency=0)
+    scheduler = Scheduler(max_delay=0.3, base_delay=0.01)
+    requested = []
+
+    def backoff(attempt, exception=None):
+        requested.append(retry_after(exception))
+        provider.requests_per_minute = None
+        return Scheduler.backoff(scheduler, attempt, exception)
+
+    scheduler.backoff = backoff
+    limited = RateLimitedModel(model, scheduler)
+    limited.generate(MESSAGES)
+    started = time.monotonic()
+    limited.generate(MESSAGES)
+
+    # the server asked for the rest of its minute, capped at max_delay
+    assert len(requested) == 1 and 59 < requested[0] <= 60
+    assert time.monotonic() - started >= 0.3
+
+
+def test_request_bucket_paces_calls(mock_provider):
+    provider, model = mock_provider(requests_per_minute=8, latency=0)
+    # a burst of 2, then one call every half second
+    scheduler = Scheduler(requests_per_minute=120)
+    scheduler.requests.capacity = scheduler.requests._level = 2
+    limited = RateLimitedModel(model, scheduler)
+
+    started = time.monotonic()
+    for _ in range(4):
+        limited.generate(MESSAGES)
+    elapsed = time.monotonic() - started
+
+    assert 0.9 <= elapsed < 2
+    assert provider.stats["rate_limited"] == 0
+
+
+def test_concurrency_halves_on_rate_limits_and_recovers(mock_provider):
+    provider, model = mock_provider(max_concurrency=2, latency=0.1)
+    concurrency = AdaptiveConcurrency(initial=16)
+    limited = RateLimitedModel(model, Scheduler(concurrency=concurrency, max_attempts=20, base_delay=0.05))
+
+    assert run_at_once(limited, 16) == []
+    assert concurrency.limit <= 8
+    lowered = concurrency.limit
+
+    for _ in range(10):
+        limited.generate(MESSAGES)
+    assert concurrency.limit > lowered
+
+
+def test_burst_of_rate_limits_halves_once():
+    concurrency = AdaptiveConcurrency(initial=8)
+    for _ in range(3):
+        concurrency.acquire()
+    for _ in range(3):
+        concurrency.release(throttled=True)
+    assert concurrency.limit == 4
+
+
+def test_latency_units_are_not_mixed():
+    concurrency = AdaptiveConcurrency(initial=8)
+    for _ in range(2):
+        concurrency.acquire()
+    # a long answer, fast per token, then a call whose usage is unknown
+    concurrency.release(latency=2.0, tokens=1000)
+    concurrency.release(latency=1.0)
+    assert concurrency.limit > 8
+
+
+def test_best_latency_ages_out():
+    concurrency = AdaptiveConcurrency(initial=8, latency_window=0.05)
+    for _ in range(2):
+        concurrency.acquire()
+    concurrency.release(latency=0.01)
+    time.sleep(0.1)
+    # the server got slower for good: no longer compared with the old best
+    concurrency.release(latency=1.0)
+    assert concurrency.best_latency == 1.0
+    assert concurrency.limit > 8
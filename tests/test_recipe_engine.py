@@ -0,0 +1,74 @@
+import itertools
+import os
+
+import pytest
+
+from recipe_engine import IngredientIndex, RecipeEngine, load_inventory
+
+INGREDIENTS = ["Seltzer", "Apple juice", "Lime", "Lemon", "Mint", "Ginger", "Honey"]
+
+
+def brute_force(ingredients):
+    index = IngredientIndex(ingredients)
+    return {
+        recipe
+        for recipe in itertools.product(index.bases, index.citrus, index.twists)
+        if len(set(recipe)) == 3
+    }
+
+
+def test_combinations_match_every_distinct_recipe():
+    for ingredients in (INGREDIENTS, ["Lime juice", "Orange juice", "Lemon", "Mint"], ["Seltzer", "Lime"]):
+        assert IngredientIndex(ingredients).combinations == len(brute_force(ingredients))
+
+
+@pytest.mark.parametrize("count", [1, 5, 15])
+def test_recipes_are_distinct(count):
+    # 15 of the 20 recipes takes the shuffling path, fewer the drawing one
+    recipes = RecipeEngine(INGREDIENTS).sample(count)
+    assert len(recipes) == count
+    assert len(set(recipes)) == count
+    assert set(recipes) <= brute_force(INGREDIENTS)
+
+
+def test_every_recipe_can_be_asked_for():
+    engine = RecipeEngine(INGREDIENTS)
+    assert set(engine.sample(engine.index.combinations)) == brute_force(INGREDIENTS)
+
+
+def test_same_seed_same_recipes():
+    names = ["Sunrise", "Breeze", "Fizz"]
+    assert RecipeEngine(INGREDIENTS, seed=7).batch(names) == RecipeEngine(INGREDIENTS, seed=7).batch(names)
+    assert RecipeEngine(INGREDIENTS, seed=7).sample(10) != RecipeEngine(INGREDIENTS, seed=8).sample(10)
+
+
+def test_too_many_recipes_asked_for():
+    engine = RecipeEngine(["Seltzer", "Lime", "Mint"])
+    assert engine.index.combinations == 1
+    with pytest.raises(ValueError, match="make 1 distinct recipes, not 2"):
+        engine.batch(["One", "Two"])
+
+
+def test_no_recipes_asked_for():
+    assert RecipeEngine(INGREDIENTS).batch([]) == []
+    assert RecipeEngine([]).sample(0) == []
+
+
+def test_recipe_names_the_drink_and_its_ingredients():
+    text = RecipeEngine(["Seltzer", "Lime", "Mint"]).recipe("Green Fizz")
+    assert "*Green Fizz*" in text
+    assert "3 oz of Seltzer" in text and "squeeze of Lime" in text and "dash of Mint" in text
+
+
+def test_inventory_is_read_again_when_it_changes(tmp_path):
+    path = tmp_path / "inventory.txt"
+    path.write_text("# bar\nSeltzer\nLime\n\n")
+    assert load_inventory(str(path)) == ("Seltzer", "Lime")
+
+    json_path = tmp_path / "inventory.json"
+    json_path.write_text('["Seltzer", "Lime", "Mint"]')
+    assert load_inventory(str(json_path)) == ("Seltzer", "Lime", "Mint")
+
+    path.write_text("Seltzer\nLemon\n")
+    os.utime(path, (1, 1))
+    assert load_inventory(str(path)) == ("Seltzer", "Lemon")
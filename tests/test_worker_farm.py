@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from worker_farm import JobQueue, WorkerCrashed, run_farm
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_jobs_are_claimed_oldest_first_and_once(queue):
+    first, second = queue.submit("0_agent.py", ["one", "two"])
+
+    assert queue.claim("0_agent.py", "a")["id"] == first
+    assert queue.claim("0_agent.py", "b")["id"] == second
+    assert queue.claim("0_agent.py", "c") is None
+    assert queue.claim("1_tools.py", "c") is None
+
+
+def test_completed_job_keeps_its_result(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"])
+    queue.claim("0_agent.py", "a")
+
+    assert queue.complete(job_id, "a", {"answer": 42})
+    job = queue.get(job_id)
+    assert job["status"] == "done" and job["result"] == {"answer": 42}
+    assert queue.pending("0_agent.py") == 0
+    assert [job["id"] for job in queue.results()] == [job_id]
+
+
+def test_failed_job_is_hidden_during_its_backoff(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"], max_attempts=2)
+    queue.claim("0_agent.py", "a")
+
+    assert queue.fail(job_id, "a", "boom", retry_delay=60)
+    assert queue.get(job_id)["status"] == "queued"
+    assert queue.claim("0_agent.py", "a") is None
+
+
+def test_failed_job_is_retried(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"], max_attempts=2)
+    queue.claim("0_agent.py", "a")
+
+    queue.fail(job_id, "a", "boom", retry_delay=0)
+    job = queue.claim("0_agent.py", "b")
+    assert job["id"] == job_id and job["attempts"] == 2 and job["error"] == "boom"
+
+
+def test_job_out_of_attempts_fails_for_good(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"], max_attempts=1)
+    queue.claim("0_agent.py", "a")
+
+    queue.fail(job_id, "a", "boom", retry_delay=0)
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "boom"
+    assert queue.claim("0_agent.py", "a") is None
+
+
+def test_silent_workers_job_is_reclaimed(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"])
+    queue.claim("0_agent.py", "a", visibility_timeout=0)
+
+    assert queue.claim("0_agent.py", "b")["id"] == job_id
+    # the first worker lost it
+    assert not queue.heartbeat(job_id, "a")
+    assert not queue.complete(job_id, "a", "late")
+    assert queue.heartbeat(job_id, "b")
+
+
+def test_silent_workers_job_out_of_attempts_fails(queue):
+    [job_id] = queue.submit("0_agent.py", ["one"], max_attempts=1)
+    queue.claim("0_agent.py", "a", visibility_timeout=0)
+
+    assert queue.claim("0_agent.py", "b") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "worker stopped responding"
+
+
+def test_crashing_worker_stops_the_farm(tmp_path):
+    started = time.monotonic()
+    with pytest.raises(WorkerCrashed, match="crashed 3 times in a row: FileNotFoundError"):
+        run_farm(
+            str(tmp_path / "missing.py"), processes=1, queue_path=str(tmp_path / "jobs.sqlite"), max_restarts=2, restart_delay=0.2
+        )
+    # restarted after 0.2 and 0.4 seconds
+    assert time.monotonic() - started >= 0.6
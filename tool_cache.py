@@ -0,0 +1,104 @@
+# on-disk cache of mcp tool catalogs
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "mcp_tools")
+
+
+def cache_key(server_parameters):
+    """Identifies a server by how it is launched (command and args, or URL).
+
+    The environment is left out on purpose: it usually holds API keys.
+    """
+    if isinstance(server_parameters, dict):
+        launch = {key: value for key, value in server_parameters.items() if key != "headers"}
+    else:
+        launch = {"command": server_parameters.command, "args": list(server_parameters.args)}
+    return hashlib.sha256(json.dumps(launch, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def schema_hash(definitions):
+    """Fingerprint of a tool catalog: names, descriptions and input schemas."""
+    catalog = [
+        definition.model_dump(mode="json", exclude_none=True)
+        for definition in sorted(definitions, key=lambda d: d.name)
+    ]
+    return hashlib.sha256(json.dumps(catalog, sort_keys=True).encode()).hexdigest()
+
+
+def load_tools(pool, name, revalidate=True, cache_dir=CACHE_DIR, report=None):
+    """Returns the tools of pool server `name`, built from the cached catalog if any.
+
+    On a cache hit the agent gets its tools without waiting for the server. The
+    server is then started in the background and its live catalog compared with the
+    cached one; a changed catalog is written back for the next start. On a miss the
+    server is started right away and its catalog saved.
+
+    Args:
+        pool: The `MCPServerPool` the server is registered in.
+        name: Name the server was registered under.
+        revalidate: Whether to check the cached catalog against the live server.
+        cache_dir: Directory holding one JSON file per server.
+        report: Optional dict to fill with `"cached"`, whether the tools came from
+            the cache, and `"startup_seconds"`, the server's startup time if it was
+            started for them.
+    """
+    report = report if report is not None else {}
+    server_parameters = pool.server_parameters(name)
+    path = os.path.join(cache_dir, f"{name}-{cache_key(server_parameters)}.json")
+    entry = _read(path)
+    report["cached"] = entry is not None
+    report["startup_seconds"] = None
+    if entry is None:
+        definitions = pool.definitions(name)
+        report["startup_seconds"] = pool.startup_time(name)
+        _write(path, server_parameters, definitions)
+        return pool.tools(name, definitions)
+
+    # the MCP types are only needed here, to rebuild cached definitions
+    import mcp
+
+    definitions = [mcp.types.Tool.model_validate(tool) for tool in entry["tools"]]
+    tools = pool.tools(name, definitions)
+    if revalidate:
+        threading.Thread(
+            target=_revalidate, args=(pool, name, path, entry["schema_hash"]), daemon=True
+        ).start()
+    return tools
+
+
+def _revalidate(pool, name, path, cached_hash):
+    try:
+        definitions = pool.definitions(name)
+    except Exception as e:
+        print(f"Could not revalidate cached tools for '{name}': {e}")
+        return
+    if schema_hash(definitions) != cached_hash:
+        _write(path, pool.server_parameters(name), definitions)
+        print(f"Tools of MCP server '{name}' changed; restart to pick up the new catalog")
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if "tools" not in entry or "schema_hash" not in entry:
+        return None
+    return entry
+
+
+def _write(path, server_parameters, definitions):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {
+        "key": cache_key(server_parameters),
+        "schema_hash": schema_hash(definitions),
+        "tools": [definition.model_dump(mode="json", exclude_none=True) for definition in definitions],
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp_path, path)
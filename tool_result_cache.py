@@ -0,0 +1,133 @@
+# short-lived cache and request coalescing for mcp tool results
+import copy
+import fnmatch
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ToolResultCache:
+    """Caches tool results for a while and shares identical calls that are in flight.
+
+    A call whose result is cached and fresh is answered without a round-trip. A
+    call identical to one still running waits for that one instead of making its
+    own. Errors are never cached: the caller and everyone waiting on it get the
+    exception, and the next call tries again.
+
+    Args:
+        max_entries: Results kept; the least recently used are dropped first.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_or_call(self, tool_name, arguments, ttl, call):
+        """Returns the cached result of `tool_name(arguments)`, or `call()` and caches it for `ttl` seconds."""
+        key = (tool_name, json.dumps(arguments, sort_keys=True, default=str))
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0})
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return entry[1]
+            future = self._in_flight.get(key)
+            waiting = future is not None
+            if waiting:
+                stats["coalesced"] += 1
+            else:
+                future = self._in_flight[key] = Future()
+                stats["misses"] += 1
+        if waiting:
+            return future.result()
+
+        try:
+            value = call()
+        except BaseException as e:
+            with self._lock:
+                stats["errors"] += 1
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        """Hits, misses (round-trips), coalesced calls and errors, in total and per tool."""
+        with self._lock:
+            per_tool = {name: dict(stats) for name, stats in self._stats.items()}
+            entries = len(self._entries)
+        total = {field: sum(stats[field] for stats in per_tool.values()) for field in ("hits", "misses", "coalesced", "errors")}
+        calls = total["hits"] + total["misses"] + total["coalesced"]
+        total["saved_rate"] = (total["hits"] + total["coalesced"]) / calls if calls else 0.0
+        total["entries"] = entries
+        return {"total": total, "tools": per_tool}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_result_cache():
+    """The process-wide cache shared by every `cache_tools` call made without one."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ToolResultCache()
+        return _default_cache
+
+
+def ttl_for(tool_name, ttl):
+    """Seconds to cache `tool_name`: `ttl` itself, or the first `{pattern: seconds}` match."""
+    if not isinstance(ttl, dict):
+        return ttl or 0
+    for pattern, seconds in ttl.items():
+        if fnmatch.fnmatchcase(tool_name, pattern):
+            return seconds or 0
+    return 0
+
+
+def cache_tools(tools, ttl, cache=None, server=None):
+    """Copies of `tools` whose results are cached and whose identical calls are coalesced.
+
+    Args:
+        tools: Tools to wrap, e.g. the adapted tools of an MCP server.
+        ttl: Seconds results stay fresh, or per-tool policies like
+            `{"check_domains": 600, "search_*": 60}` (first matching pattern wins;
+            tools matching none, or with 0, are left uncached).
+        cache: The `ToolResultCache` to use, defaults to :func:`default_result_cache`.
+        server: Prefix for the tool names in the cache and its stats.
+    """
+    cache = cache or default_result_cache()
+    wrapped = []
+    for tool in tools:
+        seconds = ttl_for(tool.name, ttl)
+        if not seconds:
+            wrapped.append(tool)
+            continue
+        proxy = copy.copy(tool)
+        tool_name = f"{server}/{tool.name}" if server else tool.name
+
+        def forward(*args, _forward=tool.forward, _tool_name=tool_name, _seconds=seconds, **kwargs):
+            return cache.get_or_call(_tool_name, [args, kwargs], _seconds, lambda: _forward(*args, **kwargs))
+
+        proxy.forward = forward
+        wrapped.append(proxy)
+    return wrapped
@@ -0,0 +1,142 @@
+# give an agent only the tools of a large catalog that are relevant to its task
+import math
+import re
+from collections import Counter
+
+from smolagents import Tool
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "with", "you", "your", "can", "will", "use", "using", "tool", "api",
+}
+
+
+def tokenize(text):
+    """Lowercase words of `text`, splitting snake_case and camelCase, without stopwords or plural s."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words if word not in STOPWORDS]
+
+
+def tool_text(tool):
+    # the name counts twice: it is the most telling part of a tool
+    inputs = " ".join(f"{name} {spec.get('description', '')}" for name, spec in tool.inputs.items())
+    return f"{tool.name} {tool.name} {tool.description} {inputs}"
+
+
+class ToolIndex:
+    """BM25 index over tool names, descriptions and inputs; no network or model needed.
+
+    Args:
+        tools: The catalog, e.g. every tool of several MCP servers.
+        k1, b: BM25 term-frequency saturation and length normalization.
+    """
+
+    def __init__(self, tools, k1=1.5, b=0.75):
+        self.tools = list(tools)
+        self.k1 = k1
+        self.b = b
+        self._documents = [Counter(tokenize(tool_text(tool))) for tool in self.tools]
+        self._lengths = [sum(document.values()) for document in self._documents]
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        frequencies = Counter(word for document in self._documents for word in document)
+        count = len(self._documents)
+        self._idf = {word: math.log(1 + (count - n + 0.5) / (n + 0.5)) for word, n in frequencies.items()}
+
+    def search(self, query, k=8, exclude=()):
+        """The `k` best matching tools for `query` as `(tool, score)`, best first; tools scoring 0 are left out."""
+        words = [word for word in set(tokenize(query)) if word in self._idf]
+        scores = []
+        for tool, document, length in zip(self.tools, self._documents, self._lengths):
+            if tool.name in exclude:
+                continue
+            score = 0.0
+            for word in words:
+                frequency = document.get(word, 0)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * length / self._average_length)
+                    score += self._idf[word] * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((tool, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k]
+
+
+class FindToolsTool(Tool):
+    name = "find_tools"
+    description = (
+        "Finds more tools when none of the tools above fit what you need to do, and makes them callable from your next "
+        "code block on. Returns their signatures and descriptions."
+    )
+    inputs = {"query": {"type": "string", "description": "What the tool should do, e.g. 'create a page in a database'."}}
+    output_type = "string"
+
+    def __init__(self, retriever):
+        super().__init__()
+        self.retriever = retriever
+
+    def forward(self, query):
+        found = self.retriever.expand(query)
+        if not found:
+            return "No other tools match; try different words."
+        return "\n\n".join(tool.to_code_prompt() for tool in found)
+
+
+class ToolRetriever:
+    """Chooses the catalog tools an agent sees, per task.
+
+    Before each run, the agent's tools are reset to its own plus the `k` catalog
+    tools most relevant to the task, so the system prompt only describes those.
+    During the run, `find_tools` adds `expand_k` more on demand.
+
+    Args:
+        agent: The agent; catalog tools already among its tools are taken out.
+        catalog: The tools to choose from.
+        k: Catalog tools given to each run.
+        expand_k: Tools added per `find_tools` call.
+    """
+
+    def __init__(self, agent, catalog, k=8, expand_k=5):
+        self.agent = agent
+        self.index = ToolIndex(catalog)
+        self.k = k
+        self.expand_k = expand_k
+        names = {tool.name for tool in catalog}
+        find_tools = FindToolsTool(self)
+        self.base_tools = {name: tool for name, tool in agent.tools.items() if name not in names}
+        self.base_tools[find_tools.name] = find_tools
+
+    def select(self, task):
+        """Sets the agent's tools for `task`; returns the names of the catalog tools chosen."""
+        chosen = [tool for tool, _ in self.index.search(task, self.k)]
+        self.agent.tools = {**self.base_tools, **{tool.name: tool for tool in chosen}}
+        return [tool.name for tool in chosen]
+
+    def expand(self, query):
+        """Adds the best catalog tools for `query` not given yet; they are callable from the next code block."""
+        found = [tool for tool, _ in self.index.search(query, self.expand_k, exclude=self.agent.tools)]
+        if found:
+            self.agent.tools.update({tool.name: tool for tool in found})
+            executor = getattr(self.agent, "python_executor", None)
+            if executor is not None:
+                executor.send_tools({**self.agent.tools, **self.agent.managed_agents})
+        return found
+
+
+def use_tool_retrieval(agent, catalog, k=8, expand_k=5):
+    """Gives `agent` only the `k` tools of `catalog` relevant to each task, plus `find_tools` for more.
+
+    Agent tools not in `catalog` (e.g. base tools) are always kept.
+    """
+    retriever = ToolRetriever(agent, catalog, k=k, expand_k=expand_k)
+    run = agent.run
+
+    def run_with_retrieved_tools(task, *args, **kwargs):
+        retriever.select(task)
+        return run(task, *args, **kwargs)
+
+    agent.run = run_with_retrieved_tools
+    agent.tool_retriever = retriever
+    # until the first run the agent has every tool, so e.g. a tracer instrumenting it sees them all
+    agent.tools = {**retriever.base_tools, **{tool.name: tool for tool in catalog}}
+    return agent
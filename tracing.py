@@ -0,0 +1,235 @@
+# per-step latency and token tracing for agents
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from smolagents import ActionStep, PlanningStep
+
+
+class _TracedExecutor:
+    # Proxy timing each code execution; the agent calls its executor directly
+    def __init__(self, executor, tracer, agent_name):
+        self._executor = executor
+        self._tracer = tracer
+        self._agent_name = agent_name
+
+    def __call__(self, code_action):
+        with self._tracer.span(f"{self._agent_name} code", "code"):
+            return self._executor(code_action)
+
+    def __getattr__(self, name):
+        return getattr(self._executor, name)
+
+
+class Tracer:
+    """Records spans for model calls, steps, code execution, tools and sub-agents.
+
+    Spans are kept for the whole session and written as a Chrome trace (open it in
+    chrome://tracing or https://ui.perfetto.dev). A summary table of the spans of
+    the current task is printed when the task ends.
+
+    Args:
+        path: Where to write the Chrome trace, or None to keep spans in memory only.
+        max_spans: Most recent spans kept (and written), or None for all of them.
+    """
+
+    def __init__(self, path=None, max_spans=None):
+        self.path = path
+        self.spans = deque(maxlen=max_spans)
+        self._task_start = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category, **args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.time(), **args)
+
+    def add(self, name, category, start, end, **args):
+        with self._lock:
+            self.spans.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "start": start,
+                    "end": end,
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def instrument(self, agent, report=True):
+        """Adds spans to `agent`, its model, tools, executor and managed agents.
+
+        With `report`, the end of each run of `agent`, whether it answered, raised
+        or ran out of steps, prints the summary table and saves the trace.
+        """
+        self._instrument(agent, is_root=True, report=report)
+        return agent
+
+    def _instrument(self, agent, is_root, report):
+        if getattr(agent, "_tracer", None) is self:
+            return
+        agent._tracer = self
+        name = agent.name or type(agent).__name__
+        self._wrap_model(agent.model)
+        for tool in agent.tools.values():
+            self._wrap_tool(tool)
+        if getattr(agent, "python_executor", None) is not None:
+            agent.python_executor = _TracedExecutor(agent.python_executor, self, name)
+
+        def on_step(memory_step):
+            if memory_step.timing.end_time is None:
+                return
+            usage = memory_step.token_usage
+            is_planning = isinstance(memory_step, PlanningStep)
+            self.add(
+                f"{name} planning" if is_planning else f"{name} step",
+                "step",
+                memory_step.timing.start_time,
+                memory_step.timing.end_time,
+                step=None if is_planning else memory_step.step_number,
+                input_tokens=usage.input_tokens if usage else None,
+                output_tokens=usage.output_tokens if usage else None,
+            )
+
+        agent.step_callbacks.register(ActionStep, on_step)
+        agent.step_callbacks.register(PlanningStep, on_step)
+        if is_root and report:
+            agent.run = self._reported(agent.run)
+
+        for managed_agent in agent.managed_agents.values():
+            self._instrument(managed_agent, is_root=False, report=report)
+            # calls go through __call__, which runs the agent via its (instance) run method
+            managed_agent.run = self._timed(managed_agent.run, managed_agent.name, "agent")
+
+    def _wrap_model(self, model):
+        if getattr(model, "_tracer", None) is self:
+            return
+        model._tracer = self
+        model_name = model.model_id or type(model).__name__
+        model.generate = self._timed(model.generate, model_name, "model")
+        if hasattr(model, "generate_stream"):
+            generate_stream = model.generate_stream
+
+            @functools.wraps(generate_stream)
+            def traced_stream(*args, **kwargs):
+                with self.span(model_name, "model", stream=True):
+                    yield from generate_stream(*args, **kwargs)
+
+            model.generate_stream = traced_stream
+
+    def _wrap_tool(self, tool):
+        if getattr(tool, "_tracer", None) is self:
+            return
+        tool._tracer = self
+        tool.forward = self._timed(tool.forward, tool.name, "tool")
+
+    def _reported(self, run):
+        @functools.wraps(run)
+        def wrapper(task, *args, **kwargs):
+            if kwargs.get("stream", args[0] if args else False):
+                return self._end_task_after(run(task, *args, **kwargs))
+            try:
+                return run(task, *args, **kwargs)
+            finally:
+                self.end_task()
+
+        return wrapper
+
+    def _end_task_after(self, events):
+        # a streamed run ends with its events, or when the reader stops
+        try:
+            yield from events
+        finally:
+            self.end_task()
+
+    def _timed(self, func, name, category):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def summary(self, since=None):
+        """Totals per (category, name): count, total, mean and max seconds, and tokens."""
+        rows = {}
+        with self._lock:
+            spans = [span for span in self.spans if since is None or span["start"] >= since]
+        for span in spans:
+            row = rows.setdefault(
+                (span["cat"], span["name"]),
+                {"category": span["cat"], "name": span["name"], "count": 0, "total": 0.0, "max": 0.0, "tokens": 0},
+            )
+            duration = span["end"] - span["start"]
+            row["count"] += 1
+            row["total"] += duration
+            row["max"] = max(row["max"], duration)
+            row["tokens"] += (span["args"].get("input_tokens") or 0) + (span["args"].get("output_tokens") or 0)
+        for row in rows.values():
+            row["mean"] = row["total"] / row["count"]
+        return sorted(rows.values(), key=lambda row: row["total"], reverse=True)
+
+    def print_summary(self, since=None, file=None):
+        file = file or sys.stdout
+        rows = self.summary(since)
+        if not rows:
+            return
+        print(f"\n{'category':<8} {'name':<36} {'count':>5} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'tokens':>8}", file=file)
+        for row in rows:
+            print(
+                f"{row['category']:<8} {row['name'][:36]:<36} {row['count']:>5} {row['total']:>9.2f} "
+                f"{row['mean'] * 1000:>9.1f} {row['max'] * 1000:>9.1f} {row['tokens'] or '':>8}",
+                file=file,
+            )
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "traceEvents": [
+                {
+                    "name": span["name"],
+                    "cat": span["cat"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": (span["end"] - span["start"]) * 1e6,
+                    "pid": pid,
+                    "tid": span["tid"],
+                    "args": span["args"],
+                }
+                for span in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+    def end_task(self):
+        """Prints the summary of the spans since the previous task and saves the trace."""
+        self.print_summary(since=self._task_start)
+        self._task_start = time.time()
+        self.save()
+
+
+def trace_agent(agent, path=None):
+    """Instruments `agent` with a new `Tracer` writing to `traces/trace-<time>.json`."""
+    path = path or os.path.join("traces", time.strftime("trace-%Y%m%d-%H%M%S.json"))
+    Tracer(path).instrument(agent)
+    return agent
@@ -0,0 +1,366 @@
+# job queue in sqlite and worker processes consuming it, one agent per process
+import argparse
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite")
+
+# longest wait before restarting a crashed worker; one that stayed up this long is counted as healthy again
+MAX_RESTART_DELAY = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    entry_point TEXT NOT NULL,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    claimed_by TEXT,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (entry_point, status, visible_at);
+"""
+
+
+def entry_point_key(path):
+    # entry points live in the repository root, so the file name identifies them on every node
+    return os.path.basename(path)
+
+
+class JobQueue:
+    """Tasks for the entry points, in a SQLite file shared by any number of processes.
+
+    A worker claims a job, which hides it from other workers until its
+    visibility timeout runs out; a worker still running it extends the timeout
+    with :meth:`heartbeat`, so a job only reappears if its worker died. Failed
+    jobs are retried after a backoff until `max_attempts`, then marked failed.
+    Results are kept in the database.
+
+    Args:
+        path: Database file, created if needed. Workers on other machines can
+            share it over a network filesystem with working locks.
+    """
+
+    def __init__(self, path=QUEUE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def submit(self, entry_point, tasks, max_attempts=3):
+        """Queues `tasks` (strings) for `entry_point`; returns their job ids."""
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for task in tasks:
+                    cursor = self._db.execute(
+                        "INSERT INTO jobs (entry_point, task, max_attempts, visible_at, created) VALUES (?, ?, ?, ?, ?)",
+                        (entry_point_key(entry_point), task, max_attempts, now, now),
+                    )
+                    ids.append(cursor.lastrowid)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    def claim(self, entry_point, worker_id, visibility_timeout=600):
+        """Claims the oldest visible job for `entry_point`, or returns None.
+
+        Jobs whose worker stopped sending heartbeats become visible again; those
+        out of attempts are marked failed instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = coalesce(error, 'worker stopped responding'), finished = ? "
+                    "WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, visible_at = ?, claimed_by = ? "
+                    "WHERE id = (SELECT id FROM jobs WHERE entry_point = ? AND status IN ('queued', 'running') "
+                    "AND visible_at <= ? ORDER BY id LIMIT 1) RETURNING *",
+                    (now + visibility_timeout, worker_id, entry_point_key(entry_point), now),
+                ).fetchone()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return dict(row) if row else None
+
+    def heartbeat(self, job_id, worker_id, visibility_timeout=600):
+        """Keeps a running job hidden; False if it was reclaimed by another worker."""
+        return self._update(
+            "UPDATE jobs SET visible_at = ? WHERE id = ? AND claimed_by = ? AND status = 'running'",
+            (time.time() + visibility_timeout, job_id, worker_id),
+        )
+
+    def complete(self, job_id, worker_id, result):
+        return self._update(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished = ? "
+            "WHERE id = ? AND claimed_by = ? AND status = 'running'",
+            (json.dumps(result, default=str), time.time(), job_id, worker_id),
+        )
+
+    def fail(self, job_id, worker_id, error, retry_delay=10):
+        """Requeues the job after a backoff growing with its attempts, or fails it for good."""
+        now = time.time()
+        return self._update(
+            "UPDATE jobs SET error = ?, "
+            "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+            "visible_at = ? + ? * (1 << (attempts - 1)), "
+            "finished = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END "
+            "WHERE id = ? AND claimed_by = ? AND status = 'running'",
+            (error, now, retry_delay, now, job_id, worker_id),
+        )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def results(self, after_id=0, status=("done", "failed")):
+        """Finished jobs with an id above `after_id`, oldest first."""
+        marks = ", ".join("?" for _ in status)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM jobs WHERE id > ? AND status IN ({marks}) ORDER BY id", (after_id, *status)
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+    def counts(self):
+        """`{entry point: {status: jobs}}`."""
+        with self._lock:
+            rows = self._db.execute("SELECT entry_point, status, count(*) FROM jobs GROUP BY entry_point, status").fetchall()
+        counts = {}
+        for entry_point, status, jobs in rows:
+            counts.setdefault(entry_point, {})[status] = jobs
+        return counts
+
+    def pending(self, entry_point):
+        with self._lock:
+            return self._db.execute(
+                "SELECT count(*) FROM jobs WHERE entry_point = ? AND status IN ('queued', 'running')",
+                (entry_point_key(entry_point),),
+            ).fetchone()[0]
+
+    def _update(self, sql, parameters):
+        with self._lock:
+            return self._db.execute(sql, parameters).rowcount == 1
+
+
+def _job(row):
+    job = dict(row)
+    if job["result"] is not None:
+        job["result"] = json.loads(job["result"])
+    return job
+
+
+class Worker:
+    """Builds an entry point's agent once, then runs jobs from the queue until stopped.
+
+    Args:
+        queue: The `JobQueue`.
+        entry_point: Script defining `build_agent()`, e.g. `3_mcp_notion.py`.
+        worker_id: Name recorded on the jobs it claims.
+        visibility_timeout: Seconds a claimed job stays hidden without a heartbeat.
+        poll_interval: Seconds to wait when the queue is empty.
+    """
+
+    def __init__(self, queue, entry_point, worker_id=None, visibility_timeout=600, poll_interval=1.0):
+        self.queue = queue
+        self.entry_point = entry_point
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def run(self, drain=False):
+        """Processes jobs; with `drain`, returns once none are left for this entry point."""
+        from batch_runner import BatchRunner, load_entry_point
+
+        module = load_entry_point(self.entry_point)
+        # one agent, built on the first job and kept for the next ones
+        runner = BatchRunner(module.build_agent, workers=1)
+        processed = 0
+        while not self._stop.is_set():
+            job = self.queue.claim(self.entry_point, self.worker_id, self.visibility_timeout)
+            if job is None:
+                if drain and self.queue.pending(self.entry_point) == 0:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run_job(runner, job)
+            processed += 1
+        return processed
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_job(self, runner, job):
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.visibility_timeout / 3):
+                self.queue.heartbeat(job["id"], self.worker_id, self.visibility_timeout)
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            result = runner.run_task(job["id"], job["task"])
+        finally:
+            done.set()
+        if result["error"] is None:
+            self.queue.complete(job["id"], self.worker_id, result)
+        else:
+            self.queue.fail(job["id"], self.worker_id, result["error"])
+
+
+def _work(queue_path, entry_point, worker_id, visibility_timeout, drain, errors):
+    try:
+        Worker(JobQueue(queue_path), entry_point, worker_id, visibility_timeout).run(drain=drain)
+    except KeyboardInterrupt:
+        pass
+    except BaseException as e:
+        # the parent reports it if the worker keeps crashing
+        errors.send(f"{type(e).__name__}: {e}")
+        raise
+
+
+class WorkerCrashed(RuntimeError):
+    """A farm worker crashed more times in a row than the farm restarts it."""
+
+
+def run_farm(entry_point, processes=None, queue_path=QUEUE_PATH, visibility_timeout=600, drain=False, max_restarts=5, restart_delay=1.0):
+    """Runs `processes` workers (default: one per CPU), restarting any that crash.
+
+    A crashed worker is restarted after `restart_delay` seconds, doubling with each
+    crash in a row up to `MAX_RESTART_DELAY`; a worker that stayed up that long
+    starts over. After `max_restarts` crashes in a row, e.g. an entry point that
+    fails to build, the other workers are stopped and :class:`WorkerCrashed` is
+    raised with the worker's error.
+
+    Returns when they all finish (with `drain`) or on Ctrl-C.
+    """
+    processes = processes or os.cpu_count() or 1
+    # spawn: workers must not inherit the parent's threads and open connections
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+
+    def start(number):
+        receive, send = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_work,
+            args=(queue_path, entry_point, f"{host}-{os.getpid()}-{number}", visibility_timeout, drain, send),
+        )
+        process.start()
+        send.close()
+        return process, receive, time.monotonic()
+
+    workers = {number: start(number) for number in range(processes)}
+    crashes = {number: 0 for number in workers}
+    restarts = {}
+    try:
+        while workers or restarts:
+            now = time.monotonic()
+            for number, restart_at in list(restarts.items()):
+                if restart_at <= now:
+                    del restarts[number]
+                    workers[number] = start(number)
+            # wake up when a worker exits or the next restart is due
+            timeout = min((restart_at - now for restart_at in restarts.values()), default=None)
+            multiprocessing.connection.wait([process.sentinel for process, _, _ in workers.values()], timeout)
+            for number, (process, errors, started) in list(workers.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del workers[number]
+                error = errors.recv() if errors.poll() else f"exit code {process.exitcode}"
+                errors.close()
+                if process.exitcode == 0:
+                    continue
+                if time.monotonic() - started >= MAX_RESTART_DELAY:
+                    crashes[number] = 0
+                crashes[number] += 1
+                if crashes[number] > max_restarts:
+                    raise WorkerCrashed(f"worker {number} crashed {crashes[number]} times in a row: {error}")
+                delay = min(restart_delay * 2 ** (crashes[number] - 1), MAX_RESTART_DELAY)
+                print(f"worker {number} crashed ({error}), restarting in {delay:g}s", file=sys.stderr)
+                restarts[number] = time.monotonic() + delay
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # on Ctrl-C or a worker that keeps crashing, stop the others too
+        for process, _, _ in workers.values():
+            process.terminate()
+        for process, _, _ in workers.values():
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue tasks for the agents and run worker processes on them.")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="job queue database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="queue JSONL tasks (like batch_runner's) for an entry point")
+    submit.add_argument("entry_point")
+    submit.add_argument("tasks", nargs="?", default="-", help="JSONL file of tasks, '-' for stdin")
+    submit.add_argument("--max-attempts", type=int, default=3)
+
+    work = commands.add_parser("work", help="run worker processes for an entry point")
+    work.add_argument("entry_point")
+    work.add_argument("-n", "--processes", type=int, help="worker processes (default: one per CPU)")
+    work.add_argument("--visibility-timeout", type=float, default=600, help="seconds before a silent worker's job is retried")
+    work.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+    work.add_argument("--max-restarts", type=int, default=5, help="restarts of a crashing worker before its error stops the farm")
+
+    commands.add_parser("status", help="count jobs by entry point and status")
+
+    results = commands.add_parser("results", help="print finished jobs as JSONL")
+    results.add_argument("--after", type=int, default=0, help="only jobs with a higher id")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        try:
+            run_farm(args.entry_point, args.processes, args.queue, args.visibility_timeout, args.drain, args.max_restarts)
+        except WorkerCrashed as e:
+            sys.exit(str(e))
+        return
+    queue = JobQueue(args.queue)
+    if args.command == "submit":
+        from batch_runner import read_tasks
+
+        tasks_file = sys.stdin if args.tasks == "-" else open(args.tasks, encoding="utf-8")
+        with tasks_file:
+            ids = queue.submit(args.entry_point, [task for _, task in read_tasks(tasks_file)], args.max_attempts)
+        print(f"queued {len(ids)} jobs" + (f" ({ids[0]}-{ids[-1]})" if ids else ""))
+    elif args.command == "status":
+        for entry_point, counts in sorted(queue.counts().items()):
+            print(f"{entry_point:<28} " + "  ".join(f"{status} {jobs}" for status, jobs in sorted(counts.items())))
+    elif args.command == "results":
+        for job in queue.results(args.after):
+            print(json.dumps(job, default=str))
+
+
+if __name__ == '__main__':
+    main()